@@ -0,0 +1,161 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from normalize import normalize_name
+
+# Alias appris lors des vérifications : nom saisi (normalisé) -> entreprise de la
+# base retenue, ou verdict "aucune correspondance"
+alias_file_path = os.environ.get(
+    "FSG_ALIAS_PATH", os.path.join("..", "sources", "aliases.sqlite3")
+)
+
+# Requêtes SQL par paquets, sous la limite de variables de SQLite
+LOOKUP_BATCH = 500
+
+# Alias enregistré : company vaut None pour un verdict "aucune correspondance" ;
+# source indique d'où vient la décision (interactif, revue)
+Alias = namedtuple("Alias", ["query", "company", "source", "updated_at"])
+
+# Alias des requêtes d'une liste : rows, position dans la base de l'entreprise
+# retenue (-1 sinon) ; rejected, requêtes dont aucune option n'a été retenue
+AliasMatches = namedtuple("AliasMatches", ["rows", "rejected"])
+
+
+class AliasStore:
+    def __init__(self, path=alias_file_path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS aliases (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                company TEXT,
+                source TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+        self.connection.commit()
+
+    def lookup(self, queries):
+        # Alias de chaque requête (None si aucun), en une requête SQL par paquet
+        keys = [normalize_name(query) for query in queries]
+        found = {}
+        distinct = [key for key in set(keys) if key]
+        with self.lock:
+            for start in range(0, len(distinct), LOOKUP_BATCH):
+                batch = distinct[start : start + LOOKUP_BATCH]
+                rows = self.connection.execute(
+                    "SELECT key, query, company, source, updated_at FROM aliases "
+                    f"WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, *alias in rows:
+                    found[key] = Alias(*alias)
+        return [found.get(key) for key in keys]
+
+    def record(self, query, company, source):
+        # company : raison sociale retenue, ou None si aucune option ne convient.
+        # Une nouvelle décision sur le même nom remplace la précédente.
+        key = normalize_name(query)
+        if not key:
+            return
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO aliases VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET query = excluded.query, "
+                "company = excluded.company, source = excluded.source, "
+                "updated_at = excluded.updated_at",
+                (key, query, company, source, now, now),
+            )
+            self.connection.commit()
+
+    def remove(self, query):
+        with self.lock:
+            deleted = self.connection.execute(
+                "DELETE FROM aliases WHERE key = ?", (normalize_name(query),)
+            ).rowcount
+            self.connection.commit()
+        return deleted > 0
+
+    def all(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT query, company, source, updated_at FROM aliases "
+                "ORDER BY updated_at"
+            ).fetchall()
+        return [Alias(*row) for row in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+def resolve_aliases(store, queries, company_index):
+    # Position dans la base de l'entreprise retenue pour chaque requête connue.
+    # Une entreprise qui n'est plus dans la base laisse la requête au rapprochement.
+    rows = np.full(len(queries), -1, dtype=np.int64)
+    rejected = np.zeros(len(queries), dtype=bool)
+    for i, alias in enumerate(store.lookup(queries)):
+        if alias is None:
+            continue
+        if alias.company is None:
+            rejected[i] = True
+        else:
+            rows[i] = company_index.get(alias.company, -1)
+    return AliasMatches(rows, rejected)
+
+
+def record_choice(store, query, choice, source):
+    # choice : (raison sociale, score, source, position) renvoyé par get_user_choice ou
+    # resolve_choice ; un score nul correspond à "aucune correspondance"
+    store.record(query, str(choice[0]) if choice[1] > 0 else None, source)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_alias_store():
+    # Table partagée, ouverte au premier usage
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AliasStore()
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Alias appris lors des vérifications (nom saisi -> entreprise)."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="afficher les alias enregistrés")
+    remove_parser = subparsers.add_parser("remove", help="oublier un alias")
+    remove_parser.add_argument("query")
+    args = parser.parse_args(argv)
+
+    store = get_alias_store()
+    if args.command == "list":
+        for alias in store.all():
+            date = datetime.fromtimestamp(alias.updated_at).strftime("%Y-%m-%d %H:%M")
+            company = alias.company or "(aucune correspondance)"
+            print(f"{alias.query} -> {company}  [{alias.source}, {date}]")
+    elif store.remove(args.query):
+        print(f"Alias de '{args.query}' supprimé.")
+    else:
+        print(f"Aucun alias pour '{args.query}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,82 @@
-from flask import Flask
+import json
+import os
+import threading
+import time
+from functools import partial
+
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
+
+from aliases import get_alias_store, resolve_aliases
+from database import csv_file_path, load_database
+from export import EXPORT_FORMAT, build_company_index, export_column_names
+from jobs import DONE, FAILED, JobQueue, run_pipeline
+from matcher import match_queries
+from metrics import run_metrics
+from normalize import dedupe_companies, dedupe_inputs, split_input_line
+from tfidf_index import load_or_build_index
 
 app = Flask(__name__)
 
+# Nombre maximum d'entreprises par requête /match
+MAX_MATCH_BATCH = int(os.environ.get("MAX_MATCH_BATCH", "5000"))
+
+# Nombre maximum d'entreprises par traitement /jobs
+MAX_JOB_COMPANIES = int(os.environ.get("MAX_JOB_COMPANIES", "1000000"))
+
+# Intervalle des messages de maintien de connexion du suivi /jobs/<id>/events
+JOB_EVENTS_KEEPALIVE = 15
+
+
+def load_reference():
+    # Chargement unique de la base et de l'index au démarrage du service
+    start_time = time.time()
+    with run_metrics.stage("csv_load"):
+        reference = load_database(csv_file_path, columns=["Company", "SIRET"])
+    with run_metrics.stage("index_load"):
+        index = load_or_build_index(csv_file_path, reference)
+    print(f"Base et index chargés en {time.time() - start_time:.2f} secondes")
+    return reference, index
+
+
+reference, index = load_reference()
+reference_list = reference["Company"].tolist()
+siret_list = reference["SIRET"].tolist()
+company_index = build_company_index(reference)
+
+_export_table = None
+_export_table_lock = threading.Lock()
+
+
+def load_export_table():
+    # Colonnes du fichier de résultats, lues au premier traitement puis partagées
+    global _export_table
+    with _export_table_lock:
+        if _export_table is None:
+            _export_table = load_database(csv_file_path, columns=export_column_names)
+        return _export_table
+
+
+job_queue = JobQueue(
+    partial(run_pipeline, index, reference_list, company_index, load_export_table)
+)
+
+
+def describe_row(row, score):
+    siret = siret_list[row]
+    return {
+        "company": str(reference_list[row]),
+        "siret": siret if isinstance(siret, str) else None,
+        "score": round(float(score), 4),
+    }
+
 
 @app.route("/")
 def hello():
@@ -21,5 +96,224 @@ def hello():
     return "Hello world from Marco"
 
 
+# Attributs acceptés pour une entreprise décrite par un objet JSON
+ATTRIBUTE_KEYS = ["code_postal", "ville", "departement", "domaine"]
+
+
+def parse_company(item):
+    # "Entreprise A" (colonnes éventuelles séparées par des tabulations) ou
+    # {"name": "Entreprise A", "ville": "Lyon", "domaine": "a.fr", ...} ;
+    # None si l'entrée n'a pas cette forme
+    if isinstance(item, str):
+        return split_input_line(item)
+    if isinstance(item, dict) and isinstance(item.get("name"), str):
+        attributes = {
+            key: item[key]
+            for key in ATTRIBUTE_KEYS
+            if isinstance(item.get(key), str) and item[key].strip()
+        }
+        return item["name"], attributes
+    return None
+
+
+def parse_companies(payload):
+    # Corps attendu : ["Entreprise A", ...] ou {"companies": [...]}, chaque
+    # entreprise étant un nom ou un objet {"name": ..., "code_postal": ...,
+    # "ville": ..., "departement": ..., "domaine": ...} ; None sinon
+    if isinstance(payload, dict):
+        payload = payload.get("companies")
+    if not isinstance(payload, list):
+        return None
+    companies = [parse_company(item) for item in payload]
+    return None if None in companies else companies
+
+
+@app.route("/match", methods=["POST"])
+def match():
+    companies = parse_companies(request.get_json(silent=True))
+    if companies is None:
+        return jsonify(error="Une liste JSON de noms d'entreprises est attendue."), 400
+    if len(companies) > MAX_MATCH_BATCH:
+        return (
+            jsonify(error=f"Au plus {MAX_MATCH_BATCH} entreprises par requête."),
+            413,
+        )
+
+    start_time = time.perf_counter()
+    queries = [name for name, _ in companies]
+    attributes = [attributes for _, attributes in companies]
+    with run_metrics.stage("match_request"):
+        aliases = resolve_aliases(get_alias_store(), queries, company_index)
+        matches = match_queries(index, queries, aliases=aliases, attributes=attributes)
+
+    results = []
+    for i, query in enumerate(queries):
+        row = matches.best_rows[i]
+        best_score = matches.best_scores[i]
+        results.append(
+            {
+                "query": query,
+                "best_match": (
+                    describe_row(row, best_score)
+                    if row >= 0 and best_score > 0
+                    else None
+                ),
+                "auto_matched": bool(matches.auto_matched[i]),
+                "exact_match": bool(matches.exact_matched[i]),
+                # Décision reprise d'une vérification précédente
+                "alias_match": bool(matches.alias_matched[i]),
+                "alias_rejected": bool(matches.alias_rejected[i]),
+                # Entreprise désignée par son site
+                "domain_match": bool(matches.domain_matched[i]),
+                # Options à vérifier, comme celles proposées par get_user_choice
+                "candidates": [
+                    describe_row(candidate_row, score)
+                    for candidate_row, score in zip(
+                        matches.candidate_rows[i], matches.candidate_scores[i]
+                    )
+                    if candidate_row >= 0
+                ],
+            }
+        )
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    return jsonify(results=results, elapsed_ms=round(elapsed_ms, 2))
+
+
+def describe_job(state):
+    # État d'un traitement et liens vers son suivi et ses fichiers
+    job_id = state["id"]
+    state["status_url"] = url_for("job_status", job_id=job_id)
+    state["events_url"] = url_for("job_events", job_id=job_id)
+    if state["status"] == DONE:
+        state["result_url"] = url_for("job_result", job_id=job_id)
+        if state["has_review"]:
+            state["review_url"] = url_for("job_review", job_id=job_id)
+    return state
+
+
+def find_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return None, (jsonify(error=f"Traitement inconnu : {job_id}"), 404)
+    return job, None
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    # Liste envoyée en fichier texte (champ "file", une entreprise par ligne comme
+    # pour batch.py) ou en JSON comme pour /match ; le traitement complet
+    # (rapprochement, recherches web, export) est mené en arrière-plan
+    if "file" in request.files:
+        text = request.files["file"].read().decode("utf-8-sig", errors="replace")
+        queries, attributes = dedupe_inputs(text.splitlines())
+        file_format = request.form.get("format", EXPORT_FORMAT)
+    else:
+        payload = request.get_json(silent=True)
+        companies = parse_companies(payload)
+        if companies is None:
+            return (
+                jsonify(
+                    error="Une liste d'entreprises (JSON ou fichier) est attendue."
+                ),
+                400,
+            )
+        queries, attributes = dedupe_companies(companies)
+        file_format = EXPORT_FORMAT
+        if isinstance(payload, dict):
+            file_format = payload.get("format", EXPORT_FORMAT)
+    if file_format not in ("xlsx", "csv"):
+        return jsonify(error="Format de fichier attendu : xlsx ou csv."), 400
+    if not queries:
+        return jsonify(error="La liste d'entreprises est vide."), 400
+    if len(queries) > MAX_JOB_COMPANIES:
+        return (
+            jsonify(error=f"Au plus {MAX_JOB_COMPANIES} entreprises par traitement."),
+            413,
+        )
+
+    job = job_queue.submit(queries, attributes, file_format)
+    _, state = job.state()
+    return jsonify(describe_job(state)), 202, {"Location": state["status_url"]}
+
+
+@app.route("/jobs")
+def list_jobs():
+    return jsonify(jobs=[describe_job(job.state()[1]) for job in job_queue.list()])
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job, error = find_job(job_id)
+    if error:
+        return error
+    state = describe_job(job.state()[1])
+    state["metrics"] = job.metrics.snapshot(services=False)
+    return jsonify(state)
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    # Avancement en continu (Server-Sent Events) : un message à chaque
+    # changement d'état, jusqu'à la fin du traitement
+    job, error = find_job(job_id)
+    if error:
+        return error
+
+    def events():
+        version, state = job.state()
+        yield f"data: {json.dumps(describe_job(state), ensure_ascii=False)}\n\n"
+        while state["status"] not in (DONE, FAILED):
+            new_version, state = job.wait_for_change(version, JOB_EVENTS_KEEPALIVE)
+            if new_version == version:
+                yield ": en attente\n\n"
+                continue
+            version = new_version
+            yield f"data: {json.dumps(describe_job(state), ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def send_job_file(job_id, attribute):
+    job, error = find_job(job_id)
+    if error:
+        return error
+    _, state = job.state()
+    if state["status"] != DONE:
+        return (
+            jsonify(error=f"Traitement {state['status']}, fichier non disponible."),
+            409,
+        )
+    file_path = getattr(job, attribute)
+    if file_path is None:
+        return jsonify(error="Aucune correspondance à vérifier."), 404
+    return send_file(os.path.abspath(file_path), as_attachment=True)
+
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    return send_job_file(job_id, "file_path")
+
+
+@app.route("/jobs/<job_id>/review")
+def job_review(job_id):
+    # Fichier de revue, à appliquer avec batch.py apply-review
+    return send_job_file(job_id, "review_path")
+
+
+@app.route("/metrics")
+def metrics():
+    # Mesures cumulées depuis le démarrage du service, au format du rapport JSON
+    # écrit à côté des exports ; celles des traitements /jobs terminés sont
+    # cumulées à part
+    snapshot = run_metrics.snapshot()
+    snapshot["jobs"] = job_queue.metrics.snapshot(services=False)
+    return jsonify(snapshot)
+
+
 if __name__ == "__main__":
     app.run()
@@ -0,0 +1,264 @@
+import argparse
+import os
+import sys
+import time
+
+from aliases import get_alias_store, record_choice, resolve_aliases
+from checkpoint import open_journal
+from database import csv_file_path, load_database
+from enrichment import search_companies
+from export import (
+    EXPORT_FORMAT,
+    REJECTED_SOURCE,
+    append_results,
+    build_company_index,
+    choice_row,
+    export_column_names,
+    export_results,
+    iter_table_rows,
+    web_search_queries,
+)
+from matcher import (
+    AUTO_MATCH_THRESHOLD,
+    CANDIDATE_THRESHOLD,
+    NO_MATCH,
+    get_best_match,
+    get_candidates,
+    match_queries,
+)
+from metrics import run_metrics, write_report
+from normalize import dedupe_inputs
+from review import read_review_file, resolve_choice, write_review_file
+from tfidf_index import load_or_build_index
+
+
+def read_input_file(file_path):
+    # Une entreprise par ligne, éventuellement suivie (après une tabulation) de son
+    # code postal, sa ville, son département ou son site ; les lignes vides et les
+    # doublons (à la normalisation près) sont ignorés
+    with open(file_path, encoding="utf-8") as f:
+        return dedupe_inputs(line.rstrip("\r\n") for line in f)
+
+
+def review_file_path(results_path):
+    return os.path.splitext(results_path)[0] + "_revue.csv"
+
+
+def sort_matches(matches, queries, reference_list):
+    # Au-dessus du seuil (ou alias connu) : acceptation automatique ; avec des
+    # options : revue différée ; sans option pertinente ou écartée par un choix
+    # précédent : recherche web, comme en interactif. Renvoie les requêtes et
+    # résultats à exporter, et les entrées du fichier de revue.
+    result_queries = []
+    final_results = []
+    review_entries = []
+    for i, query in enumerate(queries):
+        if matches.alias_rejected[i]:
+            result_queries.append(query)
+            final_results.append((NO_MATCH, 0, REJECTED_SOURCE, -1))
+            continue
+        if matches.auto_matched[i]:
+            source = "automatique"
+            if matches.alias_matched[i]:
+                source = "alias"
+            elif matches.domain_matched[i]:
+                source = "site"
+            result_queries.append(query)
+            final_results.append(
+                get_best_match(matches, i, reference_list)
+                + (source, matches.best_rows[i])
+            )
+            continue
+        candidates = get_candidates(matches, i, reference_list)
+        if candidates:
+            review_entries.append((query, candidates))
+        else:
+            result_queries.append(query)
+            final_results.append((NO_MATCH, 0, "automatique", -1))
+    return result_queries, final_results, review_entries
+
+
+def run(args):
+    # Le journal permet de reprendre une exécution interrompue (--resume) sans
+    # refaire les recherches web déjà obtenues
+    journal = open_journal("lot", args.resume, os.path.abspath(args.input_file))
+    try:
+        run_with_journal(args, journal)
+    except KeyboardInterrupt:
+        print("\nExécution interrompue. Pour la reprendre :")
+        print(f"python batch.py run {args.input_file} --resume")
+        sys.exit(130)
+    finally:
+        journal.close()
+
+
+def run_with_journal(args, journal):
+    start_time = time.time()
+    if journal.queries is None:
+        queries, attributes = read_input_file(args.input_file)
+        journal.record_inputs(queries, attributes, len(queries))
+    else:
+        queries, attributes = journal.queries, journal.attributes
+    print(f"{len(queries)} entreprises à rechercher dans {args.input_file}")
+
+    with run_metrics.stage("csv_load"):
+        reference = load_database(csv_file_path, columns=["Company"])
+    reference_list = reference["Company"].tolist()
+
+    matches = journal.matches_for(csv_file_path)
+    if matches is None:
+        with run_metrics.stage("index_load"):
+            index = load_or_build_index(csv_file_path)
+        aliases = resolve_aliases(
+            get_alias_store(), queries, build_company_index(reference)
+        )
+        matches = match_queries(
+            index,
+            queries,
+            auto_threshold=args.auto_threshold,
+            candidate_threshold=args.candidate_threshold,
+            aliases=aliases,
+            attributes=attributes,
+        )
+        journal.record_matches(matches, csv_file_path)
+
+    result_queries, final_results, review_entries = sort_matches(
+        matches, queries, reference_list
+    )
+
+    web_rows = search_companies(
+        web_search_queries(result_queries, final_results),
+        journal,
+    )
+    with run_metrics.stage("result_assembly"):
+        df = load_database(csv_file_path, columns=export_column_names)
+    with run_metrics.stage("export"):
+        rows = iter_table_rows(df, result_queries, final_results, web_rows)
+        writer = export_results(rows, args.output_dir, file_format=args.format)
+    file_path = writer.file_path
+
+    print("\n====== SOMMAIRE ======")
+    print("Correspondance automatique : ", int(matches.auto_matched.sum()))
+    print("  dont noms identiques à la base : ", int(matches.exact_matched.sum()))
+    print("  dont choix déjà faits (alias) : ", int(matches.alias_matched.sum()))
+    print("  dont sites connus de la base : ", int(matches.domain_matched.sum()))
+    print(
+        "Sans correspondance selon un choix déjà fait : ",
+        int(matches.alias_rejected.sum()),
+    )
+    print("Recherches web : ", len(web_rows))
+    print(f"Résultats enregistrés : {file_path}")
+    if review_entries:
+        review_path = review_file_path(file_path)
+        write_review_file(review_path, review_entries)
+        print(f"Correspondances à vérifier : {len(review_entries)} ({review_path})")
+        print(
+            f"Une fois la colonne 'Choix' remplie : "
+            f"python batch.py apply-review {review_path} --results {file_path}"
+        )
+    print(f"Rapport d'exécution : {write_report(file_path)}")
+    journal.finish(file_path)
+    print(f"Temps écoulé: {time.time() - start_time:.2f} secondes")
+
+
+def apply_review(args):
+    entries = read_review_file(args.review_file)
+    try:
+        choices = [resolve_choice(*entry) for entry in entries]
+    except ValueError as e:
+        sys.exit(str(e))
+
+    # Les choix saisis dans le fichier de revue servent d'alias aux prochaines
+    # listes. Une ligne laissée vide n'est pas retenue : elle peut n'avoir pas été
+    # examinée, et un alias « aucune correspondance » écarterait le nom du
+    # rapprochement et de la recherche web pour de bon.
+    store = get_alias_store()
+    for (query, _, entered), choice in zip(entries, choices):
+        if entered:
+            record_choice(store, query, choice, "revue")
+
+    df = load_database(csv_file_path, columns=["Company"] + export_column_names)
+    company_index = build_company_index(df)
+    queries = [query for query, _, _ in entries]
+    names = df["Company"].to_numpy(dtype=object)
+    final_results = [
+        choice[:3] + (choice_row(names, company_index, choice),) for choice in choices
+    ]
+
+    web_rows = search_companies(web_search_queries(queries, final_results))
+    with run_metrics.stage("export"):
+        rows = iter_table_rows(df, queries, final_results, web_rows)
+        if args.results:
+            writer = append_results(rows, args.results)
+        else:
+            writer = export_results(rows, args.output_dir, file_format=args.format)
+    file_path = writer.file_path
+    print(f"{writer.num_rows} correspondances vérifiées enregistrées : {file_path}")
+    # En ajout, le rapport du traitement initial est conservé
+    report_path = write_report(args.review_file if args.results else file_path)
+    print(f"Rapport d'exécution : {report_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Recherche Entreprise FSG sans interaction (traitement par lot)."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser(
+        "run", help="rapprocher une liste d'entreprises (une par ligne)"
+    )
+    run_parser.add_argument("input_file")
+    run_parser.add_argument(
+        "--auto-threshold",
+        type=float,
+        default=AUTO_MATCH_THRESHOLD,
+        help="score à partir duquel une correspondance est acceptée",
+    )
+    run_parser.add_argument(
+        "--candidate-threshold",
+        type=float,
+        default=CANDIDATE_THRESHOLD,
+        help="score minimum d'une option envoyée en revue",
+    )
+    run_parser.add_argument("--output-dir", default=os.getcwd())
+    run_parser.add_argument("--format", choices=["xlsx", "csv"], default=EXPORT_FORMAT)
+    run_parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="JOURNAL",
+        help="reprendre la dernière exécution interrompue de cette liste "
+        "(ou le journal indiqué)",
+    )
+    run_parser.set_defaults(func=run)
+
+    review_parser = subparsers.add_parser(
+        "apply-review", help="appliquer un fichier de revue complété"
+    )
+    review_parser.add_argument("review_file")
+    review_parser.add_argument(
+        "--results", help="fichier de résultats à compléter avec les lignes vérifiées"
+    )
+    review_parser.add_argument("--output-dir", default=os.getcwd())
+    review_parser.add_argument(
+        "--format", choices=["xlsx", "csv"], default=EXPORT_FORMAT
+    )
+    review_parser.set_defaults(func=apply_review)
+
+    args = parser.parse_args(argv)
+    # Le dossier de sortie est vérifié avant tout appel aux services web payants,
+    # pas au moment de l'export
+    try:
+        os.makedirs(args.output_dir, exist_ok=True)
+    except OSError as e:
+        parser.error(f"dossier de sortie inutilisable : {e}")
+    if not os.access(args.output_dir, os.W_OK):
+        parser.error(
+            f"dossier de sortie non accessible en écriture : {args.output_dir}"
+        )
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
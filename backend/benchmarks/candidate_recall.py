@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import csv_file_path, load_database  # noqa: E402
+from dataset import add_noise  # noqa: E402
+from matcher import MAX_CANDIDATES  # noqa: E402
+from similarity import candidate_top_k, top_k_similarities  # noqa: E402
+from tfidf_index import load_or_build_index  # noqa: E402
+
+
+def make_queries(names, count, seed):
+    rng = random.Random(seed)
+    rows = [
+        row
+        for row in rng.sample(range(len(names)), min(count * 2, len(names)))
+        if isinstance(names[row], str)
+    ][:count]
+    return np.array(rows), [add_noise(names[row], rng) for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rappel et latence de l'index des trigrammes face au calcul "
+        "exhaustif des similarités."
+    )
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--pools", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--max-postings", type=int, nargs="+", default=[50000, 200000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = load_database(csv_file_path, columns=["Company"])["Company"].tolist()
+    index = load_or_build_index(csv_file_path, candidate_min_rows=0)
+    candidate_index = index.candidate_index
+    source_rows, queries = make_queries(names, args.queries, args.seed)
+    query_matrix = index.transform(queries)
+    print(f"{len(names)} lignes, {len(queries)} requêtes bruitées\n")
+
+    start_time = time.perf_counter()
+    # L'index des trigrammes couvre le segment principal
+    exact_rows, exact_scores = top_k_similarities(
+        query_matrix, index.main_matrix, k=MAX_CANDIDATES, live=index.main_live()
+    )
+    exact_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+    exact_rows = index.positions[exact_rows]
+
+    print(
+        f"{'Méthode':<34}{'ms/requête':>11}{'Top-1 identique':>17}"
+        f"{'Scores top-4':>14}{'Ligne source':>14}"
+    )
+    print(
+        f"{'exhaustif':<34}{exact_ms:>11.2f}{1:>17.1%}{1:>14.1%}"
+        f"{np.mean(exact_rows[:, 0] == source_rows):>14.1%}"
+    )
+    for max_postings in args.max_postings:
+        for pool in args.pools:
+            start_time = time.perf_counter()
+            candidates = [
+                candidate_index.candidates(query, pool, max_postings)
+                for query in queries
+            ]
+            rows, scores = candidate_top_k(
+                query_matrix,
+                index.main_matrix,
+                candidates,
+                MAX_CANDIDATES,
+                live=index.main_live(),
+            )
+            elapsed_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+            rows = np.where(rows >= 0, index.positions[rows], -1)
+
+            # À score égal, deux lignes différentes sont aussi bonnes l'une que l'autre
+            same_best = np.isclose(scores[:, 0], exact_scores[:, 0])
+            same_top_k = np.isclose(scores, exact_scores).mean()
+            label = f"trigrammes pool={pool} lus={max_postings}"
+            print(
+                f"{label:<34}{elapsed_ms:>11.2f}{same_best.mean():>17.1%}"
+                f"{same_top_k:>14.1%}{np.mean(rows[:, 0] == source_rows):>14.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
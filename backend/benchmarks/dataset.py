@@ -0,0 +1,263 @@
+import argparse
+import os
+import random
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Colonnes du fichier database.csv, dans l'ordre de la base FSG
+DATABASE_COLUMNS = [
+    "Company",
+    "Effectifs société",
+    "SIRET",
+    "SIREN",
+    "Adresse 1",
+    "Adresse 2",
+    "Ville",
+    "Code postal",
+    "Standard",
+    "Privé_Public",
+    "SBF120_ETI_MID MARKET",
+    "Nom de domaine",
+    "Segment",
+    "Population",
+    "Département",
+    "Région",
+    "Code activité",
+    "Libellé activité",
+    "Activité",
+    "Groupe",
+    "Tranche effectif société",
+    "Effectifs consolidés",
+    "Téléphone siège",
+    "Chiffre d'affaires consolidé",
+    "Nombre d'établissements",
+]
+
+SYLLABLES = (
+    "ba be bi bo da de di do fa fe fi fo ga ge go la le li lo ma me mi mo na ne ni "
+    "no pa pe pi po ra re ri ro sa se si so ta te ti to va ve vi vo za zo ter mon "
+    "val cor lan ber vil mar sol tec gen"
+).split()
+
+SECTOR_WORDS = [
+    "Transports",
+    "Logistique",
+    "Services",
+    "Conseil",
+    "Industrie",
+    "Bâtiment",
+    "Énergie",
+    "Hôtellerie",
+    "Métallurgie",
+    "Agroalimentaire",
+    "Télécom",
+    "Santé",
+    "Développement",
+    "Ingénierie",
+    "Immobilier",
+    "Distribution",
+]
+
+LEGAL_FORMS = ["SAS", "SA", "SARL", "SASU", "EURL", "SNC", "Groupe"]
+
+CITIES = [
+    ("PARIS", "75001", "75 - Paris", "Île-de-France"),
+    ("LYON", "69001", "69 - Rhône", "Auvergne-Rhône-Alpes"),
+    ("MARSEILLE", "13001", "13 - Bouches-du-Rhône", "Provence-Alpes-Côte d'Azur"),
+    ("LILLE", "59000", "59 - Nord", "Hauts-de-France"),
+    ("NANTES", "44000", "44 - Loire-Atlantique", "Pays de la Loire"),
+    ("BORDEAUX", "33000", "33 - Gironde", "Nouvelle-Aquitaine"),
+    ("STRASBOURG", "67000", "67 - Bas-Rhin", "Grand Est"),
+    ("RENNES", "35000", "35 - Ille-et-Vilaine", "Bretagne"),
+]
+
+ACTIVITIES = [
+    ("4941A", "Transports routiers de fret interurbains", "Transport"),
+    ("6202A", "Conseil en systèmes et logiciels informatiques", "Informatique"),
+    ("4120B", "Construction d'autres bâtiments", "BTP"),
+    ("7022Z", "Conseil pour les affaires et autres conseils de gestion", "Conseil"),
+    ("6420Z", "Activités des sociétés holding", "Holding"),
+    ("1071C", "Boulangerie et boulangerie-pâtisserie", "Agroalimentaire"),
+    ("8610Z", "Activités hospitalières", "Santé"),
+]
+
+HEADCOUNT_BANDS = [
+    (0, "A - 0 à 49 employés"),
+    (50, "B - 50 à 99 employés"),
+    (100, "C - 100 à 249 employés"),
+    (250, "D - 250 à 999 employés"),
+    (1000, "E - 1000 employés et plus"),
+]
+
+CHUNK_ROWS = 200_000
+
+
+def make_vocabulary(size, rng):
+    # Mots inventés de 2 à 3 syllabes, distincts
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+def make_names(num_rows, seed):
+    # Raisons sociales : 1 à 3 mots, parfois un secteur d'activité et une forme
+    # juridique. Quelques noms reviennent plusieurs fois, comme dans la base.
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(max(1000, int(num_rows**0.6)), rng)
+    names = []
+    for _ in range(num_rows):
+        words = [rng.choice(vocabulary).capitalize() for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.4:
+            words.append(rng.choice(SECTOR_WORDS))
+        if rng.random() < 0.3:
+            words.append(rng.choice(LEGAL_FORMS))
+        names.append(" ".join(words).upper())
+    return names
+
+
+def make_chunk(names, first_row, seed):
+    rng = np.random.default_rng(seed)
+    num_rows = len(names)
+    rows = np.arange(first_row, first_row + num_rows)
+
+    sirens = np.char.zfill((100_000_000 + rows * 7).astype(str), 9)
+    headcounts = rng.lognormal(3.5, 1.5, num_rows).astype(np.int64)
+    band_index = np.searchsorted([b[0] for b in HEADCOUNT_BANDS], headcounts, "right")
+    cities = rng.integers(len(CITIES), size=num_rows)
+    activities = rng.integers(len(ACTIVITIES), size=num_rows)
+    domains = [
+        "www." + "".join(c for c in name.split()[0].lower() if c.isalnum()) + ".fr"
+        for name in names
+    ]
+
+    return pd.DataFrame(
+        {
+            "Company": names,
+            "Effectifs société": headcounts.astype(str),
+            "SIRET": np.char.add(sirens, "00012"),
+            "SIREN": sirens,
+            "Adresse 1": [
+                f"{n} RUE DE LA PAIX" for n in rng.integers(1, 200, num_rows)
+            ],
+            "Adresse 2": "",
+            "Ville": [CITIES[i][0] for i in cities],
+            "Code postal": [CITIES[i][1] for i in cities],
+            "Standard": np.char.zfill(
+                rng.integers(10**8, 10**9, num_rows).astype(str), 10
+            ),
+            "Privé_Public": np.where(rng.random(num_rows) < 0.9, "Privé", "Public"),
+            "SBF120_ETI_MID MARKET": np.where(rng.random(num_rows) < 0.02, "ETI", ""),
+            "Nom de domaine": domains,
+            "Segment": np.where(headcounts >= 250, "GE", "PME"),
+            "Population": "",
+            "Département": [CITIES[i][2] for i in cities],
+            "Région": [CITIES[i][3] for i in cities],
+            "Code activité": [ACTIVITIES[i][0] for i in activities],
+            "Libellé activité": [ACTIVITIES[i][1] for i in activities],
+            "Activité": [ACTIVITIES[i][2] for i in activities],
+            "Groupe": [f"GROUPE {name.split()[0]}" for name in names],
+            "Tranche effectif société": [HEADCOUNT_BANDS[i - 1][1] for i in band_index],
+            "Effectifs consolidés": (headcounts * 1.2).astype(np.int64).astype(str),
+            "Téléphone siège": np.char.zfill(
+                rng.integers(10**8, 10**9, num_rows).astype(str), 10
+            ),
+            "Chiffre d'affaires consolidé": (headcounts * 150_000).astype(str),
+            "Nombre d'établissements": rng.integers(1, 20, num_rows).astype(str),
+        },
+        columns=DATABASE_COLUMNS,
+    )
+
+
+def generate_database(path, num_rows, seed=0):
+    # Écriture par blocs pour borner la mémoire, même à plusieurs millions de lignes
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    names = make_names(num_rows, seed)
+    for first_row in range(0, num_rows, CHUNK_ROWS):
+        chunk = make_chunk(
+            names[first_row : first_row + CHUNK_ROWS], first_row, seed + first_row
+        )
+        chunk.to_csv(
+            path,
+            mode="w" if first_row == 0 else "a",
+            header=first_row == 0,
+            index=False,
+        )
+    return names
+
+
+def strip_accents(text):
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def add_noise(name, rng):
+    # Variante d'un nom de la base : faute de frappe, mot manquant, forme juridique,
+    # accents ou casse différents
+    words = name.split()
+    noise = rng.randrange(6)
+    if noise == 0 and len(name) > 4:
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+    if noise == 1 and len(name) > 4:
+        i = rng.randrange(len(name))
+        return name[:i] + name[i + 1 :]
+    if noise == 2 and len(words) > 2:
+        del words[rng.randrange(len(words))]
+        return " ".join(words)
+    if noise == 3:
+        return strip_accents(name).lower()
+    if noise == 4:
+        return name.title() + " " + rng.choice(LEGAL_FORMS)
+    return name
+
+
+def make_queries(names, count, seed=0, unknown_ratio=0.05, duplicate_ratio=0.05):
+    # Liste à rechercher : noms de la base bruités, quelques doublons et quelques
+    # entreprises absentes de la base (recherchées sur le Web). Renvoie aussi la
+    # ligne d'origine de chaque requête (-1 pour une entreprise inconnue).
+    rng = random.Random(seed)
+    rows = [
+        row
+        for row in rng.sample(range(len(names)), min(count, len(names)))
+        if isinstance(names[row], str)
+    ]
+    num_unknown = int(len(rows) * unknown_ratio)
+    pairs = [
+        (f"Entreprise Inconnue {rng.randrange(10**6)}", -1) for _ in range(num_unknown)
+    ]
+    pairs += [(add_noise(names[row], rng), row) for row in rows[num_unknown:]]
+    pairs += rng.sample(pairs, int(len(pairs) * duplicate_ratio))
+    rng.shuffle(pairs)
+    return [query for query, _ in pairs], np.array([row for _, row in pairs])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Génère une base database.csv synthétique et une liste de "
+        "requêtes bruitées."
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument(
+        "--output", default=os.path.join("..", "sources", "database.csv")
+    )
+    parser.add_argument("--queries", type=int, default=0)
+    parser.add_argument("--queries-output", default="requetes.txt")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = generate_database(args.output, args.rows, args.seed)
+    print(f"{args.rows} lignes écrites dans {args.output}")
+    if args.queries:
+        queries, _ = make_queries(names, args.queries, args.seed)
+        with open(args.queries_output, "w", encoding="utf-8") as f:
+            f.write("\n".join(queries) + "\n")
+        print(f"{len(queries)} requêtes écrites dans {args.queries_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Faux SerpAPI et Pappers : réponses déterministes, dérivées du nom recherché,
+# servies après une latence fixe pour reproduire le coût des appels réels
+
+# Part des entreprises pour lesquelles aucun SIRET n'est trouvé
+NOT_FOUND_RATIO = 0.2
+
+
+def name_digest(name):
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:12], 16)
+
+
+def fake_siret(name):
+    digest = name_digest(name)
+    if digest % 100 < NOT_FOUND_RATIO * 100:
+        return None
+    return f"{digest % 10**14:014d}"
+
+
+def search_json(query):
+    # La requête du scrapper est "<nom> siret" : le site de l'entreprise, puis une
+    # fiche d'annuaire citant le SIRET quand il est connu
+    name = query[: -len(" siret")] if query.endswith(" siret") else query
+    digest = name_digest(name)
+    organic_results = [{"link": f"https://www.entreprise-{digest % 10**6}.fr"}]
+    siret = fake_siret(name)
+    if siret is not None:
+        spaced = f"{siret[:3]} {siret[3:6]} {siret[6:9]} {siret[9:]}"
+        organic_results.append(
+            {
+                "link": f"https://www.societe.com/societe/{siret[:9]}.html",
+                "title": f"{name.upper()} ({siret[:9]})",
+                "snippet": f"{name} à PARIS. SIRET : {spaced}. Activité : conseil",
+            }
+        )
+    return {
+        "organic_results": organic_results,
+        "local_results": {"places": [{"phone": f"01 {digest % 10**8:08d}"}]},
+    }
+
+
+def pappers_company(siret):
+    digest = int(siret)
+    return {
+        "siren": siret[:9],
+        "denomination": f"ENTREPRISE {siret[:9]}",
+        "code_naf": "7022Z",
+        "libelle_code_naf": "Conseil pour les affaires et autres conseils de gestion",
+        "domaine_activite": "Conseil",
+        "effectif": "10 à 19 salariés",
+        "effectif_max": 19,
+        "chiffre_affaires_max": digest % 10**7,
+        "siege": {
+            "adresse_ligne_1": f"{digest % 200} RUE DE LA PAIX",
+            "code_postal": "75001",
+            "ville": "PARIS",
+        },
+    }
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        time.sleep(self.latency)
+        if url.path == "/search.json":
+            self.send_body(
+                json.dumps(search_json(params.get("q", ""))), "application/json"
+            )
+        elif url.path == "/v2/entreprise":
+            self.send_body(
+                json.dumps(pappers_company(params.get("siret", "0" * 14))),
+                "application/json",
+            )
+        else:
+            self.send_error(404)
+
+
+def start_fake_server(port=0, latency=0.05):
+    # Serveur lancé dans un fil d'exécution ; renvoie le serveur et son adresse
+    handler = type("Handler", (FakeApiHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Faux serveur SerpAPI et Pappers.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    server, url = start_fake_server(args.port, args.latency)
+    print(f"Faux serveur à l'écoute sur {url}")
+    print(f"SERPAPI_URL={url} PAPPERS_URL={url} python initial_scrapper.py")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules mesurés par défaut : points d'entrée et bibliothèque de rapprochement
+DEFAULT_MODULES = [
+    "initial_scrapper",
+    "batch",
+    "database",
+    "tfidf_index",
+    "matcher",
+    "review",
+    "enrichment",
+    "export",
+]
+
+# Dépendances lourdes qui ne doivent être chargées que par leur étape
+HEAVY_MODULES = ["sklearn", "tabulate", "tqdm"]
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    # Temps d'import cumulés (en microsecondes) relevés par python -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times.setdefault(name.strip(), int(cumulative))
+    return times
+
+
+def measure(module, repeat):
+    # Meilleur temps sur plusieurs démarrages à froid de l'interpréteur
+    runs = [import_times(module) for _ in range(repeat)]
+    best = min(runs, key=lambda times: times.get(module, 0))
+    return best.get(module, 0) / 1000, [name for name in HEAVY_MODULES if name in best]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Temps de démarrage des modules (python -X importtime)."
+    )
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'Module':<20}{'Import (ms)':>12}  Dépendances lourdes chargées")
+    for module in args.modules:
+        elapsed_ms, heavy = measure(module, args.repeat)
+        print(f"{module:<20}{elapsed_ms:>12.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
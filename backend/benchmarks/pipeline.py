@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+# Fichiers dérivés de la base, supprimés avant chaque mesure pour partir à froid
+DERIVED_DIRS = ["snapshot", "index", "candidates", "cache"]
+
+# Réglages d'environnement enregistrés avec les résultats
+ENVIRONMENT_PREFIXES = ("FSG_", "SERPAPI_", "PAPPERS_", "ENRICHMENT_", "HTTP_")
+
+# Étapes des résultats antérieurs, regroupées depuis dans "matching"
+MATCHING_STAGES = ["exact_keys", "similarity", "candidate_selection"]
+
+STAGES = [
+    "csv_load",
+    "vectorization",
+    "matching",
+    "enrichment",
+    "result_assembly",
+    "export",
+]
+
+
+def peak_rss_mb():
+    # resource n'existe pas sous Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageTimer:
+    # Durée et pic mémoire (cumulé depuis le début du processus) de chaque étape
+    def __init__(self):
+        self.durations = {}
+        self.peak_rss = {}
+
+    def run(self, name, function, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.durations[name] = round(time.perf_counter() - start_time, 4)
+        self.peak_rss[name] = peak_rss_mb()
+        return result
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+    return commit + ("-modifie" if dirty else "")
+
+
+def prepare_dataset(directory, num_rows, seed):
+    # La base générée est conservée d'une exécution à l'autre ; seuls les fichiers
+    # dérivés (copie Parquet, index, cache des réponses) sont reconstruits
+    from dataset import generate_database
+
+    csv_path = os.path.join(directory, "sources", "database.csv")
+    os.makedirs(os.path.join(directory, "backend"), exist_ok=True)
+    generation_time = None
+    if not os.path.exists(csv_path):
+        start_time = time.perf_counter()
+        generate_database(csv_path, num_rows, seed)
+        generation_time = round(time.perf_counter() - start_time, 2)
+    for name in DERIVED_DIRS:
+        shutil.rmtree(os.path.join(directory, "sources", name), ignore_errors=True)
+    return generation_time
+
+
+def run_pipeline(args):
+    # Exécuté dans un sous-processus par taille de base, pour isoler le pic mémoire
+    directory = os.path.join(args.workdir, f"{args.rows}_{args.seed}")
+    generation_time = prepare_dataset(directory, args.rows, args.seed)
+
+    from fake_server import start_fake_server
+
+    server, url = start_fake_server(latency=args.latency)
+    os.environ["SERPAPI_URL"] = url
+    os.environ["PAPPERS_URL"] = url
+    os.environ["FSG_CACHE_PATH"] = os.path.join(
+        directory, "sources", "cache", "responses.sqlite3"
+    )
+    os.chdir(os.path.join(directory, "backend"))
+    sys.path.insert(0, BACKEND_DIR)
+
+    # Modules du programme importés une fois l'environnement en place
+    from database import csv_file_path, ensure_snapshot, load_database
+    from dataset import make_queries
+    from enrichment import enrich_companies
+    from export import build_table_data, export_column_names, export_results
+    from matcher import match_queries
+    from metrics import run_metrics
+    from normalize import dedupe_names
+    from tfidf_index import load_or_build_index
+
+    timer = StageTimer()
+
+    def load_reference():
+        ensure_snapshot(csv_file_path)
+        return load_database(csv_file_path, columns=["Company"])["Company"].tolist()
+
+    reference_list = timer.run("csv_load", load_reference)
+    queries, source_rows = make_queries(reference_list, args.queries, args.seed)
+    source_by_query = dict(zip(reversed(queries), reversed(source_rows.tolist())))
+    queries = dedupe_names(queries)
+
+    index = timer.run(
+        "vectorization", load_or_build_index, csv_file_path, blocking=False
+    )
+
+    # Rapprochement du programme lui-même (clés exactes, similarité, sélection
+    # des options) ; le détail des sous-étapes vient de ses propres mesures
+    matches = timer.run("matching", match_queries, index, queries)
+    exact_matched = matches.exact_matched
+    matching_stages = {
+        name: stats["total_seconds"]
+        for name, stats in run_metrics.snapshot()["stages"].items()
+    }
+
+    # Comme en traitement par lot : recherche web des requêtes sans option. Les
+    # cas à vérifier sont comptés comme acceptés pour l'assemblage du résultat.
+    has_candidates = (matches.candidate_rows >= 0).any(axis=1)
+    web_queries = [
+        query
+        for query, auto, candidate in zip(queries, matches.auto_matched, has_candidates)
+        if not auto and not candidate
+    ]
+    searched = web_queries[: args.web_queries]
+    web_rows = timer.run(
+        "enrichment",
+        lambda: {
+            result.query: result.row_data for result in enrich_companies(searched)
+        },
+    )
+    web_rows.update({query: [query, "NA"] for query in web_queries[len(searched) :]})
+
+    def assemble():
+        df = load_database(csv_file_path, columns=export_column_names)
+        final_results = []
+        for i, query in enumerate(queries):
+            row = matches.best_rows[i]
+            if query in web_rows or row < 0:
+                final_results.append(("", 0, "web", -1))
+            else:
+                final_results.append(
+                    (reference_list[row], matches.best_scores[i], "automatique", row)
+                )
+        return build_table_data(df, queries, final_results, web_rows)
+
+    table_data = timer.run("result_assembly", assemble)
+    timer.run("export", export_results, table_data, directory, "resultats.xlsx")
+    server.shutdown()
+
+    # Justesse : la meilleure correspondance porte le nom de la ligne d'origine
+    known = [
+        (row, source_by_query[query])
+        for query, row in zip(queries, matches.best_rows.tolist())
+        if source_by_query[query] >= 0
+    ]
+    correct = sum(
+        row >= 0 and reference_list[row] == reference_list[source]
+        for row, source in known
+    )
+
+    return {
+        "rows": args.rows,
+        "queries": len(queries),
+        "generation_seconds": generation_time,
+        "stages": timer.durations,
+        "matching_stages": matching_stages,
+        "total_seconds": round(sum(timer.durations.values()), 4),
+        "stage_peak_rss_mb": timer.peak_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "auto_matched": int(matches.auto_matched.sum()),
+        "exact_matched": int(exact_matched.sum()),
+        "review": int((~matches.auto_matched & has_candidates).sum()),
+        "web_queries": len(web_queries),
+        "web_searched": len(searched),
+        "top1_accuracy": round(correct / len(known), 4) if known else None,
+    }
+
+
+def run_sizes(args):
+    runs = []
+    for rows in args.sizes:
+        print(f"Base de {rows} lignes...", flush=True)
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "run-one",
+            "--rows",
+            str(rows),
+            "--queries",
+            str(args.queries),
+            "--web-queries",
+            str(args.web_queries),
+            "--latency",
+            str(args.latency),
+            "--seed",
+            str(args.seed),
+            "--workdir",
+            args.workdir,
+        ]
+        output = subprocess.run(
+            command, capture_output=True, text=True, check=True
+        ).stdout
+        # Le résultat est la dernière ligne ; le reste est la sortie du programme
+        run = json.loads(output.strip().splitlines()[-1])
+        print_run(run)
+        runs.append(run)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            "queries": args.queries,
+            "web_queries": args.web_queries,
+            "latency": args.latency,
+            "seed": args.seed,
+            "environment": {
+                name: value
+                for name, value in os.environ.items()
+                if name.startswith(ENVIRONMENT_PREFIXES)
+            },
+        },
+        "runs": runs,
+    }
+    output_path = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y-%m-%d_%H-%M')}_{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats enregistrés : {output_path}")
+
+
+def print_run(run):
+    print(f"  {'Étape':<22}{'Secondes':>10}{'Pic RSS (Mo)':>14}")
+    for stage in STAGES:
+        print(
+            f"  {stage:<22}{run['stages'][stage]:>10.3f}"
+            f"{run['stage_peak_rss_mb'][stage] or 0:>14.1f}"
+        )
+    print(
+        f"  {'total':<22}{run['total_seconds']:>10.3f}{run['peak_rss_mb'] or 0:>14.1f}"
+    )
+    print(
+        f"  {run['queries']} requêtes : {run['auto_matched']} automatiques "
+        f"(dont {run['exact_matched']} identiques), {run['review']} à vérifier, "
+        f"{run['web_queries']} recherches web ; justesse {run['top1_accuracy']}\n"
+    )
+
+
+def stage_seconds(run, stage):
+    # Les résultats antérieurs mesuraient le rapprochement en trois étapes
+    stages = run["stages"]
+    if stage == "matching" and stage not in stages:
+        if all(name in stages for name in MATCHING_STAGES):
+            return round(sum(stages[name] for name in MATCHING_STAGES), 4)
+    return stages.get(stage)
+
+
+def compare(args):
+    reports = []
+    for path in (args.before, args.after):
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    before, after = [{run["rows"]: run for run in report["runs"]} for report in reports]
+    print(f"{reports[0]['commit']} -> {reports[1]['commit']}")
+
+    for rows in sorted(set(before) & set(after)):
+        print(f"\nBase de {rows} lignes")
+        print(f"  {'Étape':<22}{'Avant':>10}{'Après':>10}{'Rapport':>10}")
+        for stage in STAGES + ["total"]:
+            if stage == "total":
+                old, new = before[rows]["total_seconds"], after[rows]["total_seconds"]
+            else:
+                old = stage_seconds(before[rows], stage)
+                new = stage_seconds(after[rows], stage)
+            if old is None or new is None:
+                continue
+            ratio = f"{new / old:.2f}x" if old else "-"
+            print(f"  {stage:<22}{old:>10.3f}{new:>10.3f}{ratio:>10}")
+        print(
+            f"  {'pic RSS (Mo)':<22}{before[rows]['peak_rss_mb'] or 0:>10.1f}"
+            f"{after[rows]['peak_rss_mb'] or 0:>10.1f}"
+        )
+        print(
+            f"  {'justesse':<22}{before[rows]['top1_accuracy'] or 0:>10.4f}"
+            f"{after[rows]['top1_accuracy'] or 0:>10.4f}"
+        )
+
+
+def add_run_arguments(parser):
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument(
+        "--web-queries",
+        type=int,
+        default=50,
+        help="nombre maximum de recherches web envoyées au faux serveur",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="latence du faux serveur (s)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workdir",
+        default=os.path.join(BENCHMARK_DIR, "data"),
+        help="dossier des bases générées, conservées d'une exécution à l'autre",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mesure de bout en bout du rapprochement sur des bases "
+        "synthétiques, avec un faux serveur SerpAPI et Pappers."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="mesurer une ou plusieurs tailles")
+    run_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    run_parser.add_argument("--output", help="fichier JSON des résultats")
+    add_run_arguments(run_parser)
+
+    one_parser = subparsers.add_parser("run-one", help=argparse.SUPPRESS)
+    one_parser.add_argument("--rows", type=int, required=True)
+    add_run_arguments(one_parser)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="comparer deux fichiers de résultats"
+    )
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        args.workdir = os.path.abspath(args.workdir)
+        run_sizes(args)
+    elif args.command == "run-one":
+        print(json.dumps(run_pipeline(args)))
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_recall import make_queries  # noqa: E402
+from database import csv_file_path, load_database  # noqa: E402
+from matcher import MAX_CANDIDATES, score_queries  # noqa: E402
+from tfidf_index import attach_shard_pool, index_dir_path  # noqa: E402
+from tfidf_index import load_or_build_index  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Débit du calcul exhaustif des similarités selon le nombre de "
+        "processus."
+    )
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = load_database(csv_file_path, columns=["Company"])["Company"].tolist()
+    index = load_or_build_index(
+        csv_file_path, candidate_min_rows=len(names) + 1, workers=1
+    )
+    _, queries = make_queries(names, args.queries, args.seed)
+    print(f"{len(names)} lignes, {len(queries)} requêtes, {os.cpu_count()} cœurs\n")
+
+    print(f"{'Processus':<12}{'Requêtes/s':>12}{'Accélération':>14}{'Identique':>11}")
+    reference = None
+    for workers in args.workers:
+        index.shard_pool = None
+        if workers > 1:
+            attach_shard_pool(index, index_dir_path, workers)
+            # Démarrage des processus hors mesure
+            score_queries(index, queries[:1], MAX_CANDIDATES)
+
+        start_time = time.perf_counter()
+        rows, scores = score_queries(index, queries, MAX_CANDIDATES)
+        rate = len(queries) / (time.perf_counter() - start_time)
+
+        if reference is None:
+            reference = (rows, scores, rate)
+        same = np.array_equal(rows, reference[0]) and np.allclose(scores, reference[1])
+        print(
+            f"{workers:<12}{rate:>12.1f}{rate / reference[2]:>13.2f}x"
+            f"{'oui' if same else 'non':>11}"
+        )
+        if index.shard_pool is not None:
+            index.shard_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import time
+
+import numpy as np
+
+from database import (
+    READ_CHUNK_ROWS,
+    csv_file_path,
+    is_up_to_date,
+    iter_csv_chunks,
+    load_database,
+    new_manifest,
+    read_manifest,
+    remove_manifest,
+    write_manifest,
+)
+from normalize import (
+    key_hash,
+    normalize_city,
+    normalize_department,
+    normalize_domain,
+    normalize_postal_code,
+)
+
+# Index de blocage : pour chaque attribut (code postal, ville, département, nom de
+# domaine) et chaque valeur normalisée, la liste triée des lignes de la base qui
+# la portent
+blocking_index_dir_path = os.path.join("..", "sources", "blocks")
+
+# À incrémenter si le format de l'index change
+BLOCKING_INDEX_VERSION = 1
+
+BLOCKS_FILE = "blocks.npz"
+
+# Attribut d'une requête -> colonne de la base
+ATTRIBUTE_COLUMNS = {
+    "code_postal": "Code postal",
+    "ville": "Ville",
+    "departement": "Département",
+    "domaine": "Nom de domaine",
+}
+
+ATTRIBUTE_NORMALIZERS = {
+    "code_postal": normalize_postal_code,
+    "ville": normalize_city,
+    "departement": normalize_department,
+    "domaine": normalize_domain,
+}
+
+# Attributs géographiques, du plus précis au plus large : le plus précis connu de
+# la base délimite les lignes comparées
+GEOGRAPHIC_ATTRIBUTES = ["code_postal", "ville", "departement"]
+
+# Au-delà, un nom de domaine est partagé par trop de lignes (hébergeur, réseau
+# social, groupe) pour identifier une entreprise
+DOMAIN_MAX_ROWS = int(os.environ.get("FSG_DOMAIN_MAX_ROWS", "20"))
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def value_hashes(attribute, values):
+    # Empreintes des valeurs normalisées ; 0 pour une valeur vide, jamais recherchée
+    keys = map(ATTRIBUTE_NORMALIZERS[attribute], values)
+    return np.array([key_hash(key) if key else 0 for key in keys], dtype=np.int64)
+
+
+def build_blocks(hashes):
+    # Empreintes distinctes triées, début de leur bloc et lignes de chaque bloc
+    # (triées, le tri étant stable)
+    order = np.argsort(hashes, kind="stable")
+    order = order[hashes[order] != 0]
+    keys, starts = np.unique(hashes[order], return_index=True)
+    return keys, np.append(starts, len(order)).astype(np.int64), order.astype(np.int64)
+
+
+class BlockingIndex:
+    def __init__(self, blocks):
+        # blocks : attribut -> (empreintes, débuts des blocs, lignes)
+        self.blocks = blocks
+
+    def lookup(self, attribute, value):
+        # Empreinte de la valeur et lignes de la base qui la portent (positions
+        # dans la base, triées)
+        keys, offsets, rows = self.blocks[attribute]
+        key = value_hashes(attribute, [value])[0]
+        position = np.searchsorted(keys, key)
+        if key == 0 or position == len(keys) or keys[position] != key:
+            return key, EMPTY_ROWS
+        return key, rows[offsets[position] : offsets[position + 1]]
+
+    def domain_block(self, attributes):
+        # Bloc du site de l'entreprise, s'il ne désigne que quelques lignes :
+        # (attribut, empreinte de la valeur, lignes)
+        if "domaine" in attributes:
+            key, rows = self.lookup("domaine", attributes["domaine"])
+            if 0 < len(rows) <= DOMAIN_MAX_ROWS:
+                return "domaine", key, rows
+        return None, 0, EMPTY_ROWS
+
+    def geographic_block(self, attributes):
+        # Bloc de l'attribut géographique le plus précis connu de la base
+        for attribute in GEOGRAPHIC_ATTRIBUTES:
+            if attribute in attributes:
+                key, rows = self.lookup(attribute, attributes[attribute])
+                if len(rows):
+                    return attribute, key, rows
+        return None, 0, EMPTY_ROWS
+
+
+def build_blocking_index(
+    csv_path=csv_file_path, index_dir=blocking_index_dir_path, chunk_rows=None
+):
+    # chunk_rows : base lue par blocs depuis le CSV, seules les empreintes des
+    # valeurs (8 octets par ligne et par attribut) restant en mémoire
+    os.makedirs(index_dir, exist_ok=True)
+    remove_manifest(index_dir)
+
+    columns = list(ATTRIBUTE_COLUMNS.values())
+    if chunk_rows:
+        chunks = iter_csv_chunks(csv_path, columns, chunk_rows)
+    else:
+        chunks = [load_database(csv_path, columns=columns)]
+    hashes = {attribute: [] for attribute in ATTRIBUTE_COLUMNS}
+    num_rows = 0
+    for chunk in chunks:
+        for attribute, column in ATTRIBUTE_COLUMNS.items():
+            hashes[attribute].append(value_hashes(attribute, chunk[column].tolist()))
+        num_rows += len(chunk)
+
+    arrays = {}
+    for attribute in ATTRIBUTE_COLUMNS:
+        keys, offsets, rows = build_blocks(
+            np.concatenate(hashes.pop(attribute) or [EMPTY_ROWS])
+        )
+        arrays[f"{attribute}_keys"] = keys
+        arrays[f"{attribute}_offsets"] = offsets
+        arrays[f"{attribute}_rows"] = rows
+
+    np.savez(os.path.join(index_dir, BLOCKS_FILE), **arrays)
+    write_manifest(
+        index_dir, new_manifest(csv_path, BLOCKING_INDEX_VERSION, num_rows=num_rows)
+    )
+
+
+def load_blocking_index(index_dir=blocking_index_dir_path):
+    with np.load(os.path.join(index_dir, BLOCKS_FILE)) as arrays:
+        return BlockingIndex(
+            {
+                attribute: (
+                    arrays[f"{attribute}_keys"],
+                    arrays[f"{attribute}_offsets"],
+                    arrays[f"{attribute}_rows"],
+                )
+                for attribute in ATTRIBUTE_COLUMNS
+            }
+        )
+
+
+def load_or_build_blocking_index(
+    csv_path=csv_file_path,
+    index_dir=blocking_index_dir_path,
+    chunk_rows=READ_CHUNK_ROWS,
+):
+    # Reconstruit seulement si le contenu de la base a changé
+    if not is_up_to_date(csv_path, index_dir, BLOCKING_INDEX_VERSION):
+        print("Construction de l'index de blocage de la base de données...")
+        build_blocking_index(csv_path, index_dir, chunk_rows)
+    return load_blocking_index(index_dir)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    blocking_index = load_or_build_blocking_index()
+    print(
+        f"Index de blocage à jour : {read_manifest(blocking_index_dir_path)['num_rows']}"
+        " lignes, "
+        + ", ".join(
+            f"{len(keys)} valeurs de {attribute}"
+            for attribute, (keys, _, _) in blocking_index.blocks.items()
+        )
+    )
+    print(f"Temps écoulé: {time.time() - start_time:.2f} secondes")
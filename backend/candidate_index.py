@@ -0,0 +1,196 @@
+import os
+import time
+
+import numpy as np
+
+from database import csv_file_path, read_manifest, remove_manifest, write_manifest
+from normalize import normalize_name
+
+# Index inversé des trigrammes de caractères des noms du segment principal de
+# l'index TF-IDF : pour chaque trigramme, la liste triée des lignes dont la clé
+# normalisée le contient. Les lignes ajoutées depuis (segment delta) n'y sont pas.
+candidate_index_dir_path = os.path.join("..", "sources", "candidates")
+
+# À incrémenter si le format de l'index change
+CANDIDATE_INDEX_VERSION = 1
+
+OFFSETS_FILE = "offsets.npy"
+POSTINGS_FILE = "postings.npy"
+
+# Taille de base à partir de laquelle l'index est construit et utilisé à la place
+# du calcul exhaustif des similarités
+CANDIDATE_INDEX_MIN_ROWS = int(
+    os.environ.get("FSG_CANDIDATE_INDEX_MIN_ROWS", str(1_000_000))
+)
+
+# Nombre de lignes candidates rescorées par requête
+CANDIDATE_POOL = int(os.environ.get("FSG_CANDIDATE_POOL", "200"))
+
+# Nombre maximum de lignes lues dans les listes de chaque requête : les
+# trigrammes les plus rares sont lus en premier, les plus fréquents ignorés
+MAX_POSTINGS = int(os.environ.get("FSG_MAX_POSTINGS", "50000"))
+
+# Les clés normalisées ne contiennent que l'espace, a-z et 0-9
+ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+NUM_GRAMS = len(ALPHABET) ** 3
+CHAR_CODES = np.zeros(256, dtype=np.int64)
+CHAR_CODES[np.frombuffer(ALPHABET.encode("ascii"), dtype=np.uint8)] = np.arange(
+    len(ALPHABET)
+)
+
+BUILD_CHUNK = 500_000
+
+
+def name_grams(names, first_row=0):
+    # Paires (ligne, trigramme) distinctes des noms, triées par ligne puis trigramme
+    keys = [f" {normalize_name(name)} " for name in names]
+    lengths = np.array([len(key) for key in keys], dtype=np.int64)
+    codes = CHAR_CODES[np.frombuffer("".join(keys).encode("ascii"), dtype=np.uint8)]
+
+    # Un trigramme commence à chaque position sauf les deux dernières de chaque clé
+    rows = np.repeat(np.arange(len(keys), dtype=np.int64), lengths)
+    positions = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    starts = np.flatnonzero(positions < np.repeat(lengths, lengths) - 2)
+    grams = codes[starts] * len(ALPHABET) ** 2 + codes[starts + 1] * len(ALPHABET)
+    grams += codes[starts + 2]
+
+    # Tri puis suppression des répétitions (plus rapide que np.unique ici)
+    pairs = np.sort(rows[starts] * NUM_GRAMS + grams)
+    pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+    return pairs // NUM_GRAMS + first_row, pairs % NUM_GRAMS
+
+
+def query_grams(name):
+    # Une seule clé : les trigrammes sont déjà distincts et triés
+    return name_grams([name])[1]
+
+
+def build_candidate_index(
+    names, segment, index_dir=candidate_index_dir_path, chunk_size=BUILD_CHUNK
+):
+    return build_candidate_index_chunks(
+        lambda: (
+            names[start : start + chunk_size]
+            for start in range(0, len(names), chunk_size)
+        ),
+        segment,
+        index_dir,
+    )
+
+
+def build_candidate_index_chunks(
+    read_chunks, segment, index_dir=candidate_index_dir_path
+):
+    # Construction en deux passes par blocs de noms, pour borner la mémoire :
+    # comptage des lignes par trigramme, puis remplissage des listes sur disque.
+    # read_chunks() renvoie les blocs de noms successifs, relus à chaque passe.
+    os.makedirs(index_dir, exist_ok=True)
+    remove_manifest(index_dir)
+
+    counts = np.zeros(NUM_GRAMS, dtype=np.int64)
+    num_rows = 0
+    for names in read_chunks():
+        _, grams = name_grams(names, num_rows)
+        counts += np.bincount(grams, minlength=NUM_GRAMS)
+        num_rows += len(names)
+
+    offsets = np.zeros(NUM_GRAMS + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    postings = np.lib.format.open_memmap(
+        os.path.join(index_dir, POSTINGS_FILE),
+        mode="w+",
+        dtype=np.int32,
+        shape=(int(offsets[-1]),),
+    )
+
+    # Les blocs sont traités dans l'ordre : chaque liste reste triée par ligne
+    cursor = offsets[:-1].copy()
+    start = 0
+    for names in read_chunks():
+        rows, grams = name_grams(names, start)
+        order = np.argsort(grams, kind="stable")
+        rows, grams = rows[order], grams[order]
+        chunk_counts = np.bincount(grams, minlength=NUM_GRAMS)
+        group_starts = np.cumsum(chunk_counts) - chunk_counts
+        ranks = np.arange(len(grams)) - group_starts[grams]
+        postings[cursor[grams] + ranks] = rows
+        cursor += chunk_counts
+        start += len(names)
+    postings.flush()
+    del postings
+
+    np.save(os.path.join(index_dir, OFFSETS_FILE), offsets)
+    write_manifest(
+        index_dir,
+        {
+            "version": CANDIDATE_INDEX_VERSION,
+            "segment": segment,
+            "num_rows": num_rows,
+            "num_postings": int(offsets[-1]),
+        },
+    )
+    return load_candidate_index(index_dir)
+
+
+class CandidateIndex:
+    def __init__(self, offsets, postings, num_rows):
+        self.offsets = offsets
+        self.postings = postings
+        self.num_rows = num_rows
+
+    def candidates(self, query, pool=CANDIDATE_POOL, max_postings=MAX_POSTINGS):
+        # Lignes partageant le plus de trigrammes avec la requête, triées par ligne
+        grams = query_grams(query)
+        lengths = self.offsets[grams + 1] - self.offsets[grams]
+        grams, lengths = grams[lengths > 0], lengths[lengths > 0]
+        if len(grams) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Trigrammes les plus rares d'abord, dans la limite du budget de lecture
+        order = np.argsort(lengths, kind="stable")
+        grams, lengths = grams[order], lengths[order]
+        budget = np.cumsum(lengths) <= max_postings
+        budget[0] = True
+        grams, lengths = grams[budget], lengths[budget]
+
+        # Chaque trigramme commun compte d'autant plus qu'il est rare (idf)
+        rows, inverse = np.unique(
+            np.concatenate(
+                [self.postings[self.offsets[g] : self.offsets[g + 1]] for g in grams]
+            ),
+            return_inverse=True,
+        )
+        weights = np.repeat(np.log1p(self.num_rows / lengths), lengths)
+        scores = np.bincount(inverse.reshape(-1), weights=weights)
+        if len(rows) > pool:
+            # Meilleur score, puis plus petit numéro de ligne
+            rows = rows[np.argsort(-scores, kind="stable")[:pool]]
+            rows.sort()
+        return rows.astype(np.int64)
+
+
+def is_candidate_index_fresh(segment, index_dir=candidate_index_dir_path):
+    # L'index reste valable tant que le segment principal n'est pas reconstruit
+    manifest = read_manifest(index_dir)
+    return (
+        manifest is not None
+        and manifest.get("version") == CANDIDATE_INDEX_VERSION
+        and manifest.get("segment") == segment
+    )
+
+
+def load_candidate_index(index_dir=candidate_index_dir_path):
+    offsets = np.load(os.path.join(index_dir, OFFSETS_FILE))
+    # Les listes restent sur disque, lues à la demande
+    postings = np.load(os.path.join(index_dir, POSTINGS_FILE), mmap_mode="r")
+    return CandidateIndex(offsets, postings, read_manifest(index_dir)["num_rows"])
+
+
+if __name__ == "__main__":
+    # Import local : tfidf_index utilise ce module
+    from tfidf_index import load_or_build_index
+
+    start_time = time.time()
+    index = load_or_build_index(csv_file_path, candidate_min_rows=0)
+    print(f"Index à jour : {len(index.candidate_index.postings)} entrées.")
+    print(f"Temps écoulé: {time.time() - start_time:.2f} secondes")
@@ -0,0 +1,196 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from database import csv_stamp
+from matcher import MatchResults
+
+# Journaux des exécutions en cours, un fichier JSON Lines par exécution
+runs_dir_path = os.path.join("..", "sources", "runs")
+
+# À incrémenter si le format des enregistrements change
+JOURNAL_VERSION = 3
+
+
+def encode_matches(matches):
+    return {field: getattr(matches, field).tolist() for field in MatchResults._fields}
+
+
+def decode_matches(data):
+    return MatchResults(
+        best_rows=np.array(data["best_rows"], dtype=np.int64),
+        best_scores=np.array(data["best_scores"], dtype=np.float64),
+        candidate_rows=np.array(data["candidate_rows"], dtype=np.int64),
+        candidate_scores=np.array(data["candidate_scores"], dtype=np.float64),
+        auto_matched=np.array(data["auto_matched"], dtype=bool),
+        exact_matched=np.array(data["exact_matched"], dtype=bool),
+        alias_matched=np.array(data["alias_matched"], dtype=bool),
+        alias_rejected=np.array(data["alias_rejected"], dtype=bool),
+        domain_matched=np.array(data["domain_matched"], dtype=bool),
+    )
+
+
+def read_records(path):
+    # Une ligne tronquée par un arrêt brutal est ignorée, ainsi que la suite ;
+    # renvoie aussi la longueur de la partie valide du fichier
+    records = []
+    valid_length = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                break
+            valid_length += len(line)
+    return records, valid_length
+
+
+class RunJournal:
+    # Journal en ajout seul d'une exécution : entrées dédoublonnées, résultats du
+    # rapprochement, choix de l'utilisateur et réponses des recherches web. Chaque
+    # enregistrement est écrit sur disque dès qu'il est connu.
+    def __init__(self, path, records=()):
+        self.path = path
+        self.header = None
+        self.queries = None
+        self.attributes = None
+        self.num_submitted = None
+        self.matches = None
+        self.matches_database = None
+        self.choices = {}
+        self.web_rows = {}
+        self.finished = False
+        for record in records:
+            self.apply(record)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def apply(self, record):
+        kind = record["type"]
+        if kind == "start":
+            self.header = record
+        elif kind == "inputs":
+            self.queries = record["queries"]
+            self.attributes = record["attributes"]
+            self.num_submitted = record["num_submitted"]
+        elif kind == "matches":
+            self.matches = decode_matches(record["matches"])
+            self.matches_database = record["database"]
+        elif kind == "choice":
+            result = tuple(record["result"])
+            # Journaux antérieurs : choix sans position dans la base
+            self.choices[record["query"]] = result + (-1,) * (4 - len(result))
+        elif kind == "web":
+            self.web_rows[record["query"]] = record["row_data"]
+        elif kind == "done":
+            self.finished = True
+
+    def append(self, record):
+        self.apply(record)
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record_inputs(self, queries, attributes, num_submitted):
+        self.append(
+            {
+                "type": "inputs",
+                "queries": queries,
+                "attributes": attributes,
+                "num_submitted": num_submitted,
+            }
+        )
+
+    def record_matches(self, matches, csv_path):
+        # Les positions ne valent que pour cette version de la base
+        self.append(
+            {
+                "type": "matches",
+                "database": csv_stamp(csv_path),
+                "matches": encode_matches(matches),
+            }
+        )
+
+    def matches_for(self, csv_path):
+        # Résultats du rapprochement, sauf si la base a changé depuis
+        if self.matches is not None and self.matches_database == csv_stamp(csv_path):
+            return self.matches
+        return None
+
+    def record_choice(self, query, result):
+        # result : (raison sociale, score, source, position dans la base) ; la
+        # position n'est reprise que si la base porte toujours ce nom à cet endroit
+        self.append(
+            {
+                "type": "choice",
+                "query": query,
+                "result": [str(result[0]), float(result[1]), result[2], int(result[3])],
+            }
+        )
+
+    def record_web_result(self, result):
+        self.append(
+            {
+                "type": "web",
+                "query": result.query,
+                "status": result.status,
+                "row_data": result.row_data,
+            }
+        )
+
+    def finish(self, file_path):
+        self.append({"type": "done", "file": file_path})
+
+    def close(self):
+        self.file.close()
+
+
+def new_journal(mode, source=None, directory=runs_dir_path):
+    os.makedirs(directory, exist_ok=True)
+    name = f"{mode}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}.jsonl"
+    journal = RunJournal(os.path.join(directory, name))
+    journal.append(
+        {"type": "start", "version": JOURNAL_VERSION, "mode": mode, "source": source}
+    )
+    return journal
+
+
+def find_unfinished(mode, source=None, directory=runs_dir_path):
+    # Journal le plus récent d'une exécution interrompue du même mode (et de la
+    # même liste d'entrée en traitement par lot)
+    for path in sorted(glob.glob(os.path.join(directory, f"{mode}_*.jsonl")))[::-1]:
+        records, _ = read_records(path)
+        if not records or records[0].get("version") != JOURNAL_VERSION:
+            continue
+        if records[0].get("source") != source:
+            continue
+        if records[-1]["type"] != "done":
+            return path
+    return None
+
+
+def open_journal(mode, resume=None, source=None, directory=runs_dir_path):
+    # resume : None (nouvelle exécution), "latest" (dernière exécution interrompue)
+    # ou chemin d'un journal
+    if resume is not None:
+        path = (
+            find_unfinished(mode, source, directory) if resume == "latest" else resume
+        )
+        if path is None:
+            print("Aucune exécution interrompue à reprendre, nouvelle exécution.")
+        else:
+            records, valid_length = read_records(path)
+            # La fin tronquée est retirée avant d'ajouter de nouveaux enregistrements
+            with open(path, "r+b") as f:
+                f.truncate(valid_length)
+            journal = RunJournal(path, records)
+            if not journal.finished:
+                print(f"Reprise de l'exécution enregistrée dans {path}")
+                return journal
+            journal.close()
+            print(f"L'exécution de {path} est terminée, nouvelle exécution.")
+    return new_journal(mode, source, directory)
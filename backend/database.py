@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+# Chemin du fichier CSV de la base de données FSG
+csv_file_path = os.path.join("..", "sources", "database.csv")
+
+# Copie en colonnes (Parquet) de la base, régénérée quand le CSV change
+snapshot_dir_path = os.path.join("..", "sources", "snapshot")
+
+# À incrémenter si le format de la copie change
+SNAPSHOT_VERSION = 1
+
+# Vectoriseur de l'index TF-IDF (voir tfidf_index.py). En mode "hashing", la base
+# est plus grande que la mémoire : elle n'est lue que par blocs de lignes.
+VECTORIZER_MODE = os.environ.get("FSG_VECTORIZER", "vocabulary")
+HASHING_CHUNK_ROWS = int(os.environ.get("FSG_HASHING_CHUNK_ROWS", "200000"))
+
+# Lignes lues par bloc pour les fichiers dérivés du CSV (copie en colonnes, index
+# de blocage) ; None : base lue d'un seul tenant
+READ_CHUNK_ROWS = HASHING_CHUNK_ROWS if VECTORIZER_MODE == "hashing" else None
+
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_FILE = "database.parquet"
+
+# Colonnes lues comme du texte pour conserver les zéros de tête (SIRET, téléphone...)
+DTYPES = {
+    "Effectifs société": str,
+    "SIRET": str,
+    "SIREN": str,
+    "Adresse 1": str,
+    "Adresse 2": str,
+    "Ville": str,
+    "Standard": str,
+    "Privé_Public": str,
+    "SBF120_ETI_MID MARKET": str,
+    "Nom de domaine": str,
+    "Segment": str,
+    "Population": str,
+    "Département": str,
+    "Région": str,
+    "Code activité": str,
+    "Libellé activité": str,
+    "Activité": str,
+    "Groupe": str,
+    "Tranche effectif société": str,
+    "Effectifs consolidés": str,
+    "Téléphone siège": str,
+    "Company": str,
+}
+
+# Colonnes à faible nombre de valeurs distinctes, stockées en dictionnaire
+CATEGORY_COLUMNS = [
+    "Région",
+    "Département",
+    "Segment",
+    "Privé_Public",
+    "Tranche effectif société",
+    "SBF120_ETI_MID MARKET",
+    "Population",
+]
+
+
+def file_sha256(path):
+    # Empreinte du contenu du fichier, lue par blocs pour borner la mémoire
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def csv_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"csv_size": stat.st_size, "csv_mtime_ns": stat.st_mtime_ns}
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(directory, manifest):
+    # Écriture atomique : le manifeste valide les fichiers, il est écrit en dernier
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def remove_manifest(directory):
+    # Invalide les fichiers dérivés pendant leur réécriture
+    try:
+        os.remove(os.path.join(directory, MANIFEST_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def new_manifest(csv_path, version, **extra):
+    manifest = {"version": version, "csv_sha256": file_sha256(csv_path)}
+    manifest.update(csv_stamp(csv_path))
+    manifest.update(extra)
+    return manifest
+
+
+def is_up_to_date(csv_path, directory, version):
+    # Les fichiers dérivés du CSV (copie en colonnes, index) sont à jour si leur
+    # manifeste correspond au CSV : taille et date d'abord, contenu sinon
+    manifest = read_manifest(directory)
+    if not manifest or manifest.get("version") != version:
+        return False
+
+    stamp = csv_stamp(csv_path)
+    if all(manifest.get(key) == value for key, value in stamp.items()):
+        return True
+
+    # Date de modification différente : on compare le contenu avant de reconstruire
+    if manifest.get("csv_sha256") != file_sha256(csv_path):
+        return False
+    manifest.update(stamp)
+    write_manifest(directory, manifest)
+    return True
+
+
+def read_csv(csv_path=csv_file_path, columns=None):
+    # Lecture des colonnes du fichier CSV "BDD FLEET" (toutes par défaut)
+    return pd.read_csv(csv_path, usecols=columns, dtype=DTYPES, low_memory=False)
+
+
+def iter_csv_chunks(csv_path, columns, chunk_rows):
+    # Lecture du CSV par blocs de lignes, pour les traitements en mémoire bornée
+    return pd.read_csv(csv_path, usecols=columns, dtype=DTYPES, chunksize=chunk_rows)
+
+
+def categorize(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def write_snapshot_chunks(csv_path, path, chunk_rows):
+    # pyarrow n'est importé que pour l'écriture par blocs ; la lecture passe par
+    # pandas
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Le schéma est fixé par le premier bloc. Les dictionnaires des colonnes
+    # catégorielles sont indexés sur 32 bits pour accueillir les valeurs des blocs
+    # suivants ; un entier manquant dans un bloc est écrit comme valeur nulle.
+    writer = None
+    num_rows = 0
+    try:
+        for chunk in iter_csv_chunks(csv_path, None, chunk_rows):
+            chunk = categorize(chunk)
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                for i, field in enumerate(schema):
+                    if pa.types.is_dictionary(field.type):
+                        value_type = pa.dictionary(pa.int32(), field.type.value_type)
+                        schema = schema.set(i, field.with_type(value_type))
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            )
+            num_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # CSV sans ligne : copie vide
+        categorize(read_csv(csv_path)).to_parquet(path, engine="pyarrow", index=False)
+    return num_rows
+
+
+def build_snapshot(
+    csv_path=csv_file_path, snapshot_dir=snapshot_dir_path, chunk_rows=None
+):
+    # chunk_rows : CSV lu et copie écrite par blocs de lignes, en mémoire bornée
+    os.makedirs(snapshot_dir, exist_ok=True)
+    remove_manifest(snapshot_dir)
+
+    path = os.path.join(snapshot_dir, SNAPSHOT_FILE)
+    if chunk_rows:
+        num_rows = write_snapshot_chunks(csv_path, path + ".tmp", chunk_rows)
+    else:
+        df = categorize(read_csv(csv_path))
+        df.to_parquet(path + ".tmp", engine="pyarrow", index=False)
+        num_rows = len(df)
+    os.replace(path + ".tmp", path)
+    write_manifest(
+        snapshot_dir, new_manifest(csv_path, SNAPSHOT_VERSION, num_rows=num_rows)
+    )
+
+
+def ensure_snapshot(
+    csv_path=csv_file_path,
+    snapshot_dir=snapshot_dir_path,
+    chunk_rows=READ_CHUNK_ROWS,
+):
+    if not is_up_to_date(csv_path, snapshot_dir, SNAPSHOT_VERSION):
+        print("Conversion de la base de données au format colonnes...")
+        build_snapshot(csv_path, snapshot_dir, chunk_rows)
+    return os.path.join(snapshot_dir, SNAPSHOT_FILE)
+
+
+def load_database(csv_path=csv_file_path, columns=None, snapshot_dir=snapshot_dir_path):
+    # Lecture depuis la copie en colonnes : seules les colonnes demandées sont lues
+    path = ensure_snapshot(csv_path, snapshot_dir)
+    return pd.read_parquet(path, columns=columns, engine="pyarrow")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    ensure_snapshot()
+    print(f"Copie en colonnes à jour. Temps écoulé: {time.time() - start_time:.2f} s")
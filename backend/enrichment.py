@@ -0,0 +1,367 @@
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import http_client
+from metrics import run_metrics
+from response_cache import get_cache, normalize_query
+from sirene import get_sirene_store
+
+# URL des fournisseurs, surchargeables pour viser un faux serveur local
+SERPAPI_URL = os.environ.get("SERPAPI_URL", "https://serpapi.com")
+PAPPERS_URL = os.environ.get("PAPPERS_URL", "https://api.pappers.fr")
+
+# Champs demandés à Pappers lorsque la base SIRENE locale ne les fournit pas.
+# Vide par défaut : Pappers n'est appelé que pour les entreprises absentes de la
+# base locale. "chiffre_affaires" (absent des fichiers SIRENE) coûte un appel
+# Pappers par entreprise trouvée.
+PAPPERS_FIELDS = [
+    field.strip()
+    for field in os.environ.get("FSG_PAPPERS_FIELDS", "").split(",")
+    if field.strip()
+]
+
+# Nombre de recherches web menées en parallèle
+ENRICHMENT_WORKERS = int(os.environ.get("ENRICHMENT_WORKERS", "8"))
+
+
+class ProviderLimiter:
+    # Limite le nombre d'appels simultanés et le débit vers un fournisseur ; le
+    # client HTTP la prend pour chaque tentative, nouvelles tentatives comprises
+    def __init__(self, max_concurrency, max_per_second):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.interval = 1.0 / max_per_second if max_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        if self.interval:
+            # Chaque appel réserve le prochain créneau libre avant de partir
+            with self.lock:
+                now = time.monotonic()
+                slot = max(now, self.next_slot)
+                self.next_slot = slot + self.interval
+            time.sleep(max(0.0, slot - now))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.semaphore.release()
+
+
+provider_limiters = {
+    "serpapi": ProviderLimiter(
+        int(os.environ.get("SERPAPI_CONCURRENCY", "4")),
+        float(os.environ.get("SERPAPI_RATE", "5")),
+    ),
+    "pappers": ProviderLimiter(
+        int(os.environ.get("PAPPERS_CONCURRENCY", "4")),
+        float(os.environ.get("PAPPERS_RATE", "5")),
+    ),
+}
+
+# Résultat de la recherche web d'une entreprise non trouvée dans la base
+WebResult = namedtuple("WebResult", ["query", "status", "siret", "row_data"])
+
+FOUND = "Trouvé"
+SIRET_ONLY = "SIRET trouvé, mais pas d'informations supplémentaires"
+NOT_FOUND = "Non trouvé"
+# Erreur réseau : la recherche est à refaire lors d'une reprise
+FAILED = "Échec de la recherche"
+
+# SIRET cité dans un extrait de résultat ("SIRET : 123 456 789 00012")
+SIRET_PATTERN = re.compile(
+    r"SIRET\s*:?\s*(\d{3}\s?\d{3}\s?\d{3}\s?\d{5})\b", re.IGNORECASE
+)
+
+# Annuaires d'entreprises : leurs pages donnent le SIRET mais ne sont pas le site
+# de l'entreprise
+DIRECTORY_DOMAINS = [
+    "societe.com",
+    "verif.com",
+    "pappers.fr",
+    "infogreffe.fr",
+    "annuaire-entreprises.data.gouv.fr",
+    "manageo.fr",
+    "corporama.com",
+    "entreprises.lefigaro.fr",
+]
+
+# Compteur du rapport d'exécution par statut de recherche web
+STATUS_COUNTERS = {
+    FOUND: "web_found",
+    SIRET_ONLY: "web_siret_only",
+    NOT_FOUND: "web_not_found",
+    FAILED: "web_errors",
+}
+
+
+def get_company_info(siret, metrics=run_metrics):
+    # Base SIRENE locale d'abord, sans réseau ; Pappers seulement pour une
+    # entreprise absente de la base locale, ou pour les champs de PAPPERS_FIELDS
+    # qu'elle ne fournit pas
+    store = get_sirene_store()
+    info = store.lookup(siret) if store is not None else None
+    metrics.increment("sirene_found" if info is not None else "sirene_missing")
+    missing = [field for field in PAPPERS_FIELDS if info and info.get(field) is None]
+    if info is not None and not missing:
+        return info
+
+    # Un échec Pappers peut être passager : il n'est pas mis en cache
+    pappers_info = get_cache().fetch(
+        "pappers", siret, lambda: get_pappers_info(siret), cache_none=False
+    )
+    if info is None:
+        return pappers_info
+    if pappers_info:
+        info.update(
+            {
+                field: value
+                for field, value in pappers_info.items()
+                if info.get(field) is None
+            }
+        )
+    return info
+
+
+def get_pappers_info(siret):
+    # Clé d'API Pappers
+    api_token = "PAPPERS_KEY"
+
+    # Paramètres de la requête
+    params = {"api_token": api_token, "siret": siret}
+
+    # URL de l'API Pappers
+    url = f"{PAPPERS_URL}/v2/entreprise"
+
+    # Envoi de la requête GET à l'API
+    response = http_client.get(
+        url, params=params, provider="pappers", limiter=provider_limiters["pappers"]
+    )
+
+    if response.status_code == 200:
+        # Conversion de la réponse JSON en objet Python
+        data = response.json()
+        siege = data.get("siege") or {}
+
+        # Récupération des informations de l'entreprise
+        info = {
+            "siret": siret,
+            "siren": data.get("siren"),
+            "code_naf": data.get("code_naf"),
+            "activite": data.get("domaine_activite"),
+            "libelle_code_naf": data.get("libelle_code_naf"),
+            "date_creation": data.get("date_creation"),
+            "entreprise_cessee": data.get("entreprise_cessee"),
+            "date_cessation": data.get("date_cessation"),
+            "effectif": data.get("effectif_max"),
+            "tranche_effectif": data.get("effectif"),
+            "enseigne": data.get("enseigne"),
+            "denomination": data.get("denomination"),
+            "chiffre_affaires": data.get("chiffre_affaires_max"),
+            "adresse_1": siege.get("adresse_ligne_1"),
+            "adresse_2": siege.get("adresse_ligne_2"),
+            "code_postal": siege.get("code_postal"),
+            "ville": siege.get("ville"),
+        }
+
+        return info
+    else:
+        print("La requête a échoué avec le code de statut :", response.status_code)
+        return None
+
+
+def search_url(company):
+    # Une seule recherche par entreprise : les résultats donnent à la fois le site,
+    # le téléphone et, dans les extraits des annuaires, le SIRET
+    company_encoded = urllib.parse.quote(f"{company} siret")
+    return f"{SERPAPI_URL}/search.json?engine=google&q={company_encoded}&location=France&google_domain=google.fr&gl=fr&hl=fr&num=10&api_key=SERPAPI_KEY"
+
+
+def extract_siret(organic_results):
+    # Premier SIRET cité dans les titres et extraits des résultats, dans l'ordre
+    for result in organic_results:
+        for field in ["snippet", "title"]:
+            match = SIRET_PATTERN.search(result.get(field) or "")
+            if match:
+                return re.sub(r"\D", "", match.group(1))
+    return None
+
+
+def is_directory(url):
+    host = urllib.parse.urlsplit(url).hostname or ""
+    return any(
+        host == domain or host.endswith("." + domain) for domain in DIRECTORY_DOMAINS
+    )
+
+
+def get_info(company):
+    response = http_client.get(
+        search_url(company), provider="serpapi", limiter=provider_limiters["serpapi"]
+    )
+    response.raise_for_status()
+    data = json.loads(response.text)
+    organic_results = data.get("organic_results") or []
+
+    # Site de l'entreprise : premier résultat qui n'est pas un annuaire
+    first_result_url = next(
+        (
+            result["link"]
+            for result in organic_results
+            if "link" in result and not is_directory(result["link"])
+        ),
+        "Non disponible",
+    )
+
+    # Vérifier si 'knowledge_graph' existe dans les données
+    if "knowledge_graph" in data and "téléphone" in data["knowledge_graph"]:
+        # Trouver le numéro de téléphone sur la fiche Google
+        phone_number = data["knowledge_graph"]["téléphone"]
+    elif (
+        "local_results" in data
+        and "places" in data["local_results"]
+        and len(data["local_results"]["places"]) > 0
+    ):
+        # Trouver le numéro de téléphone dans les résultats locaux
+        place = data["local_results"]["places"][0]
+        phone_number = place.get("phone", "Non disponible")
+    else:
+        phone_number = "Non disponible"
+
+    return first_result_url, phone_number, extract_siret(organic_results)
+
+
+def build_web_row(query, first_result_url, phone_number, info):
+    # Ligne de résultat d'une entreprise trouvée sur le Web, dans l'ordre de headers
+    tranche_effectif = info.get("tranche_effectif")
+    # Code NAF avec ou sans point selon la source (Pappers, SIRENE)
+    if (info.get("code_naf") or "").replace(".", "") == "6420Z":
+        tranche_effectif = (
+            (tranche_effectif + " (Holding)") if tranche_effectif else "Holding"
+        )
+    return [
+        query,
+        "Web",
+        info.get("denomination"),
+        "",
+        first_result_url,
+        info.get("effectif"),
+        tranche_effectif,
+        info.get("activite"),
+        info.get("code_naf"),
+        info.get("libelle_code_naf"),
+        info.get("siret"),
+        info.get("siren"),
+        "",
+        info.get("adresse_1"),
+        info.get("adresse_2"),
+        info.get("code_postal"),
+        info.get("ville"),
+        "",
+        "",
+        "",
+        "",
+        info.get("chiffre_affaires"),
+        "",
+        "",
+        "",
+        phone_number,
+    ]
+
+
+def enrich_company(query, metrics=run_metrics):
+    # Chaîne de recherche d'une entreprise : moteur de recherche (site, téléphone et
+    # SIRET en un appel), puis base SIRENE locale et Pappers.
+    # Les réponses déjà obtenues lors d'une exécution précédente sont relues du cache.
+    cache = get_cache()
+    key = normalize_query(query)
+    first_result_url, phone_number, siret = cache.fetch(
+        "serpapi_search",
+        key,
+        lambda: get_info(query),
+        default=("Non disponible", "Non disponible", None),
+    )
+    if not siret:
+        return WebResult(query, NOT_FOUND, None, [query, "NA"])
+
+    info = get_company_info(siret, metrics)
+    if not info:
+        row_data = [query, "Web"] + [""] * 8 + [siret]
+        return WebResult(query, SIRET_ONLY, siret, row_data)
+
+    row_data = build_web_row(query, first_result_url, phone_number, info)
+    return WebResult(query, FOUND, siret, row_data)
+
+
+def safe_enrich_company(query, metrics=run_metrics):
+    try:
+        return enrich_company(query, metrics)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Une erreur réseau ne doit pas interrompre les autres recherches
+        print(f"La recherche web pour '{query}' a échoué :", e)
+        return WebResult(query, FAILED, None, [query, "NA"])
+
+
+def enrich_companies(queries, max_workers=ENRICHMENT_WORKERS, metrics=run_metrics):
+    # Recherches web menées en parallèle ; chaque requête garde sa chaîne
+    # d'appels dépendants. Les résultats sont rendus au fil de l'eau.
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(safe_enrich_company, query, metrics) for query in queries
+        ]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                metrics.increment(STATUS_COUNTERS[result.status])
+                yield result
+        finally:
+            # Interruption (Ctrl-C) : les recherches pas encore lancées sont
+            # abandonnées au lieu d'être payées sans être enregistrées
+            for future in futures:
+                future.cancel()
+
+
+def print_web_result(result, current, total):
+    print(
+        f"\nStatut de la recherche pour '{result.query}': {result.status} {current}/{total}"
+    )
+    if result.status == FOUND:
+        print(f"  - SIRET: {result.siret}")
+        print(f"  - Raison Sociale: {result.row_data[2]}")
+        print(f"  - Nom de Domaine: {result.row_data[4]}")
+        print(f"  - Téléphone: {result.row_data[25]}")
+    print("\n______________________________\n")
+
+
+def search_companies(queries, journal=None):
+    # Recherche web des entreprises non trouvées, avec suivi de l'avancement ;
+    # renvoie les lignes de résultat par requête. Les résultats déjà enregistrés
+    # dans le journal d'une exécution interrompue sont repris sans nouvel appel.
+    web_rows = {}
+    if journal is not None:
+        web_rows = {q: journal.web_rows[q] for q in queries if q in journal.web_rows}
+        if web_rows:
+            print(f"{len(web_rows)} recherches web reprises du journal")
+    remaining = [query for query in queries if query not in web_rows]
+    if not remaining:
+        return web_rows
+
+    print("\n====== RECHERCHES WEB ======")
+    with run_metrics.stage("web_search"):
+        for count, web_result in enumerate(enrich_companies(remaining), start=1):
+            print_web_result(web_result, count, len(remaining))
+            web_rows[web_result.query] = web_result.row_data
+            if journal is not None and web_result.status != FAILED:
+                journal.record_web_result(web_result)
+
+    print("Appels aux services web :")
+    http_client.print_summary()
+    get_cache().print_summary()
+    return web_rows
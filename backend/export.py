@@ -0,0 +1,347 @@
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from matcher import NO_MATCH
+
+# Colonnes du fichier de résultats
+headers = [
+    "Entrée",
+    "Source",
+    "Raison sociale",
+    "Groupe",
+    "Nom de domaine",
+    "Effectifs société",
+    "Tranche effectif société",
+    "Activité",
+    "Code activité",
+    "Libellé activité",
+    "SIRET",
+    "SIREN",
+    "Privé_Public",
+    "Adresse 1",
+    "Adresse 2",
+    "Code postal",
+    "Ville",
+    "Département",
+    "Région",
+    "Tranche effectif société consolidés",
+    "Effectifs consolidés",
+    "Chiffre d'affaires consolidé",
+    "Nombre d'établissements",
+    "SBF_120_ETI_MID MARKET",
+    "Standard",
+    "Téléphone siège",
+    "Segment",
+    "Population",
+    "Entreprise_cessee",
+]
+
+# Colonnes de la base reprises pour une entreprise trouvée, dans l'ordre de
+# headers après l'entrée, la source et la raison sociale
+database_columns = [
+    "Groupe",
+    "Nom de domaine",
+    "Effectifs société",
+    "Tranche effectif société",
+    "Activité",
+    "Code activité",
+    "Libellé activité",
+    "SIRET",
+    "SIREN",
+    "Privé_Public",
+    "Adresse 1",
+    "Adresse 2",
+    "Code postal",
+    "Ville",
+    "Département",
+    "Région",
+    "Tranche effectif société",
+    "Effectifs consolidés",
+    "Chiffre d'affaires consolidé",
+    "Nombre d'établissements",
+    "SBF120_ETI_MID MARKET",
+    "Standard",
+    "Téléphone siège",
+    "Segment",
+    "Population",
+]
+
+# Colonnes à lire dans la base pour l'export
+export_column_names = list(dict.fromkeys(database_columns))
+
+# Format du fichier de résultats : "xlsx" (Excel) ou "csv"
+EXPORT_FORMAT = os.environ.get("FSG_EXPORT_FORMAT", "xlsx")
+
+# Lignes et colonnes affichées dans la console à la fin d'une recherche
+PREVIEW_ROWS = int(os.environ.get("FSG_PREVIEW_ROWS", "20"))
+PREVIEW_COLUMNS = ["Entrée", "Source", "Raison sociale", "SIRET", "Ville"]
+
+
+def build_company_index(df):
+    # Position de la première ligne de la base pour chaque valeur de "Company"
+    companies = df["Company"].reset_index(drop=True).dropna().drop_duplicates()
+    return dict(zip(companies.to_numpy(), companies.index.to_numpy()))
+
+
+def choice_row(names, company_index, choice):
+    # Position de l'entreprise choisie (choice : raison sociale, score, source,
+    # position) : la ligne de l'option retenue si la base porte toujours ce nom à
+    # cette position, la première ligne de ce nom sinon (base modifiée depuis)
+    company, row = choice[0], choice[3]
+    if 0 <= row < len(names) and str(names[row]) == company:
+        return row
+    return company_index.get(company, -1)
+
+
+def build_database_rows(df, queries, results):
+    # Lignes de résultat des entreprises trouvées dans la base : les positions
+    # connues du rapprochement sont lues en une seule fois, sans parcourir la base.
+    # results : tuples (raison sociale, score, source, position dans la base)
+    positions = np.array([result[3] for result in results], dtype=np.int64)
+    found = positions >= 0
+
+    values = np.full((len(results), len(database_columns)), "", dtype=object)
+    if found.any():
+        extracted = df.take(positions[found])[database_columns]
+        values[found] = extracted.to_numpy(dtype=object)
+        standard = database_columns.index("Standard")
+        values[found, standard] = [
+            str(value).zfill(10) for value in values[found, standard]
+        ]
+
+    return [
+        [query, result[2], result[0]] + row + [""]
+        for query, result, row in zip(queries, results, values.tolist())
+    ]
+
+
+# Source d'une entreprise écartée par un choix déjà fait (alias « aucune
+# correspondance ») : elle n'est pas recherchée sur le Web
+REJECTED_SOURCE = "alias"
+
+
+def web_search_queries(queries, final_results):
+    # Entreprises à rechercher sur le Web : sans correspondance dans la base et
+    # non écartées par un choix déjà fait
+    return [
+        query
+        for query, result in zip(queries, final_results)
+        if result[1] <= 0 and result[2] != REJECTED_SOURCE
+    ]
+
+
+def iter_table_rows(df, queries, final_results, web_rows, chunk_size=10_000):
+    # final_results : tuples (raison sociale, score, source, position dans la base) ;
+    # un score nul renvoie à la ligne issue de la recherche web (web_rows), sauf
+    # pour une entreprise écartée par un alias. Les
+    # lignes sont assemblées par blocs et rendues une à une, dans l'ordre des
+    # requêtes, pour être écrites au fil de l'eau.
+    for start in range(0, len(queries), chunk_size):
+        chunk_queries = queries[start : start + chunk_size]
+        chunk_results = final_results[start : start + chunk_size]
+        found = [result[1] > 0 for result in chunk_results]
+        database_rows = iter(
+            build_database_rows(
+                df,
+                [query for query, is_found in zip(chunk_queries, found) if is_found],
+                [result for result, is_found in zip(chunk_results, found) if is_found],
+            )
+        )
+        for query, result, is_found in zip(chunk_queries, chunk_results, found):
+            if is_found:
+                row_data = next(database_rows)
+            elif result[2] == REJECTED_SOURCE:
+                row_data = [query, REJECTED_SOURCE, NO_MATCH]
+            else:
+                row_data = web_rows[query]
+            yield row_data + [""] * (len(headers) - len(row_data))
+
+
+def build_table_data(df, queries, final_results, web_rows):
+    return list(iter_table_rows(df, queries, final_results, web_rows))
+
+
+def cell_value(value):
+    # Valeur écrite dans une cellule : vide pour une valeur manquante, type Python
+    # natif pour les scalaires NumPy
+    if isinstance(value, str):
+        return value
+    if value is None or value is pd.NA or value is pd.NaT:
+        return ""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return ""
+    return value
+
+
+class CsvRowWriter:
+    def __init__(self, file_path, append=False):
+        exists = append and os.path.exists(file_path)
+        self.file = open(
+            file_path, "a" if exists else "w", newline="", encoding="utf-8"
+        )
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(headers)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxRowWriter:
+    # Vrai fichier Excel écrit ligne par ligne : en mode "constant_memory", chaque
+    # ligne est envoyée sur disque dès que la suivante commence
+    def __init__(self, file_path, append=False):
+        import xlsxwriter
+
+        self.file_path = file_path
+        # Un fichier Excel ne se complète pas sur place : en ajout, ses lignes sont
+        # recopiées dans un nouveau fichier qui le remplace à la fermeture
+        self.existing = file_path if append and os.path.exists(file_path) else None
+        self.output_path = file_path + ".tmp" if self.existing else file_path
+        # Les valeurs saisies sont écrites telles quelles : ni formule ("=..."),
+        # ni lien hypertexte (plafonnés à 65 530 par feuille)
+        self.workbook = xlsxwriter.Workbook(
+            self.output_path,
+            {
+                "constant_memory": True,
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+            },
+        )
+        self.worksheet = self.workbook.add_worksheet("Résultats")
+        self.worksheet.write_row(
+            0, 0, headers, self.workbook.add_format({"bold": True})
+        )
+        self.worksheet.freeze_panes(1, 0)
+        self.next_row = 1
+        if self.existing:
+            for row in read_xlsx_rows(self.existing):
+                self.write_row([cell_value(value) for value in row])
+
+    def write_row(self, row):
+        self.worksheet.write_row(self.next_row, 0, row)
+        self.next_row += 1
+
+    def close(self):
+        self.workbook.close()
+        if self.existing:
+            os.replace(self.output_path, self.file_path)
+
+
+def read_xlsx_rows(file_path):
+    # Lecture en continu (mode lecture seule) des lignes d'un fichier de résultats
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        for row in rows:
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+class ResultWriter:
+    # Écriture des lignes de résultat au fil de l'eau, au format CSV ou Excel selon
+    # l'extension du fichier. Seuls un aperçu borné et le décompte des lignes par
+    # source sont gardés en mémoire pour l'affichage final.
+    def __init__(self, file_path, append=False, preview_rows=PREVIEW_ROWS):
+        self.file_path = file_path
+        if file_path.lower().endswith(".xlsx"):
+            self.writer = XlsxRowWriter(file_path, append)
+        else:
+            self.writer = CsvRowWriter(file_path, append)
+        self.preview_rows = preview_rows
+        self.preview = []
+        self.source_counts = {}
+        self.num_rows = 0
+
+    def write(self, row_data):
+        row = [cell_value(value) for value in row_data]
+        row += [""] * (len(headers) - len(row))
+        self.writer.write_row(row)
+        self.num_rows += 1
+        source = row[1] or "NA"
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        if len(self.preview) < self.preview_rows:
+            self.preview.append(row)
+
+    def write_rows(self, rows):
+        for row_data in rows:
+            self.write(row_data)
+        return self
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def result_file_path(directory=None, file_name=None, file_format=EXPORT_FORMAT):
+    # Spécifier le chemin d'accès pour enregistrer le fichier Excel sur le bureau de l'utilisateur
+    if directory is None:
+        directory = os.getcwd()
+
+    # Générer un nom de fichier avec la date et l'heure actuelles
+    if file_name is None:
+        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        file_name = f"Recherche_BDD_{current_time}.{file_format}"
+    return os.path.join(directory, file_name)
+
+
+def export_results(rows, directory=None, file_name=None, file_format=EXPORT_FORMAT):
+    # rows : lignes de résultat (liste ou générateur), écrites au fil de l'eau ;
+    # renvoie le ResultWriter fermé (chemin, aperçu et décompte des lignes)
+    with ResultWriter(result_file_path(directory, file_name, file_format)) as writer:
+        writer.write_rows(rows)
+    return writer
+
+
+def append_results(rows, file_path):
+    # Ajout de lignes à un fichier de résultats existant, sans réécrire l'en-tête
+    with ResultWriter(file_path, append=True) as writer:
+        writer.write_rows(rows)
+    return writer
+
+
+def truncate_string(s, max_length):
+    return (s[: max_length - 3] + "...") if len(s) > max_length else s
+
+
+def print_results_preview(writer, max_length=30):
+    # Aperçu des premières lignes (quelques colonnes) et décompte par source, au
+    # lieu du tableau complet : l'affichage reste borné quelle que soit la taille
+    # tabulate n'est importé que pour l'affichage, pas par les autres usages du module
+    from tabulate import tabulate
+
+    print("\n====== RESULTATS ======\n")
+    if not writer.num_rows:
+        print("Aucune donnée à afficher.")
+        return
+
+    columns = [headers.index(name) for name in PREVIEW_COLUMNS]
+    preview = [
+        [truncate_string(str(row[i]), max_length) for i in columns]
+        for row in writer.preview
+    ]
+    print(tabulate(preview, PREVIEW_COLUMNS, tablefmt="simple"))
+    if writer.num_rows > len(preview):
+        print(f"... {writer.num_rows - len(preview)} autres lignes dans le fichier")
+    print()
+    print(f"{writer.num_rows} lignes enregistrées :")
+    for source, count in writer.source_counts.items():
+        print(f"  - {source} : {count}")
+    print()
@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+from scipy import sparse
+
+# Nombre de colonnes de l'espace de hachage : les mots de la base y sont répartis
+# sans vocabulaire, quelques collisions entre mots rares étant sans effet notable
+HASHING_FEATURES = int(os.environ.get("FSG_HASHING_FEATURES", str(2**22)))
+
+# Tableaux CSR de la matrice écrite sur disque, et leur type
+MATRIX_ARRAYS = {"data": np.float32, "indices": np.int32, "indptr": np.int64}
+
+
+def tfidf_weights(data, indices, row_lengths, idf):
+    # Pondération TF-IDF puis normalisation L2 de chaque ligne, comme
+    # TfidfVectorizer (norm="l2"), sur les tableaux d'un bloc de lignes CSR
+    weights = data.astype(np.float64) * idf[indices]
+    rows = np.repeat(np.arange(len(row_lengths)), row_lengths)
+    norms = np.sqrt(np.bincount(rows, weights=weights**2, minlength=len(row_lengths)))
+    # Une ligne sans mot reste nulle
+    norms[norms == 0] = 1
+    return (weights / norms[rows]).astype(np.float32)
+
+
+class HashingTfidfVectorizer:
+    # Vectoriseur sans état lié au vocabulaire : seuls les nombres de lignes
+    # contenant chaque colonne sont comptés, bloc par bloc, pour l'IDF. Même
+    # découpage en mots et même IDF lissé que TfidfVectorizer.
+    def __init__(self, num_features=HASHING_FEATURES):
+        self.num_features = num_features
+        self.num_documents = 0
+        self.document_counts = np.zeros(num_features, dtype=np.int64)
+        self.idf = None
+
+    def counts(self, names):
+        # scikit-learn n'est importé qu'au premier usage
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        hasher = HashingVectorizer(
+            n_features=self.num_features,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        return hasher.transform(names).tocsr()
+
+    def partial_fit(self, counts):
+        # Les colonnes d'une ligne sont uniques : leur nombre d'apparitions donne
+        # le nombre de lignes qui les contiennent
+        self.num_documents += counts.shape[0]
+        self.document_counts += np.bincount(counts.indices, minlength=self.num_features)
+
+    def finish_fit(self):
+        # IDF lissé : une colonne absente de la base a l'IDF maximal. Les mots
+        # inconnus d'une requête comptent ainsi dans sa norme et l'éloignent d'un
+        # nom qui n'en contient qu'une partie.
+        self.idf = (
+            np.log((1 + self.num_documents) / (1 + self.document_counts)) + 1
+        ).astype(np.float32)
+        # Les comptes ne servent plus : le vectoriseur enregistré reste léger
+        self.document_counts = None
+
+    def transform(self, names):
+        counts = self.counts(names)
+        counts.data = tfidf_weights(
+            counts.data, counts.indices, np.diff(counts.indptr), self.idf
+        )
+        counts.eliminate_zeros()
+        return counts
+
+
+def array_path(directory, name):
+    return os.path.join(directory, f"{name}.bin")
+
+
+class HashedMatrixWriter:
+    # Matrice CSR (float32) écrite sur disque au fil des blocs de lignes : seuls
+    # les comptes du bloc en cours sont en mémoire. Les poids TF-IDF sont
+    # appliqués en place une fois l'IDF connu. Les fichiers sont écrits à côté puis
+    # remplacent les anciens, encore projetés en mémoire par un index chargé.
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.files = {
+            name: open(array_path(directory, name) + ".tmp", "wb")
+            for name in MATRIX_ARRAYS
+        }
+        self.num_rows = 0
+        self.nnz = 0
+        np.zeros(1, dtype=np.int64).tofile(self.files["indptr"])
+
+    def append(self, counts):
+        counts.data.astype(np.float32).tofile(self.files["data"])
+        counts.indices.astype(np.int32).tofile(self.files["indices"])
+        (counts.indptr[1:] + self.nnz).astype(np.int64).tofile(self.files["indptr"])
+        self.num_rows += counts.shape[0]
+        self.nnz += counts.nnz
+
+    def finish(self, idf, chunk_rows):
+        for f in self.files.values():
+            f.close()
+        if self.nnz:
+            self.apply_weights(idf, chunk_rows)
+        for name in MATRIX_ARRAYS:
+            path = array_path(self.directory, name)
+            os.replace(path + ".tmp", path)
+
+    def apply_weights(self, idf, chunk_rows):
+        data = np.memmap(
+            array_path(self.directory, "data") + ".tmp", np.float32, mode="r+"
+        )
+        indices = read_array(self.directory, "indices", ".tmp")
+        indptr = read_array(self.directory, "indptr", ".tmp")
+        for start in range(0, self.num_rows, chunk_rows):
+            stop = min(start + chunk_rows, self.num_rows)
+            first, last = indptr[start], indptr[stop]
+            data[first:last] = tfidf_weights(
+                data[first:last],
+                indices[first:last],
+                np.diff(indptr[start : stop + 1]),
+                idf,
+            )
+        data.flush()
+        del data
+
+
+def read_array(directory, name, suffix=""):
+    # Tableau projeté en mémoire ; un fichier vide (base sans mot) est lu tel quel
+    path = array_path(directory, name) + suffix
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=MATRIX_ARRAYS[name])
+    return np.memmap(path, MATRIX_ARRAYS[name], mode="r")
+
+
+def open_hashed_matrix(directory, num_rows, num_features):
+    # Matrice projetée en mémoire depuis le disque : les pages sont lues à la
+    # demande, bloc par bloc lors du calcul des similarités
+    return sparse.csr_matrix(
+        tuple(read_array(directory, name) for name in MATRIX_ARRAYS),
+        shape=(num_rows, num_features),
+        copy=False,
+    )
@@ -0,0 +1,159 @@
+import bisect
+import email.utils
+import os
+import threading
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import LATENCY_BUCKETS, histogram_percentile
+
+# Délais d'établissement de connexion et de lecture (en secondes)
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+
+# Nouvelles tentatives sur erreur réseau, 429 et 5xx, avec attente exponentielle
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "4"))
+BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Connexions gardées ouvertes par hôte
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def retry_after_delay(response):
+    # L'en-tête Retry-After contient un nombre de secondes ou une date HTTP
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class HttpClient:
+    def __init__(
+        self,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        pool_size=POOL_SIZE,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def session_for(self, url):
+        # Une session par hôte : les connexions TCP/TLS sont réutilisées
+        host = urlsplit(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size, max_retries=0
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+            return session
+
+    def backoff(self, attempt, response=None):
+        delay = self.backoff_factor * (2**attempt)
+        if response is not None:
+            retry_after = retry_after_delay(response)
+            if retry_after is not None:
+                delay = retry_after
+        return min(delay, MAX_BACKOFF)
+
+    def record(self, provider, latency, retries, error):
+        with self.lock:
+            # Latences comptées par tranche : la mémoire reste bornée dans un
+            # service qui tourne longtemps
+            stats = self.stats.setdefault(
+                provider,
+                {
+                    "calls": 0,
+                    "retries": 0,
+                    "errors": 0,
+                    "latency_counts": [0] * (len(LATENCY_BUCKETS) + 1),
+                },
+            )
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["errors"] += int(error)
+            stats["latency_counts"][bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def get(self, url, params=None, provider="autre", limiter=None):
+        # limiter : limite de concurrence et de débit du fournisseur, reprise à
+        # chaque tentative ; elle est relâchée pendant l'attente entre deux
+        # tentatives, pour laisser passer les autres appels
+        limiter = limiter or nullcontext()
+        session = self.session_for(url)
+        start_time = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                with limiter:
+                    response = session.get(url, params=params, timeout=self.timeout)
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.max_retries:
+                    self.record(provider, time.monotonic() - start_time, attempt, True)
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self.backoff(attempt, response))
+                attempt += 1
+                continue
+
+            # Après la dernière tentative, la réponse est rendue telle quelle
+            error = response.status_code >= 400
+            self.record(provider, time.monotonic() - start_time, attempt, error)
+            return response
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                provider: dict(stats, latency_counts=list(stats["latency_counts"]))
+                for provider, stats in self.stats.items()
+            }
+
+
+# Client partagé par tous les appels sortants
+client = HttpClient()
+
+
+def get(url, params=None, provider="autre", limiter=None):
+    return client.get(url, params=params, provider=provider, limiter=limiter)
+
+
+def print_summary():
+    # Résumé des appels sortants par fournisseur
+    for provider, stats in client.get_stats().items():
+        median = histogram_percentile(stats["latency_counts"], 0.5)
+        print(
+            f"  - {provider}: {stats['calls']} appels, {stats['retries']} nouvelles "
+            f"tentatives, {stats['errors']} erreurs, latence médiane {median:.2f} s"
+        )
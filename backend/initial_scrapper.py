@@ -1,17 +1,26 @@
-import pandas as pd
-from tabulate import tabulate
-from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-import re
-import urllib.parse
-import json
-import os
-from tqdm import tqdm
+import argparse
+import sys
 import time
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+
+from aliases import get_alias_store, record_choice, resolve_aliases
+from checkpoint import open_journal
+from database import csv_file_path, load_database
+from enrichment import search_companies
+from export import (
+    REJECTED_SOURCE,
+    build_company_index,
+    choice_row,
+    export_column_names,
+    export_results,
+    iter_table_rows,
+    print_results_preview,
+    web_search_queries,
+)
+from matcher import NO_MATCH, get_best_match, get_candidates, match_queries
+from metrics import run_metrics, write_report
+from normalize import dedupe_inputs
+from review import get_user_choice
+from tfidf_index import load_or_build_index
 
 
 # Affichage du message d'accueil
@@ -31,628 +40,231 @@ def print_welcome_message():
     print("=========================================\n")
 
 
-print_welcome_message()
-
-print("Début du chargement du script...")
+def load_reference(csv_path=csv_file_path, load_index=True):
+    # Charger les données à partir du fichier CSV
+    print("Début du chargement des données à partir du fichier CSV...")
+    start_time = time.time()
 
+    # Seule la colonne "Company" est utile au rapprochement
+    with run_metrics.stage("csv_load"):
+        df = load_database(csv_path, columns=["Company"])
 
-# Chemin du fichier CSV créé
-csv_file_path = os.path.join("..", "sources", "database.csv")
+    # Chargement des données de la colonne "Company" dans la liste de référence
+    reference_list = df["Company"].tolist()
+    company_index = build_company_index(df)
 
-
-def get_user_choice(query, best_match, probable_matches, total_checks, current_check):
+    # Chargement de l'index TF-IDF de la base (reconstruit seulement si le CSV a changé),
+    # inutile à la reprise d'une exécution dont le rapprochement est enregistré
+    index = None
+    if load_index:
+        with run_metrics.stage("index_load"):
+            index = load_or_build_index(csv_path)
+    elapsed_time = time.time() - start_time
     print(
-        f"\nAucune correspondance satisfaisante trouvée pour | {query} | ({current_check}/{total_checks})"
+        f"Chargement des données terminé. Temps écoulé: {elapsed_time:.2f} secondes\n"
     )
-
-    # Trier les correspondances probables par score décroissant et prendre les 4 meilleures
-    sorted_probable_matches = sorted(probable_matches, key=lambda x: x[1], reverse=True)
-
-    # Filtrer les correspondances avec un score supérieur à 50%
-    filtered_probable_matches = [
-        (company, score) for company, score in sorted_probable_matches if score > 0.5
-    ]
-
-    if filtered_probable_matches:
-        options = filtered_probable_matches[:4]
-
-        # Afficher les options
-        print()
-        for i, (company, score) in enumerate(options):
-            print(f"    {i + 1}. {company} ({score * 100:.2f}%)    ")
-        print()
-
-        # Demander le choix de l'utilisateur
-        while True:
-            choice = input(
-                "Choisissez l'option la plus probable (appuyez simplement sur Entrée pour aucune option pertinente) : "
-            )
-            if choice == "":
-                print("Aucune option sélectionnée.")
-                print("\n______________________________")
-                return ("Aucune correspondance trouvée", 0, "utilisateur")
-            if choice.isdigit():
-                choice = int(choice)
-                if 1 <= choice <= len(options):
-                    print("Option sélectionnée avec succès.")
-                    print("\n______________________________")
-                    return options[choice - 1] + ("Utilisateur",)
-                else:
-                    print("Option non valide. Veuillez réessayer.")
-            else:
-                print(
-                    "Veuillez entrer un numéro valide ou simplement appuyer sur Entrée pour aucune option pertinente."
-                )
-    else:
-        print("Aucune option pertinente disponible.")
-        print("\n______________________________")
-        return ("Aucune correspondance trouvée", 0, "utilisateur")
-
-
-def get_siret(url):
-    try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Recherche du SIRET dans le contenu de la page
-        match = re.search(r"SIRET\s*:\s*(\d{3}\s*\d{3}\s*\d{3}\s*\d{5})", soup.text)
-
-        if match:
-            siret = match.group(1).replace(" ", "")  # Supprime les espaces
-            return siret
-        else:
-            return None
-
-    except requests.exceptions.ChunkedEncodingError as e:
-        # Gérer l'erreur de ChunkedEncodingError ici
-        print("Une erreur de ChunkedEncoding s'est produite :", e)
-        return None
+    return reference_list, company_index, index
 
 
-def generate_url(company_name):
-    base_url = "https://serpapi.com/search.html?engine=google&q=site%3Averif.com+siret+si%C3%A8ge+"
-    company_name = urllib.parse.quote_plus(company_name)
-    end_url = (
-        "&location=France&google_domain=google.fr&gl=fr&hl=fr&num=1&api_key=SERPAPI_KEY"
+def read_companies():
+    # Demander à l'utilisateur de copier et coller la liste des entreprises
+    print(
+        "Veuillez copier et coller la liste des entreprises (une par ligne) et pressez 'go' puis Entrée pour lancer la recherche :"
+    )
+    print(
+        "Les colonnes copiées à côté du nom (code postal, ville, département, site) "
+        "restreignent la recherche."
     )
-    return base_url + company_name + end_url
-
-
-def get_company_info(siret):
-    # Clé d'API Pappers
-    api_token = "PAPPERS_KEY"
-
-    # Paramètres de la requête
-    params = {"api_token": api_token, "siret": siret}
-
-    # URL de l'API Pappers
-    url = "https://api.pappers.fr/v2/entreprise"
-
-    # Envoi de la requête GET à l'API
-    response = requests.get(url, params=params)
-
-    if response.status_code == 200:
-        # Conversion de la réponse JSON en objet Python
-        data = response.json()
-
-        # Récupération des informations de l'entreprisegst
-        info = {
-            "siret": siret,
-            "siren": data.get("siren"),
-            "code_naf": data.get("code_naf"),
-            "activite": data.get("domaine_activite"),
-            "libelle_code_naf": data.get("libelle_code_naf"),
-            "date_creation": data.get("date_creation"),
-            "entreprise_cessee": data.get("entreprise_cessee"),
-            "date_cessation": data.get("date_cessation"),
-            "effectif": data.get("effectif_max"),
-            "tranche_effectif": data.get("effectif"),
-            "enseigne": data.get("enseigne"),
-            "denomination": data.get("denomination"),
-            "chiffre_affaires": data.get("chiffre_affaires_max"),
-            "adresse_1": data.get("siege").get("adresse_ligne_1"),
-            "adresse_2": data.get("siege{adresse_ligne_2}"),
-            "code_postal": data.get("siege{code_postal}"),
-            "ville": data.get("ville"),
-        }
-
-        return info
-    else:
-        print("La requête a échoué avec le code de statut :", response.status_code)
-        return None
-
-
-def get_info(company):
-    # Encoder le nom de l'entreprise pour l'utiliser dans l'URL
-    company_encoded = urllib.parse.quote(company)
-
-    url = f"https://serpapi.com/search.json?engine=google&q={company_encoded}&location=France&google_domain=google.fr&gl=fr&hl=fr&num=1&api_key=SERPAPI_KEY"
-
-    response = requests.get(url)
-    data = json.loads(response.text)
-
-    # Vérifier si 'organic_results' existe dans les données
-    if "organic_results" in data and len(data["organic_results"]) > 0:
-        # Trouver l'URL du premier résultat de recherche
-        first_result_url = data["organic_results"][0]["link"]
-    else:
-        first_result_url = "Non disponible"
-
-    # Vérifier si 'knowledge_graph' existe dans les données
-    if "knowledge_graph" in data and "téléphone" in data["knowledge_graph"]:
-        # Trouver le numéro de téléphone sur la fiche Google
-        phone_number = data["knowledge_graph"]["téléphone"]
-    elif (
-        "local_results" in data
-        and "places" in data["local_results"]
-        and len(data["local_results"]["places"]) > 0
-    ):
-        # Trouver le numéro de téléphone dans les résultats locaux
-        place = data["local_results"]["places"][0]
-        phone_number = place.get("phone", "Non disponible")
-    else:
-        phone_number = "Non disponible"
-
-    return first_result_url, phone_number
-
-
-# Charger les données à partir du fichier CSV
-print("Début du chargement des données à partir du fichier CSV...")
-# Lecture du fichier CSV avec mesure de temps et barre de progression
-start_time = time.time()
-
-# Mise à jour : lecture de toutes les colonnes du fichier CSV "BDD FLEET"
-df = pd.read_csv(
-    csv_file_path,
-    dtype={
-        "Effectifs société": str,
-        "SIRET": str,
-        "SIREN": str,
-        "Adresse 1": str,
-        "Adresse 2": str,
-        "Ville": str,
-        "Standard": str,
-        "Privé_Public": str,
-        "SBF120_ETI_MID MARKET": str,
-        "Nom de domaine": str,
-        "Segment": str,
-        "Population": str,
-        "Département": str,
-        "Région": str,
-        "Code activité": str,
-        "Libellé activité": str,
-        "Activité": str,
-        "Groupe": str,
-        "Tranche effectif société": str,
-        "Effectifs consolidés": str,
-        "Téléphone siège": str,
-        "Company": str,
-    },
-    low_memory=False,
-)
-
-num_rows = len(df)
-# Chargement des données de la colonne "Company" dans la liste de référence
-reference_list = df["Company"].tolist()
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"Chargement des données terminé. Temps écoulé: {elapsed_time:.2f} secondes\n")
-
-# Demander à l'utilisateur de copier et coller la liste des entreprises
-print(
-    "Veuillez copier et coller la liste des entreprises (une par ligne) et pressez 'go' puis Entrée pour lancer la recherche :"
-)
-
-input_lines = []
-
-while True:
-    line = input()
-    if line.lower() == "go":
-        print("\nChargement en cours...\n")
-        break
-    input_lines.append(line)
-
-num_lines_before_deduplication = len(
-    input_lines
-)  # count the number of submitted companies before deduplication
-
-# Suppression des doublons dans la liste des entreprises soumises
-input_lines_set = set(input_lines)
-input_lines = list(input_lines_set)  # convert the set back to a list
-num_lines = len(input_lines)  # update num_lines after deduplication
-
-num_duplicates = (
-    num_lines_before_deduplication - num_lines
-)  # calculate the number of duplicates
-combined_list = input_lines + reference_list
-
-# Remplacer les valeurs np.nan par une chaîne vide
-combined_list = [
-    "" if isinstance(item, float) and np.isnan(item) else item for item in combined_list
-]
-
-vectorizer = TfidfVectorizer()
-tfidf_matrix = vectorizer.fit_transform(combined_list)
-cosine_similarities = linear_kernel(tfidf_matrix[:num_lines], tfidf_matrix[num_lines:])
-
-num_auto_matched = 0
-results = []
-
-for idx, query in enumerate(
-    tqdm(input_lines, unit="ligne", desc="Traitement des requêtes")
-):
-    cosine_similarities_for_query = cosine_similarities[idx]
-
-    # Vérifier si cosine_similarities_for_query est un tableau à 1 dimension
-    if isinstance(cosine_similarities_for_query, np.ndarray):
-        best_match_idx = np.argmax(cosine_similarities_for_query)
-        best_match_score = cosine_similarities_for_query[best_match_idx]
-    else:
-        # Aucune correspondance trouvée pour cette requête
-        best_match_idx = -1
-        best_match_score = 0
-
-    if best_match_idx >= 0:
-        best_match_company = reference_list[best_match_idx]
-        best_match = (best_match_company, best_match_score)
-    else:
-        best_match = ("Aucune correspondance trouvée", 0)
-
-    probable_matches = []
-
-    for company_idx, company in enumerate(reference_list):
-        company_str = str(company)
-        company_lower = company_str.lower()
-
-        score = cosine_similarities_for_query[company_idx]
 
-        if score > best_match_score:
-            best_match_score = score
-            best_match = (company_str, score)
+    input_lines = []
 
-        probable_matches.append((company_str, score))
+    while True:
+        line = input()
+        if line.lower() == "go":
+            print("\nChargement en cours...\n")
+            break
+        input_lines.append(line)
+    return input_lines
 
-    if best_match_score < 0.90:
-        results.append((query, best_match, probable_matches))
-    else:
-        num_auto_matched += 1
-        if best_match:
-            results.append((query, best_match, None))
-        else:
-            results.append((query, ("Aucune correspondance trouvée", 0), None))
-
-
-# Affichage du résumé
-print("\n====== SOMMAIRE ======")
-print(
-    "\nNombre d'entreprises soumises : ", num_lines_before_deduplication
-)  # use num_lines_before_deduplication here
-print("Nombre de doublons dans la liste soumise : ", num_duplicates)
-print(
-    "Correspondance automatique : ",
-    num_auto_matched,
-    f"({num_auto_matched / num_lines * 100:.2f}%)",
-)
-print(
-    "Correspondance nécessitant un choix : ",
-    num_lines - num_auto_matched,
-    f"({(num_lines - num_auto_matched) / num_lines * 100:.2f}%)",
-)
 
-total_checks = num_lines - num_auto_matched  # total number of checks
-current_check = 1  # start from the first check
+def print_summary(num_submitted, num_lines, matches):
+    num_duplicates = num_submitted - num_lines
+    num_auto_matched = int(matches.auto_matched.sum())
+    num_rejected = int(matches.alias_rejected.sum())
+    num_to_check = num_lines - num_auto_matched - num_rejected
 
-# Demander des choix à l'utilisateur
-final_results = []
-print("\n====== VÉRIFICATIONS ======")
+    print("\n====== SOMMAIRE ======")
+    print("\nNombre d'entreprises soumises : ", num_submitted)
+    print("Nombre de doublons dans la liste soumise : ", num_duplicates)
+    print(
+        "Correspondance automatique : ",
+        num_auto_matched,
+        f"({num_auto_matched / num_lines * 100:.2f}%)",
+    )
+    print("  dont noms identiques à la base : ", int(matches.exact_matched.sum()))
+    print("  dont choix déjà faits (alias) : ", int(matches.alias_matched.sum()))
+    print("  dont sites connus de la base : ", int(matches.domain_matched.sum()))
+    print("Sans correspondance selon un choix déjà fait : ", num_rejected)
+    print(
+        "Correspondance nécessitant un choix : ",
+        num_to_check,
+        f"({num_to_check / num_lines * 100:.2f}%)",
+    )
 
-# Initialiser le compteur de recherches web
-web_search_count = 0
-web_search_total = sum(1 for _, _, probable_matches in results if probable_matches)
 
-for i, (query, best_match, probable_matches) in enumerate(results):
-    # Initialiser first_result_url et phone_number à une valeur par défaut
-    first_result_url = None
-    phone_number = None
-    if probable_matches:
-        user_choice = get_user_choice(
-            query, best_match, probable_matches, total_checks, current_check
+def review_matches(queries, matches, reference_list, company_index, journal=None):
+    # Acceptation des correspondances automatiques, choix de l'utilisateur sinon.
+    # Les choix déjà enregistrés dans le journal ne sont pas redemandés ; ceux faits
+    # parmi des options sont retenus comme alias pour les prochaines listes.
+    choices = journal.choices if journal is not None else {}
+    decided = matches.auto_matched | matches.alias_rejected
+    to_check = [
+        query
+        for i, query in enumerate(queries)
+        if not decided[i] and query not in choices
+    ]
+    total_checks = len(to_check)
+    current_check = 1  # start from the first check
+
+    final_results = []
+    print("\n====== VÉRIFICATIONS ======")
+    if len(to_check) < len(queries) - int(decided.sum()):
+        print(
+            "Choix repris du journal : ",
+            len(queries) - int(decided.sum()) - len(to_check),
         )
-        final_results.append(user_choice)
-        current_check += 1  # increment the current check
-    else:
-        final_results.append(best_match + ("automatique",))
-
-headers = [
-    "Source",
-    "Entrée",
-    "Raison sociale",
-    "Groupe",
-    "Nom de domaine",
-    "Effectifs société",
-    "Tranche effectif société",
-    "Activité",
-    "Code activité",
-    "Libellé activité",
-    "SIRET",
-    "SIREN",
-    "Privé_Public",
-    "Adresse 1",
-    "Adresse 2",
-    "Code postal",
-    "Ville",
-    "Département",
-    "Région",
-    "Tranche effectif société consolidés",
-    "Effectifs consolidés",
-    "Chiffre d'affaires consolidé",
-    "Nombre d'établissements",
-    "SBF_120_ETI_MID MARKET",
-    "Standard",
-    "Téléphone siège",
-    "Segment",
-    "Population",
-    "Entreprise_cessee",
-]
-
-table_data = []
-
-for query, result in zip(input_lines, final_results):
-    source = ""
-    raison_sociale = ""
-    telephone = ""
-    nom_de_domaine = ""
-    if result[1] > 0:
-        # Les informations proviennent automatiquement de la source initiale
-        source = result[2]
-        # L'utilisation de result[2] au lieu de "Automatique" permettra d'afficher "Utilisateur" ou "Automatique" en fonction du choix
-        raison_sociale = result[0]
-        filtered_data = df.loc[
-            df["Company"] == raison_sociale,
-            [
-                "Nom de domaine",
-                "SIRET",
-                "Standard",
-                "Code activité",
-                "Effectifs société",
-                "Tranche effectif société",
-                "SIREN",
-                "Adresse 1",
-                "Adresse 2",
-                "Ville",
-                "Code postal",
-                "Privé_Public",
-                "SBF120_ETI_MID MARKET",
-                "Segment",
-                "Population",
-                "Département",
-                "Région",
-                "Libellé activité",
-                "Activité",
-                "Groupe",
-                "Chiffre d'affaires consolidé",
-                "Effectifs consolidés",
-                "Téléphone siège",
-                "Nombre d'établissements",
-            ],
-        ]
-        if not filtered_data.empty:
-            nom_de_domaine = filtered_data["Nom de domaine"].iloc[0]
-            siret = filtered_data["SIRET"].iloc[0]
-            standard = str(filtered_data["Standard"].iloc[0]).zfill(10)
-            code_activite = filtered_data["Code activité"].iloc[0]
-            effectif_societe = filtered_data["Effectifs société"].iloc[0]
-            tranche_effectif_societe = filtered_data["Tranche effectif société"].iloc[0]
-            groupe = filtered_data["Groupe"].iloc[0]
-            adresse_1 = filtered_data["Adresse 1"].iloc[0]
-            adresse_2 = filtered_data["Adresse 2"].iloc[0]
-            ville = filtered_data["Ville"].iloc[0]
-            prive_public = filtered_data["Privé_Public"].iloc[0]
-            sbf120_eti_mid_market = filtered_data["SBF120_ETI_MID MARKET"].iloc[0]
-            segment = filtered_data["Segment"].iloc[0]
-            population = filtered_data["Population"].iloc[0]
-            departement = filtered_data["Département"].iloc[0]
-            region = filtered_data["Région"].iloc[0]
-            libelle_activite = filtered_data["Libellé activité"].iloc[0]
-            activite = filtered_data["Activité"].iloc[0]
-            effectifs_consolides = filtered_data["Effectifs consolidés"].iloc[0]
-            telephone_siege = filtered_data["Téléphone siège"].iloc[0]
-            siren = filtered_data["SIREN"].iloc[0]
-            code_postal = filtered_data["Code postal"].iloc[0]
-            chiffre_consolide = filtered_data["Chiffre d'affaires consolidé"].iloc[0]
-            nb_etablissements = filtered_data["Nombre d'établissements"].iloc[0]
+
+    for i, query in enumerate(queries):
+        if matches.alias_rejected[i]:
+            final_results.append((NO_MATCH, 0, REJECTED_SOURCE, -1))
+        elif matches.auto_matched[i]:
+            source = "automatique"
+            if matches.alias_matched[i]:
+                source = "alias"
+            elif matches.domain_matched[i]:
+                source = "site"
+            final_results.append(
+                get_best_match(matches, i, reference_list)
+                + (source, matches.best_rows[i])
+            )
         else:
-            nom_de_domaine = ""  # Ou toute autre valeur par défaut
-            siret = ""
-            standard = ""
-            code_activite = ""
-            effectif_societe = ""
-            tranche_effectif_societe = ""
-            groupe = ""
-            adresse_1 = ""
-            adresse_2 = ""
-            ville = ""
-            prive_public = ""
-            sbf120_eti_mid_market = ""
-            segment = ""
-            population = ""
-            departement = ""
-            region = ""
-            libelle_activite = ""
-            activite = ""
-            effectifs_consolides = ""
-            telephone_siege = ""
-            siren = ""
-            code_postal = ""
-            chiffre_consolide = ""
-            nb_etablissements
-        row_data = [
-            query,
-            source,
-            raison_sociale,
-            groupe,
-            nom_de_domaine,
-            effectif_societe,
-            tranche_effectif_societe,
-            activite,
-            code_activite,
-            libelle_activite,
-            siret,
-            siren,
-            prive_public,
-            adresse_1,
-            adresse_2,
-            code_postal,
-            ville,
-            departement,
-            region,
-            tranche_effectif_societe,
-            effectifs_consolides,
-            chiffre_consolide,
-            nb_etablissements,
-            sbf120_eti_mid_market,
-            standard,
-            telephone_siege,
-            segment,
-            population,
-            "",
-        ]
-    else:
-        # Les informations n'ont pas été trouvées automatiquement, la recherche sur le Web est nécessaire
-        if web_search_count == 0:
-            # Afficher le message avant le début de la recherche web
-            print("\n====== RECHERCHES WEB ======")
-
-        first_result_url, phone_number = get_info(query)
-
-        url = generate_url(query)
-        siret = get_siret(url)
-        if siret:
-            info = get_company_info(siret)
-            if info:
-                source = f"Web"
-                raison_sociale = info.get("denomination")
-                nom_de_domaine = first_result_url
-                telephone = phone_number
-                effectif = info.get("effectif_max")
-                tranche_effectif = info.get("effectif")
-                code_naf = info.get("code_naf")
-                tranche_effectif = info.get("tranche_effectif")
-                libelle_activite = info.get("libelle_code_naf")
-                siren = info.get("SIREN")
-                activite = info.get("domaine_activite")
-                adresse_2 = ""
-                code_postal = ""
-                ville = ""
-                adresse_1 = info.get("adresse_1")
-                adresse_2 = info.get("adresse_ligne_2")
-                code_postal = info.get("code_postal")
-                ville = info.get("ville")
-                chiffre_affaires = info.get("chiffre_affaires_max")
-                if code_naf == "6420Z":
-                    tranche_effectif = (
-                        (tranche_effectif + " (Holding)")
-                        if tranche_effectif
-                        else "Holding"
-                    )
-                print(
-                    f"\nStatut de la recherche pour '{query}': Trouvé {web_search_count+1}/{len(input_lines)}"
-                )
-                web_search_count += 1
-                print(f"  - SIRET: {siret}")
-                print(f"  - Raison Sociale: {raison_sociale}")
-                print(f"  - Nom de Domaine: {nom_de_domaine}")
-                print(f"  - Téléphone: {telephone}")
-                print("\n______________________________\n")
-                row_data = [
-                    query,
-                    source,
-                    raison_sociale,
-                    "",
-                    nom_de_domaine,
-                    effectif,
-                    tranche_effectif,
-                    activite,
-                    code_naf,
-                    libelle_activite,
-                    siret,
-                    siren,
-                    "",
-                    adresse_1,
-                    adresse_2,
-                    code_postal,
-                    ville,
-                    "",
-                    "",
-                    "",
-                    "",
-                    chiffre_affaires,
-                    "",
-                    "",
-                    "",
-                    telephone,
-                ]
+            if query in choices:
+                user_choice = choices[query]
             else:
-                print(
-                    f"\nStatut de la recherche pour '{query}': SIRET trouvé, mais pas d'informations supplémentaires {web_search_count+1}/{len(input_lines)}"
+                candidates = get_candidates(matches, i, reference_list)
+                user_choice = get_user_choice(
+                    query,
+                    get_best_match(matches, i, reference_list),
+                    candidates,
+                    total_checks,
+                    current_check,
                 )
-                web_search_count += 1
-                print("\n______________________________\n")
-                source = "Web"
-                row_data = [query, source, "", "", "", "", "", siret, "", ""]
-        else:
-            print(
-                f"Statut de la recherche pour '{query}': Non trouvé {web_search_count+1}/{len(input_lines)}"
+                if journal is not None:
+                    journal.record_choice(query, user_choice)
+                if candidates:
+                    record_choice(get_alias_store(), query, user_choice, "interactif")
+                current_check += 1  # increment the current check
+            # Ligne de l'option choisie, vérifiée pour un choix repris du journal
+            final_results.append(
+                user_choice[:3]
+                + (choice_row(reference_list, company_index, user_choice),)
             )
-            web_search_count += 1
-            print("\n______________________________\n")
-            source = "NA"
-            row_data = [query, source, "", "", "", "", "", "", "", ""]
-
-    table_data.append(row_data + [""] * (len(headers) - len(row_data)))
+    return final_results
 
 
-def truncate_string(s, max_length):
-    return (s[: max_length - 3] + "...") if len(s) > max_length else s
-
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche Entreprise FSG.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="JOURNAL",
+        help="reprendre la dernière exécution interrompue (ou le journal indiqué)",
+    )
+    return parser.parse_args(argv)
 
-table_data_truncated = []
 
-# Tronquer les données de colonne
-for row_data in table_data:
-    truncated_row = [truncate_string(str(col), 20) for col in row_data]
-    table_data_truncated.append(truncated_row)
+def main(argv=None):
+    args = parse_args(argv)
+    print_welcome_message()
 
-print("Génération du tableau en cours...")
+    # Journal de l'exécution : entrées, rapprochement, choix et recherches web
+    journal = open_journal("interactif", args.resume)
+    print(f"Journal de l'exécution : {journal.path}\n")
+    try:
+        run(journal)
+    except KeyboardInterrupt:
+        print("\nExécution interrompue. Pour la reprendre :")
+        print("python initial_scrapper.py --resume")
+        sys.exit(130)
+    finally:
+        journal.close()
+
+
+def run(journal):
+    matches = journal.matches_for(csv_file_path) if journal.queries else None
+
+    print("Début du chargement du script...")
+    reference_list, company_index, index = load_reference(load_index=matches is None)
+
+    if journal.queries is None:
+        input_lines = read_companies()
+        num_submitted = len(input_lines)
+
+        # Suppression des doublons dans la liste des entreprises soumises : deux noms
+        # identiques une fois normalisés (casse, accents, forme juridique) n'en font
+        # qu'un. Les colonnes copiées après le nom deviennent ses attributs.
+        input_lines, attributes = dedupe_inputs(input_lines)
+        journal.record_inputs(input_lines, attributes, num_submitted)
+    else:
+        input_lines, attributes = journal.queries, journal.attributes
+        num_submitted = journal.num_submitted
+
+    # Recherche des meilleures correspondances dans l'index : seuls les indices et
+    # scores des quelques meilleures entreprises sont conservés pour chaque requête
+    # Les noms déjà tranchés lors d'une vérification précédente sont résolus
+    # directement, sans calcul de similarité ni nouvelle question
+    if matches is None:
+        aliases = resolve_aliases(get_alias_store(), input_lines, company_index)
+        matches = match_queries(
+            index, input_lines, aliases=aliases, attributes=attributes
+        )
+        journal.record_matches(matches, csv_file_path)
+    print_summary(num_submitted, len(input_lines), matches)
 
-if table_data_truncated:
-    print("\n====== RESULTATS ======\n")
-    # Modifier ici l'argument tablefmt pour un format plus simple
-    table = tabulate(table_data_truncated, headers, tablefmt="grid")
-    print(table)
-    print()
-else:
-    print("Aucune donnée à afficher.")
+    with run_metrics.stage("review"):
+        final_results = review_matches(
+            input_lines, matches, reference_list, company_index, journal
+        )
 
+    # Les entreprises non trouvées sont recherchées sur le Web, en parallèle
+    web_rows = search_companies(
+        web_search_queries(input_lines, final_results),
+        journal,
+    )
 
-# Créer un DataFrame à partir des données de tableau
-df = pd.DataFrame(table_data, columns=headers[: len(table_data[0])])
+    # Les colonnes exportées ne sont lues qu'au moment de l'export
+    with run_metrics.stage("result_assembly"):
+        df = load_database(csv_file_path, columns=export_column_names)
 
-# Spécifier le chemin d'accès pour enregistrer le fichier Excel sur le bureau de l'utilisateur
-desktop = os.getcwd()
+    # Les lignes sont assemblées et écrites au fil de l'eau
+    with run_metrics.stage("export"):
+        writer = export_results(
+            iter_table_rows(df, input_lines, final_results, web_rows)
+        )
+    file_path = writer.file_path
 
-# Générer un nom de fichier avec la date et l'heure actuelles
-current_time = datetime.now().strftime("%Y-%m-%d_%H-%M")
-file_name = f"Recherche_BDD_{current_time}.xlsx"
-file_path = os.path.join(desktop, file_name)
+    print_results_preview(writer)
 
-# Enregistrer le DataFrame en tant que fichier Excel
-df.to_csv(file_path, index=False)
+    print(
+        f"Les résultats ont été enregistrés sous forme de fichier Excel sur le bureau : {file_path}"
+    )
+    print(f"Rapport d'exécution : {write_report(file_path)}")
+    journal.finish(file_path)
+    print("Terminé.")
 
-print(
-    f"Les résultats ont été enregistrés sous forme de fichier Excel sur le bureau : {file_path}"
-)
-print("Terminé.")
+    print("\nMerci d'avoir utilisé Recherche Entreprise FSG v0.5. Au revoir !")
 
 
-print("\nMerci d'avoir utilisé Recherche Entreprise FSG v0.5. Au revoir !")
+if __name__ == "__main__":
+    main()
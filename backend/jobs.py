@@ -0,0 +1,236 @@
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from aliases import get_alias_store, resolve_aliases
+from batch import review_file_path, sort_matches
+from enrichment import STATUS_COUNTERS, enrich_companies
+from export import EXPORT_FORMAT, export_results, iter_table_rows, web_search_queries
+from matcher import MatchResults, match_queries
+from metrics import RunMetrics, write_report
+from review import write_review_file
+
+# Fichiers de résultats des traitements lancés depuis le service, un dossier par
+# traitement
+jobs_dir_path = os.environ.get("FSG_JOBS_DIR", os.path.join("..", "sources", "jobs"))
+
+# Nombre de traitements menés en même temps ; les suivants attendent leur tour
+JOB_WORKERS = int(os.environ.get("FSG_JOB_WORKERS", "2"))
+
+# Nombre de traitements terminés gardés (état et fichiers) ; au-delà, les plus
+# anciens sont oubliés et leur dossier supprimé
+JOB_RETENTION = int(os.environ.get("FSG_JOB_RETENTION", "100"))
+
+# Requêtes rapprochées d'un coup : l'avancement est publié entre deux blocs, et
+# les requêtes /match des autres utilisateurs passent entre eux
+JOB_MATCH_CHUNK = int(os.environ.get("FSG_JOB_MATCH_CHUNK", "5000"))
+
+QUEUED = "en attente"
+RUNNING = "en cours"
+DONE = "terminé"
+FAILED = "échec"
+
+MATCHING = "rapprochement"
+WEB_SEARCH = "recherches web"
+EXPORT = "export"
+
+
+class Job:
+    # Traitement d'une liste (rapprochement, recherches web, export) ; chaque
+    # changement d'état réveille les clients qui suivent son avancement. Les
+    # mesures du traitement sont relevées à part de celles du service.
+    def __init__(self, queries, attributes, file_format=EXPORT_FORMAT):
+        self.id = uuid.uuid4().hex
+        self.queries = queries
+        self.attributes = attributes
+        self.companies = len(queries)
+        self.metrics = RunMetrics()
+        self.file_format = file_format
+        self.status = QUEUED
+        self.stage = None
+        self.done = 0
+        self.total = 0
+        self.counts = {}
+        self.file_path = None
+        self.review_path = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def state(self):
+        with self.changed:
+            return self.version, {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "done": self.done,
+                "total": self.total,
+                "companies": self.companies,
+                "counts": dict(self.counts),
+                "error": self.error,
+                "created_at": self.created_at.isoformat(timespec="seconds"),
+                "started_at": (
+                    self.started_at.isoformat(timespec="seconds")
+                    if self.started_at
+                    else None
+                ),
+                "finished_at": (
+                    self.finished_at.isoformat(timespec="seconds")
+                    if self.finished_at
+                    else None
+                ),
+                "has_review": self.review_path is not None,
+            }
+
+    def wait_for_change(self, version, timeout):
+        # État suivant la version donnée, ou l'état courant au bout du délai
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+        return self.state()
+
+
+def job_dir_path(job_id):
+    return os.path.join(jobs_dir_path, job_id)
+
+
+def concat_matches(chunks):
+    return MatchResults(*(np.concatenate(arrays) for arrays in zip(*chunks)))
+
+
+def run_pipeline(index, reference_list, company_index, load_table, job):
+    # Même enchaînement que batch.py run, sans journal ni affichage : l'avancement
+    # est publié dans le traitement
+    queries, attributes = job.queries, job.attributes
+    job.update(stage=MATCHING, done=0, total=len(queries))
+    chunks = []
+    for start in range(0, len(queries), JOB_MATCH_CHUNK):
+        stop = min(start + JOB_MATCH_CHUNK, len(queries))
+        chunk_queries = queries[start:stop]
+        aliases = resolve_aliases(get_alias_store(), chunk_queries, company_index)
+        chunks.append(
+            match_queries(
+                index,
+                chunk_queries,
+                aliases=aliases,
+                attributes=attributes[start:stop],
+                metrics=job.metrics,
+            )
+        )
+        job.update(done=stop)
+    matches = concat_matches(chunks)
+    result_queries, final_results, review_entries = sort_matches(
+        matches, queries, reference_list
+    )
+    counts = {
+        "auto_matched": int(matches.auto_matched.sum()),
+        "review": len(review_entries),
+    }
+
+    web_queries = web_search_queries(result_queries, final_results)
+    job.update(stage=WEB_SEARCH, done=0, total=len(web_queries), counts=dict(counts))
+    web_rows = {}
+    web_results = enrich_companies(web_queries, metrics=job.metrics)
+    for count, web_result in enumerate(web_results, start=1):
+        web_rows[web_result.query] = web_result.row_data
+        counter = STATUS_COUNTERS[web_result.status]
+        counts[counter] = counts.get(counter, 0) + 1
+        job.update(done=count, counts=dict(counts))
+
+    job.update(stage=EXPORT, done=0, total=len(result_queries))
+    directory = job_dir_path(job.id)
+    os.makedirs(directory, exist_ok=True)
+    with job.metrics.stage("export"):
+        rows = iter_table_rows(load_table(), result_queries, final_results, web_rows)
+        writer = export_results(rows, directory, file_format=job.file_format)
+    review_path = None
+    if review_entries:
+        review_path = review_file_path(writer.file_path)
+        write_review_file(review_path, review_entries)
+    # Appels aux fournisseurs et cache sont communs aux traitements : le rapport
+    # ne garde que les mesures propres à celui-ci
+    write_report(writer.file_path, job.metrics, services=False)
+    job.update(
+        done=writer.num_rows, file_path=writer.file_path, review_path=review_path
+    )
+
+
+class JobQueue:
+    # Traitements exécutés par un groupe de fils, dans l'ordre de soumission ; les
+    # retention derniers traitements terminés sont gardés. metrics cumule les
+    # mesures des traitements terminés.
+    def __init__(self, pipeline, workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.pipeline = pipeline
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="job"
+        )
+        self.retention = max(0, retention)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.metrics = RunMetrics()
+
+    def submit(self, queries, attributes, file_format=EXPORT_FORMAT):
+        job = Job(queries, attributes, file_format)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.executor.submit(self.run, job)
+        return job
+
+    def run(self, job):
+        start_time = time.time()
+        job.update(status=RUNNING, started_at=datetime.now())
+        try:
+            self.pipeline(job)
+        except Exception as e:
+            # Un traitement en échec ne doit pas arrêter les autres
+            traceback.print_exc()
+            job.update(status=FAILED, error=str(e), finished_at=datetime.now())
+        else:
+            job.update(status=DONE, stage=None, finished_at=datetime.now())
+            print(
+                f"Traitement {job.id} terminé : {job.companies} entreprises en "
+                f"{time.time() - start_time:.2f} secondes"
+            )
+        finally:
+            # La liste n'est plus utile une fois le traitement terminé
+            job.queries = job.attributes = None
+            self.metrics.merge(job.metrics)
+            self.evict()
+
+    def evict(self):
+        # Oublie les traitements terminés au-delà des retention plus récents et
+        # supprime leurs fichiers
+        with self.lock:
+            finished = sorted(
+                (job for job in self.jobs.values() if job.status in (DONE, FAILED)),
+                key=lambda job: job.finished_at,
+            )
+            evicted = finished[: max(0, len(finished) - self.retention)]
+            for job in evicted:
+                del self.jobs[job.id]
+        for job in evicted:
+            shutil.rmtree(job_dir_path(job.id), ignore_errors=True)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
@@ -0,0 +1,275 @@
+from collections import namedtuple
+
+import numpy as np
+
+from metrics import run_metrics
+from similarity import candidate_top_k, merge_top_k, top_k_similarities
+
+# Score à partir duquel une correspondance est acceptée automatiquement
+AUTO_MATCH_THRESHOLD = 0.90
+
+# Score minimum pour qu'une entreprise soit proposée à l'utilisateur
+CANDIDATE_THRESHOLD = 0.5
+
+# Nombre maximum d'options proposées à l'utilisateur
+MAX_CANDIDATES = 4
+
+NO_MATCH = "Aucune correspondance trouvée"
+
+# Résultat du rapprochement : uniquement des tableaux NumPy de petite taille.
+# best_rows / best_scores : meilleure ligne de la base par requête (-1 si aucune)
+# candidate_rows / candidate_scores : options triées par score décroissant,
+# complétées par -1 / 0 au-delà des options retenues
+# auto_matched : requêtes acceptées automatiquement
+# exact_matched : requêtes dont la clé normalisée est celle d'une ligne de la base
+# alias_matched / alias_rejected : requêtes déjà tranchées lors d'une vérification
+# précédente (entreprise retenue / aucune correspondance)
+# domain_matched : requêtes dont le site désigne une entreprise de la base
+MatchResults = namedtuple(
+    "MatchResults",
+    [
+        "best_rows",
+        "best_scores",
+        "candidate_rows",
+        "candidate_scores",
+        "auto_matched",
+        "exact_matched",
+        "alias_matched",
+        "alias_rejected",
+        "domain_matched",
+    ],
+)
+
+
+def select_candidates(
+    top_rows,
+    top_scores,
+    auto_threshold=AUTO_MATCH_THRESHOLD,
+    candidate_threshold=CANDIDATE_THRESHOLD,
+    exact_matched=None,
+    alias_matched=None,
+    alias_rejected=None,
+    domain_matched=None,
+):
+    num_queries = top_rows.shape[0]
+    if exact_matched is None:
+        exact_matched = np.zeros(num_queries, dtype=bool)
+    if alias_matched is None:
+        alias_matched = np.zeros(num_queries, dtype=bool)
+    if alias_rejected is None:
+        alias_rejected = np.zeros(num_queries, dtype=bool)
+    if domain_matched is None:
+        domain_matched = np.zeros(num_queries, dtype=bool)
+    if top_rows.shape[1] > 0:
+        best_rows = top_rows[:, 0].copy()
+        best_scores = top_scores[:, 0].copy()
+    else:
+        # Base vide : aucune correspondance possible
+        best_rows = np.full(num_queries, -1, dtype=np.int64)
+        best_scores = np.zeros(num_queries, dtype=np.float64)
+
+    auto_matched = best_scores >= auto_threshold
+
+    # Seules les options au-dessus du seuil sont gardées pour les requêtes à vérifier
+    keep = (top_scores > candidate_threshold) & ~auto_matched[:, None]
+    candidate_rows = np.where(keep, top_rows, -1)
+    candidate_scores = np.where(keep, top_scores, 0.0)
+
+    return MatchResults(
+        best_rows,
+        best_scores,
+        candidate_rows,
+        candidate_scores,
+        auto_matched,
+        exact_matched,
+        alias_matched,
+        alias_rejected,
+        domain_matched,
+    )
+
+
+def score_queries(index, queries, k):
+    # k meilleures lignes de l'index (et leurs scores) pour chaque requête. Les
+    # segments principal et delta sont scorés séparément puis fusionnés ; les
+    # lignes supprimées de la base sont écartées au calcul des scores.
+    query_matrix = index.transform(queries)
+    if index.shard_pool is not None:
+        rows, scores = index.shard_pool.top_k(query_matrix, k)
+    elif index.candidate_index is None:
+        rows, scores = top_k_similarities(
+            query_matrix, index.main_matrix, k=k, live=index.main_live()
+        )
+    else:
+        # Grande base : similarité exacte sur les seules lignes candidates du
+        # segment principal
+        rows, scores = candidate_top_k(
+            query_matrix,
+            index.main_matrix,
+            [index.candidate_index.candidates(query) for query in queries],
+            k,
+            live=index.main_live(),
+        )
+    if index.num_rows > index.num_main_rows:
+        delta_rows, delta_scores = top_k_similarities(
+            query_matrix, index.delta_matrix, k=k, live=index.delta_live()
+        )
+        rows, scores = merge_top_k(
+            rows, scores, delta_rows + index.num_main_rows, delta_scores, k
+        )
+    return rows, scores
+
+
+def group_by_block(pending, attributes, block):
+    # Requêtes regroupées par bloc : (lignes de la base, requêtes) par bloc
+    groups = {}
+    for i in pending:
+        attribute, key, rows = block(attributes[i])
+        if attribute is not None:
+            groups.setdefault((attribute, key), (rows, []))[1].append(i)
+    return groups.values()
+
+
+def score_block(index, queries, ids, positions, k, top_rows, top_scores, metrics):
+    # Similarité des requêtes d'un bloc avec ses seules lignes, calculée une fois
+    # pour toutes ; renvoie les requêtes et les scores de leurs meilleures lignes
+    rows = index.rows_at(positions)
+    ids = np.array(ids)
+    if len(rows) == 0 or k == 0:
+        return ids[:0], np.zeros((0, 1)), rows
+    rows_k, scores = top_k_similarities(
+        index.transform([queries[i] for i in ids]), index.rows_matrix(rows), k=k
+    )
+    top_rows[ids] = -1
+    top_scores[ids] = 0.0
+    top_rows[ids, : rows_k.shape[1]] = index.positions[rows[rows_k]]
+    top_scores[ids, : rows_k.shape[1]] = scores
+    metrics.increment("blocked_queries", len(ids))
+    metrics.increment("blocked_rows_scored", len(ids) * len(rows))
+    return ids, scores, rows
+
+
+def score_blocks(index, queries, attributes, pending, k, candidate_threshold, metrics):
+    # Requêtes accompagnées d'attributs (code postal, ville, département, site) :
+    # seules les lignes de leur bloc sont comparées. Le site désigne directement
+    # l'entreprise s'il n'a qu'une ligne, ou si l'une de ses lignes porte un nom
+    # proche ; sinon le bloc géographique le plus précis délimite la comparaison.
+    # Une requête sans option pertinente dans son bloc (siège ailleurs) repasse
+    # par le calcul sur toute la base.
+    top_rows = np.full((len(queries), k), -1, dtype=np.int64)
+    top_scores = np.zeros((len(queries), k), dtype=np.float64)
+    domain_matched = np.zeros(len(queries), dtype=bool)
+    blocked = np.zeros(len(queries), dtype=bool)
+    blocking_index = index.blocking_index
+
+    pending = [i for i in np.flatnonzero(pending) if attributes[i]]
+    for positions, ids in group_by_block(
+        pending, attributes, blocking_index.domain_block
+    ):
+        ids, scores, rows = score_block(
+            index, queries, ids, positions, k, top_rows, top_scores, metrics
+        )
+        domain_matched[ids] = (len(rows) == 1) | (scores[:, 0] > candidate_threshold)
+
+    pending = [i for i in pending if not domain_matched[i]]
+    for positions, ids in group_by_block(
+        pending, attributes, blocking_index.geographic_block
+    ):
+        ids, scores, _ = score_block(
+            index, queries, ids, positions, k, top_rows, top_scores, metrics
+        )
+        blocked[ids] = scores[:, 0] > candidate_threshold
+    return top_rows, top_scores, domain_matched, blocked
+
+
+def match_queries(
+    index,
+    queries,
+    auto_threshold=AUTO_MATCH_THRESHOLD,
+    candidate_threshold=CANDIDATE_THRESHOLD,
+    max_candidates=MAX_CANDIDATES,
+    aliases=None,
+    attributes=None,
+    metrics=run_metrics,
+):
+    # Les requêtes déjà tranchées (aliases : AliasMatches) puis celles dont la clé
+    # normalisée est connue sont résolues directement ; celles accompagnées
+    # d'attributs (attributes : un dictionnaire par requête) ne sont comparées
+    # qu'aux lignes de leur bloc ; les autres passent par le calcul de similarité
+    # sur toute la base. Durées et compteurs sont relevés dans metrics (mesures du
+    # service, ou celles d'un traitement /jobs).
+    queries = list(queries)
+    alias_matched = np.zeros(len(queries), dtype=bool)
+    alias_rejected = np.zeros(len(queries), dtype=bool)
+    if aliases is not None:
+        alias_matched = aliases.rows >= 0
+        alias_rejected = aliases.rejected & ~alias_matched
+    resolved = alias_matched | alias_rejected
+
+    with metrics.stage("exact_keys"):
+        exact_rows = index.exact_rows(queries)
+    exact_matched = (exact_rows >= 0) & ~resolved
+
+    k = min(max_candidates, index.num_rows)
+    top_rows = np.full((len(queries), k), -1, dtype=np.int64)
+    top_scores = np.zeros((len(queries), k), dtype=np.float64)
+    domain_matched = np.zeros(len(queries), dtype=bool)
+    blocked = np.zeros(len(queries), dtype=bool)
+    if attributes is not None and index.blocking_index is not None:
+        with metrics.stage("blocking"):
+            top_rows, top_scores, domain_matched, blocked = score_blocks(
+                index,
+                queries,
+                attributes,
+                ~exact_matched & ~resolved,
+                k,
+                candidate_threshold,
+                metrics,
+            )
+
+    remaining = np.flatnonzero(~exact_matched & ~resolved & ~domain_matched & ~blocked)
+    if len(remaining):
+        with metrics.stage("similarity"):
+            rows, scores = score_queries(index, [queries[i] for i in remaining], k)
+        # Lignes de l'index -> positions dans la base (-1 pour une ligne supprimée)
+        top_rows[remaining] = np.where(rows >= 0, index.positions[rows], -1)
+        top_scores[remaining] = scores
+    if k > 0:
+        top_rows[exact_matched, 0] = exact_rows[exact_matched]
+        top_scores[exact_matched, 0] = 1.0
+        if aliases is not None:
+            top_rows[alias_matched, 0] = aliases.rows[alias_matched]
+            top_scores[alias_matched, 0] = 1.0
+        # Meilleur nom parmi les lignes du site, accepté d'office
+        top_scores[domain_matched, 0] = 1.0
+
+    matches = select_candidates(
+        top_rows,
+        top_scores,
+        auto_threshold,
+        candidate_threshold,
+        exact_matched,
+        alias_matched,
+        alias_rejected,
+        domain_matched,
+    )
+    metrics.record_matches(matches)
+    return matches
+
+
+def get_best_match(matches, idx, reference_list):
+    row = matches.best_rows[idx]
+    if row < 0:
+        return (NO_MATCH, 0)
+    return (reference_list[row], matches.best_scores[idx])
+
+
+def get_candidates(matches, idx, reference_list):
+    # Options proposées à l'utilisateur pour une requête : (entreprise, score,
+    # position dans la base), la position distinguant les homonymes
+    return [
+        (str(reference_list[row]), score, int(row))
+        for row, score in zip(
+            matches.candidate_rows[idx], matches.candidate_scores[idx]
+        )
+        if row >= 0
+    ]
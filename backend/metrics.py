@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Bornes (en secondes) de l'histogramme des latences des fournisseurs
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+
+def latency_histogram(counts, buckets=LATENCY_BUCKETS):
+    # Nombre d'appels par tranche de latence ; "+Inf" regroupe les plus lents
+    labels = [f"<={bound:g}" for bound in buckets] + ["+Inf"]
+    return dict(zip(labels, counts))
+
+
+def histogram_percentile(counts, fraction, buckets=LATENCY_BUCKETS):
+    # Estimation à partir des nombres d'appels par tranche, par interpolation
+    # linéaire dans la tranche qui contient le rang cherché
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = fraction * total
+    seen = 0
+    lower = 0.0
+    for count, upper in zip(counts, buckets):
+        if count and seen + count >= rank:
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    # Au-delà de la dernière borne
+    return buckets[-1]
+
+
+def provider_metrics():
+    # Appels sortants par fournisseur, relevés par le client HTTP partagé. Import
+    # différé : le rapprochement seul n'a pas à charger requests.
+    import http_client
+
+    providers = {}
+    for provider, stats in http_client.client.get_stats().items():
+        counts = stats.pop("latency_counts")
+        providers[provider] = dict(
+            stats,
+            latency_p50=round(histogram_percentile(counts, 0.5), 4),
+            latency_p95=round(histogram_percentile(counts, 0.95), 4),
+            latency_histogram=latency_histogram(counts),
+        )
+    return providers
+
+
+def cache_metrics():
+    import response_cache
+
+    cache = response_cache.get_opened_cache()
+    if cache is None:
+        return {}
+    namespaces = {}
+    for namespace, stats in cache.get_stats().items():
+        total = stats["hits"] + stats["misses"]
+        namespaces[namespace] = dict(
+            stats, hit_rate=round(stats["hits"] / total, 4) if total else None
+        )
+    return namespaces
+
+
+class RunMetrics:
+    # Durées des étapes et compteurs d'une exécution (ou du service depuis son
+    # démarrage, ou d'un traitement /jobs) ; partagé entre les fils d'exécution
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.start_time = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start_time)
+
+    def record_stage(self, name, seconds):
+        with self.lock:
+            stats = self.stages.setdefault(
+                name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        # Ajoute les étapes et compteurs d'une autre exécution (traitement terminé)
+        with other.lock:
+            stages = {name: dict(stats) for name, stats in other.stages.items()}
+            counters = dict(other.counters)
+        with self.lock:
+            for name, stats in stages.items():
+                total = self.stages.setdefault(
+                    name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                )
+                total["count"] += stats["count"]
+                total["total_seconds"] += stats["total_seconds"]
+                total["max_seconds"] = max(total["max_seconds"], stats["max_seconds"])
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_matches(self, matches):
+        # Répartition des requêtes : acceptées automatiquement (dont noms identiques,
+        # alias et sites connus), écartées par un alias, à vérifier (options
+        # proposées) ou sans option pertinente
+        auto_matched = matches.auto_matched
+        # Sans colonne d'options (base vide) : aucune requête n'en a
+        has_candidates = (matches.candidate_rows >= 0).any(axis=1)
+        no_candidate = ~auto_matched & ~has_candidates & ~matches.alias_rejected
+        self.increment("queries", len(auto_matched))
+        self.increment("auto_matched", int(auto_matched.sum()))
+        self.increment("exact_matched", int(matches.exact_matched.sum()))
+        self.increment("alias_matched", int(matches.alias_matched.sum()))
+        self.increment("alias_rejected", int(matches.alias_rejected.sum()))
+        self.increment("domain_matched", int(matches.domain_matched.sum()))
+        self.increment("review", int((~auto_matched & has_candidates).sum()))
+        self.increment("no_candidate", int(no_candidate.sum()))
+
+    def snapshot(self, services=True):
+        # services : appels aux fournisseurs et cache, communs à tout le processus
+        with self.lock:
+            stages = {
+                name: {
+                    "count": stats["count"],
+                    "total_seconds": round(stats["total_seconds"], 4),
+                    "max_seconds": round(stats["max_seconds"], 4),
+                }
+                for name, stats in self.stages.items()
+            }
+            counters = dict(self.counters)
+
+        queries = counters.get("queries", 0)
+        ratios = {
+            name: round(counters.get(name, 0) / queries, 4) if queries else None
+            for name in [
+                "auto_matched",
+                "exact_matched",
+                "alias_matched",
+                "alias_rejected",
+                "domain_matched",
+                "review",
+                "no_candidate",
+            ]
+        }
+        snapshot = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_seconds": round(time.perf_counter() - self.start_time, 4),
+            "stages": stages,
+            "counters": counters,
+            "ratios": ratios,
+        }
+        if services:
+            snapshot["providers"] = provider_metrics()
+            snapshot["cache"] = cache_metrics()
+        return snapshot
+
+
+# Mesures partagées par tous les modules
+run_metrics = RunMetrics()
+
+
+def report_file_path(results_path):
+    return os.path.splitext(results_path)[0] + "_rapport.json"
+
+
+def write_report(results_path, metrics=run_metrics, services=True):
+    # Rapport JSON de l'exécution, enregistré à côté du fichier de résultats
+    report_path = report_file_path(results_path)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(metrics.snapshot(services), f, indent=2, ensure_ascii=False)
+    return report_path
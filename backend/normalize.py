@@ -0,0 +1,190 @@
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+# Formes juridiques et mentions ignorées en début ou en fin de nom
+LEGAL_FORMS = {
+    "sa",
+    "sas",
+    "sasu",
+    "sarl",
+    "eurl",
+    "sci",
+    "snc",
+    "scs",
+    "sca",
+    "scop",
+    "selarl",
+    "gie",
+    "groupe",
+    "group",
+    "cie",
+}
+
+# Caractères qui lient deux lettres ("S.A.S", "L'Oréal") plutôt que de les séparer
+JOINERS = re.compile(r"[.'’]")
+SEPARATORS = re.compile(r"[^a-z0-9]+")
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "&": " et "})
+
+
+def normalize_name(name):
+    # Clé canonique : minuscules, sans accents, ponctuation ni forme juridique
+    if not isinstance(name, str):
+        return ""
+    text = unicodedata.normalize("NFKD", name.lower().translate(LIGATURES))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = SEPARATORS.sub(" ", JOINERS.sub("", text)).split()
+    start, stop = 0, len(tokens)
+    while start < stop and tokens[start] in LEGAL_FORMS:
+        start += 1
+    while stop > start and tokens[stop - 1] in LEGAL_FORMS:
+        stop -= 1
+    # Un nom réduit à sa forme juridique ("Groupe SA") garde tous ses mots
+    return " ".join(tokens[start:stop] or tokens)
+
+
+def dedupe_key(name):
+    # Clé de dédoublonnage : la clé canonique, ou le nom tel quel (aux espaces et
+    # à la casse près) s'il n'en a pas (écriture non latine, ponctuation seule)
+    return normalize_name(name) or name.strip().casefold()
+
+
+def key_hash(key):
+    # Empreinte 64 bits de la clé, stockable dans un tableau NumPy
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def name_hashes(names):
+    # Empreintes des clés des noms ; 0 pour un nom sans clé, jamais recherché
+    hashes = [key_hash(key) if key else 0 for key in map(normalize_name, names)]
+    return np.array(hashes, dtype=np.int64)
+
+
+def build_key_table(hashes, rows):
+    # Table triée des empreintes de clés -> ligne de la base. Les clés portées par
+    # plusieurs lignes sont ambiguës et laissées au rapprochement TF-IDF.
+    keep = hashes != 0
+    unique, first, counts = np.unique(
+        hashes[keep], return_index=True, return_counts=True
+    )
+    return unique[counts == 1], rows[keep][first[counts == 1]].astype(np.int64)
+
+
+def lookup_rows(key_hashes, key_rows, names):
+    # Ligne de la base dont la clé est identique à celle de chaque nom (-1 sinon)
+    rows = np.full(len(names), -1, dtype=np.int64)
+    if len(names) == 0 or len(key_hashes) == 0:
+        return rows
+    hashes = name_hashes(names)
+    positions = np.minimum(np.searchsorted(key_hashes, hashes), len(key_hashes) - 1)
+    found = (key_hashes[positions] == hashes) & (hashes != 0)
+    rows[found] = key_rows[positions[found]]
+    return rows
+
+
+# Champs saisis après le nom : colonnes copiées d'un tableur (séparées par une
+# tabulation), reconnues à leur forme
+FIELD_SEPARATOR = "\t"
+# Un code postal ou un département copié d'Excel a pu perdre son zéro de tête
+# ("6000", "6") : il est complété à la normalisation
+POSTAL_CODE = re.compile(r"^\d{1,2}\s?\d{3}$")
+DEPARTMENT = re.compile(r"^(\d{1,3}|2[ab])$")
+# Une ville contient au moins une lettre
+LETTER = re.compile(r"[^\W\d_]")
+DEPARTMENT_CODE = re.compile(r"\b(\d{1,3}|2[ab])\b")
+DOMAIN = re.compile(r"^(https?://)?[a-z0-9-]+(\.[a-z0-9-]+)+(:\d+)?(/\S*)?$")
+
+# Mentions ignorées dans un nom de ville ("Paris Cedex 08", "Lyon 3e")
+CITY_NOISE = re.compile(r"\b(cedex|arrondissement|\d+(er|e|eme)?)\b")
+CITY_ABBREVIATIONS = {"st": "saint", "ste": "sainte"}
+
+
+def value_text(value):
+    # Les valeurs lues comme des nombres ont perdu leur zéro de tête (1000.0)
+    if isinstance(value, float):
+        return "" if np.isnan(value) else str(int(value))
+    if isinstance(value, (int, np.integer)):
+        return str(value)
+    return value if isinstance(value, str) else ""
+
+
+def normalize_postal_code(value):
+    digits = re.sub(r"\D", "", value_text(value))
+    return digits.zfill(5) if len(digits) in (4, 5) else ""
+
+
+def normalize_department(value):
+    # Numéro du département, seul ou suivi de son nom ("75 - Paris")
+    match = DEPARTMENT_CODE.search(value_text(value).lower())
+    return match.group(1).zfill(2) if match else ""
+
+
+def normalize_city(value):
+    key = CITY_NOISE.sub(" ", normalize_name(value_text(value)))
+    return " ".join(CITY_ABBREVIATIONS.get(token, token) for token in key.split())
+
+
+def normalize_domain(value):
+    # Nom d'hôte sans "www." : "https://www.fsg.fr/contact" -> "fsg.fr"
+    text = value_text(value).strip().lower()
+    if not text:
+        return ""
+    host = text.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def classify_field(value):
+    # Attribut d'un champ saisi après le nom, d'après sa forme
+    text = value.strip().lower()
+    if not text:
+        return None
+    if POSTAL_CODE.match(text):
+        return "code_postal"
+    if DEPARTMENT.match(text):
+        return "departement"
+    if DOMAIN.match(text):
+        return "domaine"
+    # Un champ sans lettre (SIRET, téléphone...) n'est pas une ville
+    if LETTER.search(text):
+        return "ville"
+    return None
+
+
+def split_input_line(line):
+    # "Nom<TAB>Ville<TAB>Site" -> ("Nom", {"ville": ..., "domaine": ...})
+    name, *fields = line.split(FIELD_SEPARATOR)
+    attributes = {}
+    for field in fields:
+        attribute = classify_field(field)
+        if attribute is not None:
+            attributes.setdefault(attribute, field.strip())
+    return name.strip(), attributes
+
+
+def dedupe_companies(companies):
+    # Couples (nom, attributs) sans doublon de nom (à la clé près) : les attributs
+    # de la première occurrence sont conservés
+    unique = {}
+    for name, attributes in companies:
+        if name and name.strip():
+            unique.setdefault(dedupe_key(name), (name, attributes))
+    return [name for name, _ in unique.values()], [
+        attributes for _, attributes in unique.values()
+    ]
+
+
+def dedupe_inputs(lines):
+    # Noms et attributs des lignes saisies, sans doublon de nom
+    return dedupe_companies(split_input_line(line) for line in lines)
+
+
+def dedupe_names(names):
+    # Suppression des doublons à la clé près, dans l'ordre de saisie
+    unique = {}
+    for name in names:
+        if name.strip():
+            unique.setdefault(dedupe_key(name), name)
+    return list(unique.values())
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Cache local des réponses SerpAPI et Pappers
+cache_file_path = os.environ.get(
+    "FSG_CACHE_PATH", os.path.join("..", "sources", "cache", "responses.sqlite3")
+)
+
+# Durée de validité des réponses par fournisseur (en jours)
+CACHE_TTL_DAYS = {
+    "serpapi": float(os.environ.get("SERPAPI_CACHE_TTL_DAYS", "30")),
+    "pappers": float(os.environ.get("PAPPERS_CACHE_TTL_DAYS", "90")),
+}
+
+# Taille maximale du cache ; les entrées les moins récemment lues sont évincées
+CACHE_MAX_BYTES = int(os.environ.get("FSG_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Mode hors ligne : seules les réponses en cache sont utilisées, sans réseau
+OFFLINE = os.environ.get("FSG_OFFLINE", "0") == "1"
+
+MISSING = object()
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path=cache_file_path,
+        ttl_days=None,
+        max_bytes=CACHE_MAX_BYTES,
+        offline=OFFLINE,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_days = dict(CACHE_TTL_DAYS, **(ttl_days or {}))
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = {}
+        self.misses = {}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)"
+        )
+        self.connection.commit()
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def ttl_seconds(self, namespace):
+        # L'espace de noms commence par le fournisseur : "serpapi_search", "pappers"...
+        provider = namespace.split("_")[0]
+        return self.ttl_days.get(provider, 30) * 24 * 3600
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, size, created_at FROM responses "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds(namespace):
+                # Réponse périmée : supprimée et traitée comme absente
+                self.delete(namespace, key, row[1])
+                row = None
+            if row is None:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                return MISSING
+            self.connection.execute(
+                "UPDATE responses SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self.connection.commit()
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM responses WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), now, now),
+            )
+            self.total_bytes += len(data) - (previous[0] if previous else 0)
+            self.evict()
+            self.connection.commit()
+
+    def delete(self, namespace, key, size):
+        self.connection.execute(
+            "DELETE FROM responses WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+        self.total_bytes -= size
+
+    def evict(self):
+        # Éviction LRU jusqu'à 90% de la taille maximale
+        while self.total_bytes > self.max_bytes * 0.9 and self.total_bytes > 0:
+            rows = self.connection.execute(
+                "SELECT namespace, key, size FROM responses "
+                "ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for namespace, key, size in rows:
+                self.delete(namespace, key, size)
+                if self.total_bytes <= self.max_bytes * 0.9:
+                    break
+
+    def fetch(self, namespace, key, compute, default=None, cache_none=True):
+        # Réponse en cache si disponible, sinon appel réseau puis mise en cache.
+        # En mode hors ligne, une absence du cache donne la valeur par défaut.
+        value = self.get(namespace, key)
+        if value is not MISSING:
+            return value
+        if self.offline:
+            return default
+        value = compute()
+        if value is not None or cache_none:
+            self.set(namespace, key, value)
+        return value
+
+    def get_stats(self):
+        with self.lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            return {
+                namespace: {
+                    "hits": self.hits.get(namespace, 0),
+                    "misses": self.misses.get(namespace, 0),
+                }
+                for namespace in namespaces
+            }
+
+    def print_summary(self):
+        for namespace, stats in self.get_stats().items():
+            total = stats["hits"] + stats["misses"]
+            print(
+                f"  - {namespace}: {stats['hits']}/{total} réponses lues dans le cache"
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # Cache partagé, ouvert au premier usage
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def get_opened_cache():
+    # Cache partagé s'il a déjà été ouvert, sans l'ouvrir
+    with _cache_lock:
+        return _cache
@@ -0,0 +1,117 @@
+import csv
+
+from matcher import MAX_CANDIDATES, NO_MATCH
+
+# Colonnes du fichier de revue : l'utilisateur remplit "Choix" avec le numéro
+# de l'option retenue, ou le laisse vide si aucune option n'est pertinente. Les
+# colonnes "Ligne" donnent la position de chaque option dans la base.
+review_headers = ["Entrée", "Choix"]
+for option in range(1, MAX_CANDIDATES + 1):
+    review_headers += [f"Option {option}", f"Score {option}"]
+row_headers = [f"Ligne {option}" for option in range(1, MAX_CANDIDATES + 1)]
+
+
+def write_review_file(file_path, entries):
+    # entries : (requête, [(entreprise, score, position), ...]) triées par score
+    # décroissant
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(review_headers + row_headers)
+        for query, candidates in entries:
+            row = [query, ""]
+            positions = []
+            for company, score, position in candidates[:MAX_CANDIDATES]:
+                row += [company, f"{score * 100:.2f}%"]
+                positions.append(position)
+            row += [""] * (len(review_headers) - len(row))
+            writer.writerow(row + positions)
+
+
+def read_review_file(file_path):
+    # Renvoie, pour chaque ligne, la requête, ses options (entreprise, score,
+    # position dans la base) et le choix saisi. Un fichier sans colonnes "Ligne"
+    # donne la position -1 : l'entreprise est alors retrouvée par son nom.
+    entries = []
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        row_columns = [
+            header.index(name) if name in header else None for name in row_headers
+        ]
+        for row in reader:
+            if not row:
+                continue
+            row += [""] * (max(len(header), len(review_headers)) - len(row))
+            options = []
+            for option, i in enumerate(range(2, len(review_headers), 2)):
+                if row[i]:
+                    column = row_columns[option]
+                    position = row[column].strip() if column is not None else ""
+                    options.append(
+                        (
+                            row[i],
+                            float(row[i + 1].rstrip("%")) / 100,
+                            int(position) if position.isdigit() else -1,
+                        )
+                    )
+            entries.append((row[0], options, row[1].strip()))
+    return entries
+
+
+def resolve_choice(query, options, choice):
+    # Même résultat que get_user_choice pour le choix saisi dans le fichier
+    if choice == "":
+        return (NO_MATCH, 0, "utilisateur", -1)
+    if choice.isdigit() and 1 <= int(choice) <= len(options):
+        return chosen_option(options[int(choice) - 1])
+    raise ValueError(f"Choix non valide pour '{query}' : {choice}")
+
+
+def chosen_option(option):
+    # (entreprise, score, source, position dans la base) de l'option retenue
+    company, score, row = option
+    return (company, score, "Utilisateur", row)
+
+
+def get_user_choice(query, best_match, probable_matches, total_checks, current_check):
+    # Choix interactif parmi les correspondances probables, déjà triées par score
+    # décroissant, filtrées au-dessus du seuil et limitées aux meilleures
+    print(
+        f"\nAucune correspondance satisfaisante trouvée pour | {query} | "
+        f"({current_check}/{total_checks})"
+    )
+
+    if not probable_matches:
+        print("Aucune option pertinente disponible.")
+        print("\n______________________________")
+        return (NO_MATCH, 0, "utilisateur", -1)
+
+    options = probable_matches
+
+    # Afficher les options
+    print()
+    for i, (company, score, _) in enumerate(options):
+        print(f"    {i + 1}. {company} ({score * 100:.2f}%)    ")
+    print()
+
+    # Demander le choix de l'utilisateur
+    while True:
+        choice = input(
+            "Choisissez l'option la plus probable (appuyez simplement sur Entrée "
+            "pour aucune option pertinente) : "
+        )
+        if choice == "":
+            print("Aucune option sélectionnée.")
+            print("\n______________________________")
+            return (NO_MATCH, 0, "utilisateur", -1)
+        if choice.isdigit() and 1 <= int(choice) <= len(options):
+            print("Option sélectionnée avec succès.")
+            print("\n______________________________")
+            return chosen_option(options[int(choice) - 1])
+        if choice.isdigit():
+            print("Option non valide. Veuillez réessayer.")
+        else:
+            print(
+                "Veuillez entrer un numéro valide ou simplement appuyer sur Entrée "
+                "pour aucune option pertinente."
+            )
@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from database import read_manifest, remove_manifest, write_manifest
+from similarity import DEFAULT_MAX_MEMORY, merge_top_k, top_k_similarities
+
+# Nombre de processus de calcul des similarités (1 : calcul dans le processus)
+MATCH_WORKERS = int(os.environ.get("FSG_MATCH_WORKERS", "1"))
+
+# Taille de base en dessous de laquelle le coût des processus n'est pas rentable
+SHARD_MIN_ROWS = int(os.environ.get("FSG_SHARD_MIN_ROWS", "200000"))
+
+# Découpage en un peu plus de tranches que de processus, pour équilibrer la charge
+SHARDS_PER_WORKER = 2
+
+# À incrémenter si le format des fichiers partagés change
+SHARED_VERSION = 2
+
+SHARED_ARRAYS = ["data", "indices", "indptr"]
+LIVE_FILE = "live.npy"
+
+# Matrice de la base vue par un processus de calcul (fichiers projetés en mémoire)
+# et lignes encore présentes dans la base (None : aucune supprimée)
+_matrix = None
+_live = None
+
+
+def save_shared_matrix(matrix, directory, state, live=None):
+    # Les tableaux CSR sont écrits tels quels : chaque processus les projette en
+    # mémoire sans les copier, les pages étant partagées par le système. Les
+    # lignes supprimées de la base sont écartées à l'aide du masque live.
+    # matrix vaut None pour une matrice déjà projetée depuis ses propres fichiers
+    # (mode "hashing") : seul le masque est alors écrit, sans copie de la matrice.
+    os.makedirs(directory, exist_ok=True)
+    remove_manifest(directory)
+    for name in SHARED_ARRAYS:
+        path = os.path.join(directory, f"{name}.npy")
+        if matrix is not None:
+            np.save(path, getattr(matrix, name))
+        elif os.path.exists(path):
+            os.remove(path)
+    live_path = os.path.join(directory, LIVE_FILE)
+    if live is not None:
+        np.save(live_path, live)
+    elif os.path.exists(live_path):
+        os.remove(live_path)
+    manifest = {"version": SHARED_VERSION, "state": state}
+    if matrix is not None:
+        manifest["shape"] = list(matrix.shape)
+    write_manifest(directory, manifest)
+
+
+def is_shared_matrix_fresh(directory, state):
+    manifest = read_manifest(directory)
+    return (
+        manifest is not None
+        and manifest.get("version") == SHARED_VERSION
+        and manifest.get("state") == state
+    )
+
+
+def open_shared_matrix(directory):
+    shape = tuple(read_manifest(directory)["shape"])
+    data, indices, indptr = [
+        np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in SHARED_ARRAYS
+    ]
+    return data, indices, indptr, shape
+
+
+def shard_rows(matrix, start, stop):
+    # Lignes [start, stop) sans copie des valeurs ni des indices de colonnes
+    data, indices, indptr, shape = matrix
+    first, last = indptr[start], indptr[stop]
+    return sparse.csr_matrix(
+        (
+            data[first:last],
+            indices[first:last],
+            np.asarray(indptr[start : stop + 1] - first, dtype=indices.dtype),
+        ),
+        shape=(stop - start, shape[1]),
+        copy=False,
+    )
+
+
+def init_worker(directory, open_matrix=None, matrix_args=()):
+    # open_matrix(*matrix_args) : matrice CSR projetée en mémoire depuis ses
+    # propres fichiers ; à défaut, celle écrite dans directory
+    global _matrix, _live
+    if open_matrix is None:
+        _matrix = open_shared_matrix(directory)
+    else:
+        matrix = open_matrix(*matrix_args)
+        _matrix = (matrix.data, matrix.indices, matrix.indptr, matrix.shape)
+    live_path = os.path.join(directory, LIVE_FILE)
+    _live = np.load(live_path) if os.path.exists(live_path) else None
+
+
+def score_shard(query_matrix, start, stop, k, max_memory):
+    # Exécuté dans un processus de calcul : k meilleures lignes de la tranche
+    indices, scores = top_k_similarities(
+        query_matrix,
+        shard_rows(_matrix, start, stop),
+        k,
+        max_memory=max_memory,
+        live=_live[start:stop] if _live is not None else None,
+    )
+    return indices + start, scores
+
+
+class ShardPool:
+    # Calcul des similarités réparti entre plusieurs processus, chacun sur des
+    # tranches de lignes de la matrice partagée
+    def __init__(
+        self,
+        directory,
+        num_rows,
+        workers=MATCH_WORKERS,
+        open_matrix=None,
+        matrix_args=(),
+    ):
+        self.workers = workers
+        num_shards = workers * SHARDS_PER_WORKER
+        bounds = np.linspace(0, num_rows, num_shards + 1).astype(np.int64)
+        self.shards = [
+            (int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        # "spawn" : les processus ne dupliquent pas l'état du processus principal
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(directory, open_matrix, matrix_args),
+        )
+
+    def top_k(self, query_matrix, k, max_memory=DEFAULT_MAX_MEMORY):
+        query_matrix = query_matrix.tocsr()
+        num_queries = query_matrix.shape[0]
+        futures = [
+            self.executor.submit(
+                score_shard, query_matrix, start, stop, k, max_memory // self.workers
+            )
+            for start, stop in self.shards
+        ]
+
+        # Fusion dans l'ordre des tranches : à score égal, la plus petite ligne reste
+        # devant, comme dans le calcul sur un seul processus
+        best_indices = np.empty((num_queries, 0), dtype=np.int64)
+        best_scores = np.empty((num_queries, 0), dtype=np.float64)
+        for future in futures:
+            indices, scores = future.result()
+            best_indices, best_scores = merge_top_k(
+                best_indices, best_scores, indices, scores, k
+            )
+        return best_indices, best_scores
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,126 @@
+import numpy as np
+
+# Plafond mémoire par défaut pour un bloc de scores (en octets)
+DEFAULT_MAX_MEMORY = 256 * 1024 * 1024
+
+# Nombre de requêtes traitées ensemble au maximum
+DEFAULT_QUERY_CHUNK = 1024
+
+# Coût approximatif d'une cellule requête × référence dans un bloc :
+# produit creux, scores denses (float64), masques et cumul (int64)
+BYTES_PER_CELL = 32
+
+
+def block_shape(num_queries, num_references, k, max_memory, block_rows=None):
+    query_chunk = max(1, min(num_queries, DEFAULT_QUERY_CHUNK))
+    if block_rows is None:
+        block_rows = max_memory // (BYTES_PER_CELL * query_chunk)
+    block_rows = max(k, min(int(block_rows), num_references))
+    return query_chunk, block_rows
+
+
+def block_top_k(scores, k):
+    # Sélection exacte des k meilleurs scores de chaque ligne du bloc ;
+    # à score égal, l'indice le plus petit l'emporte (comme np.argmax)
+    num_rows, num_cols = scores.shape
+    if k >= num_cols:
+        selected = np.ones(scores.shape, dtype=bool)
+    else:
+        kth = np.partition(scores, num_cols - k, axis=1)[:, num_cols - k]
+        above = scores > kth[:, None]
+        needed = k - above.sum(axis=1)
+        equal = scores == kth[:, None]
+        selected = above | (equal & (np.cumsum(equal, axis=1) <= needed[:, None]))
+
+    # np.nonzero parcourt les lignes dans l'ordre : indices croissants par ligne
+    _, columns = np.nonzero(selected)
+    columns = columns.reshape(num_rows, -1)
+    values = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-values, axis=1, kind="stable")
+    return (
+        np.take_along_axis(columns, order, axis=1),
+        np.take_along_axis(values, order, axis=1),
+    )
+
+
+def merge_top_k(best_indices, best_scores, indices, scores, k):
+    # Les candidats déjà retenus ont des indices plus petits que ceux du bloc :
+    # un tri stable conserve donc l'ordre (score décroissant, indice croissant)
+    all_indices = np.concatenate([best_indices, indices], axis=1)
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    order = np.argsort(-all_scores, axis=1, kind="stable")[:, :k]
+    return (
+        np.take_along_axis(all_indices, order, axis=1),
+        np.take_along_axis(all_scores, order, axis=1),
+    )
+
+
+def top_k_similarities(
+    query_matrix,
+    reference_matrix,
+    k,
+    block_rows=None,
+    max_memory=DEFAULT_MAX_MEMORY,
+    live=None,
+):
+    # Similarité cosinus (vecteurs TF-IDF normalisés) des requêtes contre la base,
+    # calculée par blocs de lignes de référence pour ne jamais matérialiser
+    # la matrice dense requêtes × base. Renvoie, pour chaque requête, les indices
+    # et scores des k meilleures références, triés par score décroissant.
+    # live : lignes encore présentes dans la base ; les autres ont un score nul.
+    num_queries = query_matrix.shape[0]
+    num_references = reference_matrix.shape[0]
+    k = min(k, num_references)
+
+    top_indices = np.empty((num_queries, k), dtype=np.int64)
+    top_scores = np.empty((num_queries, k), dtype=np.float64)
+    if num_queries == 0 or k == 0:
+        return top_indices, top_scores
+
+    query_chunk, block_rows = block_shape(
+        num_queries, num_references, k, max_memory, block_rows
+    )
+    reference_matrix = reference_matrix.tocsr()
+
+    for query_start in range(0, num_queries, query_chunk):
+        query_stop = min(query_start + query_chunk, num_queries)
+        queries = query_matrix[query_start:query_stop]
+        best_indices = np.empty((query_stop - query_start, 0), dtype=np.int64)
+        best_scores = np.empty((query_stop - query_start, 0), dtype=np.float64)
+
+        for block_start in range(0, num_references, block_rows):
+            block = reference_matrix[block_start : block_start + block_rows]
+            # Produit creux × creux, densifié seulement à l'échelle du bloc
+            scores = (queries @ block.T).toarray()
+            if live is not None:
+                scores[:, ~live[block_start : block_start + block.shape[0]]] = 0.0
+            indices, scores = block_top_k(scores, min(k, scores.shape[1]))
+            best_indices, best_scores = merge_top_k(
+                best_indices, best_scores, indices + block_start, scores, k
+            )
+
+        top_indices[query_start:query_stop] = best_indices
+        top_scores[query_start:query_stop] = best_scores
+
+    return top_indices, top_scores
+
+
+def candidate_top_k(query_matrix, reference_matrix, candidate_rows, k, live=None):
+    # Similarité exacte limitée aux lignes candidates de chaque requête (triées par
+    # ligne croissante), hors lignes supprimées de la base (live). Les requêtes
+    # sans candidat gardent -1 et un score nul.
+    num_queries = query_matrix.shape[0]
+    top_indices = np.full((num_queries, k), -1, dtype=np.int64)
+    top_scores = np.zeros((num_queries, k), dtype=np.float64)
+
+    for i, rows in enumerate(candidate_rows):
+        if live is not None:
+            rows = rows[live[rows]]
+        if len(rows) == 0 or k == 0:
+            continue
+        scores = (query_matrix[i] @ reference_matrix[rows].T).toarray()
+        indices, scores = block_top_k(scores, min(k, len(rows)))
+        top_indices[i, : indices.shape[1]] = rows[indices[0]]
+        top_scores[i, : indices.shape[1]] = scores[0]
+
+    return top_indices, top_scores
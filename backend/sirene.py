@@ -0,0 +1,236 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+# Base SIRENE locale (fichiers stock de l'Insee), consultée avant Pappers
+sirene_file_path = os.environ.get(
+    "FSG_SIRENE_PATH", os.path.join("..", "sources", "sirene.sqlite3")
+)
+
+# Lignes lues par bloc à l'import : la mémoire reste bornée quelle que soit la
+# taille du fichier
+CHUNK_ROWS = 100_000
+
+# Colonnes du fichier StockEtablissement -> colonnes de la table etablissements
+ETABLISSEMENT_COLUMNS = {
+    "siret": "siret",
+    "siren": "siren",
+    "dateCreationEtablissement": "date_creation",
+    "trancheEffectifsEtablissement": "tranche_effectif",
+    "activitePrincipaleEtablissement": "code_naf",
+    "etablissementSiege": "siege",
+    "numeroVoieEtablissement": "numero_voie",
+    "indiceRepetitionEtablissement": "indice_repetition",
+    "typeVoieEtablissement": "type_voie",
+    "libelleVoieEtablissement": "libelle_voie",
+    "complementAdresseEtablissement": "complement_adresse",
+    "codePostalEtablissement": "code_postal",
+    "libelleCommuneEtablissement": "ville",
+    "etatAdministratifEtablissement": "etat",
+    "dateDebut": "date_debut",
+    "enseigne1Etablissement": "enseigne",
+    "denominationUsuelleEtablissement": "denomination_usuelle",
+}
+
+# Colonnes du fichier StockUniteLegale -> colonnes de la table unites_legales
+UNITE_LEGALE_COLUMNS = {
+    "siren": "siren",
+    "denominationUniteLegale": "denomination",
+    "nomUniteLegale": "nom",
+    "prenom1UniteLegale": "prenom",
+    "etatAdministratifUniteLegale": "etat",
+    "dateDebut": "date_debut",
+}
+
+# Tranches d'effectif de l'Insee : code -> (libellé, effectif maximum)
+TRANCHES_EFFECTIF = {
+    "NN": ("Unité non employeuse", None),
+    "00": ("0 salarié", 0),
+    "01": ("Entre 1 et 2 salariés", 2),
+    "02": ("Entre 3 et 5 salariés", 5),
+    "03": ("Entre 6 et 9 salariés", 9),
+    "11": ("Entre 10 et 19 salariés", 19),
+    "12": ("Entre 20 et 49 salariés", 49),
+    "21": ("Entre 50 et 99 salariés", 99),
+    "22": ("Entre 100 et 199 salariés", 199),
+    "31": ("Entre 200 et 249 salariés", 249),
+    "32": ("Entre 250 et 499 salariés", 499),
+    "41": ("Entre 500 et 999 salariés", 999),
+    "42": ("Entre 1 000 et 1 999 salariés", 1999),
+    "51": ("Entre 2 000 et 4 999 salariés", 4999),
+    "52": ("Entre 5 000 et 9 999 salariés", 9999),
+    "53": ("10 000 salariés et plus", None),
+}
+
+
+def ingest(connection, table, csv_path, columns, chunk_size=CHUNK_ROWS):
+    # Lecture en continu du fichier (CSV ou ZIP de l'Insee), par blocs de lignes
+    names = list(columns.values())
+    connection.execute(f"CREATE TABLE {table} ({', '.join(names)})")
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(names))})"
+    num_rows = 0
+    chunks = pd.read_csv(
+        csv_path,
+        usecols=list(columns),
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+    )
+    for chunk in chunks:
+        # Les champs vides sont enregistrés comme absents ; conversion par tableau,
+        # bien plus rapide que ligne à ligne
+        values = chunk[list(columns)].to_numpy(dtype=object)
+        values[values == ""] = None
+        connection.executemany(insert, values.tolist())
+        num_rows += len(chunk)
+        print(f"  {table} : {num_rows} lignes", end="\r", flush=True)
+    print()
+    return num_rows
+
+
+def build_store(etablissements_path, unites_legales_path=None, path=sirene_file_path):
+    # La base est écrite à côté puis remplace l'ancienne d'un coup : une lecture
+    # en cours ne voit jamais une base à moitié importée
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    start_time = time.time()
+    connection = sqlite3.connect(temp_path)
+    # Import en masse : pas de journal, les index sont créés après les insertions
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    ingest(connection, "etablissements", etablissements_path, ETABLISSEMENT_COLUMNS)
+    connection.execute(
+        "CREATE UNIQUE INDEX etablissements_siret ON etablissements (siret)"
+    )
+    if unites_legales_path:
+        ingest(connection, "unites_legales", unites_legales_path, UNITE_LEGALE_COLUMNS)
+        connection.execute(
+            "CREATE UNIQUE INDEX unites_legales_siren ON unites_legales (siren)"
+        )
+    connection.commit()
+    connection.close()
+    os.replace(temp_path, path)
+    print(f"Base SIRENE écrite dans {path} en {time.time() - start_time:.0f} secondes")
+
+
+def address_line(row):
+    parts = [
+        row["numero_voie"],
+        row["indice_repetition"],
+        row["type_voie"],
+        row["libelle_voie"],
+    ]
+    return " ".join(part for part in parts if part) or None
+
+
+def company_info(row):
+    # Informations au format de get_company_info ; les champs absents des fichiers
+    # SIRENE (chiffre d'affaires, domaine d'activité...) valent None
+    label, maximum = TRANCHES_EFFECTIF.get(row["tranche_effectif"], (None, None))
+    # Cessation de l'entreprise (unité légale) si connue, de l'établissement sinon
+    if row["etat_unite_legale"]:
+        closed = row["etat_unite_legale"] == "C"
+        closing_date = row["debut_unite_legale"]
+    else:
+        closed = row["etat"] == "F"
+        closing_date = row["date_debut"]
+    denomination = row["denomination"]
+    if not denomination and row["nom"]:
+        denomination = " ".join(part for part in [row["prenom"], row["nom"]] if part)
+    return {
+        "siret": row["siret"],
+        "siren": row["siren"],
+        "code_naf": row["code_naf"],
+        "activite": None,
+        "libelle_code_naf": None,
+        "date_creation": row["date_creation"],
+        "entreprise_cessee": closed,
+        "date_cessation": closing_date if closed else None,
+        "effectif": maximum,
+        "tranche_effectif": label,
+        "enseigne": row["enseigne"] or row["denomination_usuelle"],
+        "denomination": denomination or row["denomination_usuelle"],
+        "chiffre_affaires": None,
+        "adresse_1": address_line(row),
+        "adresse_2": row["complement_adresse"],
+        "code_postal": row["code_postal"],
+        "ville": row["ville"],
+    }
+
+
+class SireneStore:
+    # Lecture seule ; une recherche par SIRET passe par un index SQLite
+    def __init__(self, path=sirene_file_path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.connection.row_factory = sqlite3.Row
+        tables = {
+            name
+            for (name,) in self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        # Sans le fichier des unités légales, la dénomination vient de l'établissement
+        if "unites_legales" in tables:
+            self.query = (
+                "SELECT e.*, u.denomination, u.nom, u.prenom, "
+                "u.etat AS etat_unite_legale, u.date_debut AS debut_unite_legale "
+                "FROM etablissements e LEFT JOIN unites_legales u "
+                "ON u.siren = e.siren WHERE e.siret = ?"
+            )
+        else:
+            self.query = (
+                "SELECT e.*, NULL AS denomination, NULL AS nom, NULL AS prenom, "
+                "NULL AS etat_unite_legale, NULL AS debut_unite_legale "
+                "FROM etablissements e WHERE e.siret = ?"
+            )
+
+    def lookup(self, siret):
+        with self.lock:
+            row = self.connection.execute(self.query, (siret,)).fetchone()
+        return company_info(row) if row is not None else None
+
+    def close(self):
+        self.connection.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_sirene_store():
+    # Base partagée, ouverte au premier usage ; None si elle n'a pas été importée
+    global _store
+    with _store_lock:
+        if _store is None and os.path.exists(sirene_file_path):
+            _store = SireneStore()
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Importe les fichiers stock SIRENE de l'Insee dans une base "
+        "locale, consultée avant Pappers."
+    )
+    parser.add_argument("etablissements", help="StockEtablissement_utf8 (CSV ou ZIP)")
+    parser.add_argument(
+        "--unites-legales", help="StockUniteLegale_utf8 (CSV ou ZIP), pour les noms"
+    )
+    parser.add_argument("--output", default=sirene_file_path)
+    args = parser.parse_args(argv)
+    build_store(args.etablissements, args.unites_legales, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Les modules du dossier backend s'importent à plat, comme depuis ce dossier ;
+# ceux de benchmarks (faux serveur SerpAPI et Pappers) de même
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(1, os.path.join(BACKEND_DIR, "benchmarks"))
@@ -0,0 +1,123 @@
+import importlib
+import io
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from aliases import AliasStore
+from export import export_column_names
+from jobs import DONE, FAILED
+from response_cache import ResponseCache
+
+COMPANIES = ["ACME INDUSTRIE", "BETA TRANSPORTS", "GAMMA CONSEIL", "DELTA ENERGIE"]
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # Service lancé sur une petite base, depuis un dossier de travail dont
+    # ../sources contient la base, l'index, les alias et les traitements
+    root = tmp_path_factory.mktemp("service")
+    os.makedirs(root / "sources")
+    os.makedirs(root / "backend")
+    database = pd.DataFrame({"Company": COMPANIES})
+    for column in export_column_names:
+        database[column] = ""
+    database["SIRET"] = [f"{i:014d}" for i in range(1, len(COMPANIES) + 1)]
+    database.to_csv(root / "sources" / "database.csv", index=False)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(root / "backend")
+        app = importlib.import_module("app")
+        store = AliasStore(str(root / "sources" / "aliases.sqlite3"))
+        monkeypatch.setattr(app, "get_alias_store", lambda: store)
+        monkeypatch.setattr("jobs.get_alias_store", lambda: store)
+        # Recherches web hors ligne : cache vide, aucun appel réseau
+        cache = ResponseCache(str(root / "sources" / "responses.sqlite3"), offline=True)
+        monkeypatch.setattr("enrichment.get_cache", lambda: cache)
+        yield app.app.test_client()
+
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = client.get(f"/jobs/{job_id}").get_json()
+        if state["status"] in (DONE, FAILED):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"Traitement {job_id} non terminé")
+
+
+def test_match_returns_best_match_and_options(client):
+    response = client.post(
+        "/match", json=["Acme Industrie SAS", {"name": "Beta Transport"}, "Zzz"]
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["query"] for result in results] == [
+        "Acme Industrie SAS",
+        "Beta Transport",
+        "Zzz",
+    ]
+    assert results[0]["exact_match"] and results[0]["auto_matched"]
+    assert results[0]["best_match"]["company"] == "ACME INDUSTRIE"
+    assert results[0]["best_match"]["siret"] == "00000000000001"
+    assert results[2]["best_match"] is None
+    assert results[2]["candidates"] == []
+
+
+def test_match_rejects_invalid_payload(client):
+    assert client.post("/match", json={"name": "ACME"}).status_code == 400
+    assert client.post("/match", data="ACME").status_code == 400
+
+
+def test_job_runs_in_background(client):
+    service_queries = client.get("/metrics").get_json()["counters"].get("queries", 0)
+    response = client.post(
+        "/jobs", json={"companies": ["acme industrie", "Inconnue SA"], "format": "csv"}
+    )
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    assert response.headers["Location"].endswith(f"/jobs/{job_id}")
+
+    state = wait_for_job(client, job_id)
+    assert state["status"] == DONE, state["error"]
+    assert state["companies"] == 2
+    assert state["metrics"]["counters"]["queries"] == 2
+    assert job_id in [job["id"] for job in client.get("/jobs").get_json()["jobs"]]
+
+    result = client.get(state["result_url"])
+    assert result.status_code == 200
+    lines = result.get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+    assert "ACME INDUSTRIE" in lines[1]
+    assert lines[2].startswith("Inconnue SA")
+    assert client.get(f"/jobs/{job_id}/review").status_code == 404
+
+    # Les mesures du traitement sont tenues à part de celles de /match
+    metrics = client.get("/metrics").get_json()
+    assert metrics["counters"].get("queries", 0) == service_queries
+    assert metrics["jobs"]["counters"]["queries"] >= 2
+
+
+def test_job_accepts_uploaded_file(client):
+    response = client.post(
+        "/jobs",
+        data={
+            "file": (
+                io.BytesIO("GAMMA CONSEIL\nDelta Energie\n".encode()),
+                "liste.txt",
+            ),
+            "format": "csv",
+        },
+    )
+    assert response.status_code == 202
+    state = wait_for_job(client, response.get_json()["id"])
+    assert state["status"] == DONE, state["error"]
+    assert state["counts"]["auto_matched"] == 2
+
+
+def test_unknown_job_and_empty_list(client):
+    assert client.get("/jobs/inconnu").status_code == 404
+    assert client.post("/jobs", json=[]).status_code == 400
@@ -0,0 +1,46 @@
+import argparse
+
+import pandas as pd
+
+import batch
+from aliases import AliasStore
+from export import export_column_names
+from matcher import NO_MATCH
+from review import write_review_file
+
+
+def test_apply_review_skips_blank_choices(tmp_path, monkeypatch):
+    # Une ligne laissée vide ne devient pas un alias « aucune correspondance »
+    store = AliasStore(str(tmp_path / "aliases.sqlite3"))
+    database = pd.DataFrame(
+        {"Company": ["ACME", "BETA"]}
+        | {column: ["", ""] for column in export_column_names}
+    )
+    monkeypatch.setattr(batch, "get_alias_store", lambda: store)
+    monkeypatch.setattr(batch, "load_database", lambda *args, **kwargs: database)
+    monkeypatch.setattr(
+        batch,
+        "search_companies",
+        lambda queries: {query: [query, NO_MATCH] for query in queries},
+    )
+
+    review_path = tmp_path / "liste_revue.csv"
+    write_review_file(
+        review_path,
+        [("acme sa", [("ACME", 0.8, 0)]), ("beta sarl", [("BETA", 0.7, 1)])],
+    )
+    lines = review_path.read_text(encoding="utf-8").splitlines()
+    lines[1] = lines[1].replace("acme sa,", "acme sa,1", 1)
+    review_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    batch.apply_review(
+        argparse.Namespace(
+            review_file=str(review_path),
+            results=None,
+            output_dir=str(tmp_path),
+            format="csv",
+        )
+    )
+    assert [(alias.query, alias.company) for alias in store.all()] == [
+        ("acme sa", "ACME")
+    ]
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+
+from checkpoint import open_journal, read_records
+from matcher import select_candidates
+
+
+def make_matches():
+    return select_candidates(
+        np.array([[0, 1], [1, 0]]), np.array([[0.95, 0.6], [0.7, 0.55]])
+    )
+
+
+def start_run(tmp_path, csv_path):
+    journal = open_journal("batch", source="liste.txt", directory=str(tmp_path))
+    journal.record_inputs(["acme", "beta"], [{}, {"ville": "Lyon"}], 3)
+    journal.record_matches(make_matches(), str(csv_path))
+    journal.record_choice("beta", ("BETA", 0.7, "Utilisateur", 1))
+    journal.close()
+    return journal.path
+
+
+def test_resume_restores_recorded_state(tmp_path):
+    csv_path = tmp_path / "database.csv"
+    csv_path.write_text("Company\nACME\nBETA\n", encoding="utf-8")
+    path = start_run(tmp_path, csv_path)
+
+    journal = open_journal(
+        "batch", resume="latest", source="liste.txt", directory=str(tmp_path)
+    )
+    assert journal.path == path
+    assert journal.queries == ["acme", "beta"]
+    assert journal.attributes == [{}, {"ville": "Lyon"}]
+    assert journal.num_submitted == 3
+    np.testing.assert_array_equal(
+        journal.matches_for(str(csv_path)).candidate_rows, make_matches().candidate_rows
+    )
+    assert journal.choices == {"beta": ("BETA", 0.7, "Utilisateur", 1)}
+
+    # Une exécution terminée n'est plus reprise
+    journal.finish("resultats.xlsx")
+    journal.close()
+    resumed = open_journal(
+        "batch", resume="latest", source="liste.txt", directory=str(tmp_path)
+    )
+    assert resumed.path != path
+    resumed.close()
+
+
+def test_changed_database_discards_matches(tmp_path):
+    csv_path = tmp_path / "database.csv"
+    csv_path.write_text("Company\nACME\nBETA\n", encoding="utf-8")
+    start_run(tmp_path, csv_path)
+    csv_path.write_text("Company\nBETA\nACME\nGAMMA\n", encoding="utf-8")
+
+    journal = open_journal(
+        "batch", resume="latest", source="liste.txt", directory=str(tmp_path)
+    )
+    assert journal.matches_for(str(csv_path)) is None
+    assert journal.queries == ["acme", "beta"]
+    journal.close()
+
+
+def test_truncated_last_line_is_dropped_on_resume(tmp_path):
+    csv_path = tmp_path / "database.csv"
+    csv_path.write_text("Company\nACME\nBETA\n", encoding="utf-8")
+    path = start_run(tmp_path, csv_path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "choice", "query": "acme", "res')
+
+    journal = open_journal("batch", resume=path, directory=str(tmp_path))
+    assert "acme" not in journal.choices
+    journal.record_choice("acme", ("ACME", 0.95, "Utilisateur", 0))
+    journal.close()
+
+    # La fin tronquée a été retirée : le nouvel enregistrement reste lisible
+    records, valid_length = read_records(path)
+    assert valid_length == os.path.getsize(path)
+    assert records[-1]["query"] == "acme"
+    assert [record["type"] for record in records] == [
+        "start",
+        "inputs",
+        "matches",
+        "choice",
+        "choice",
+    ]
@@ -0,0 +1,72 @@
+import pytest
+from fake_server import fake_siret, start_fake_server
+
+import enrichment
+import http_client
+from enrichment import FOUND, NOT_FOUND, ProviderLimiter, enrich_companies
+from metrics import RunMetrics
+from response_cache import ResponseCache
+
+NAMES = [f"Entreprise test {i}" for i in range(20)]
+
+
+@pytest.fixture
+def fake_server(tmp_path, monkeypatch):
+    server, url = start_fake_server(latency=0)
+    monkeypatch.setattr(enrichment, "SERPAPI_URL", url)
+    monkeypatch.setattr(enrichment, "PAPPERS_URL", url)
+    monkeypatch.setattr(enrichment, "get_sirene_store", lambda: None)
+    # Débit non limité : le faux serveur répond sans latence
+    monkeypatch.setattr(
+        enrichment,
+        "provider_limiters",
+        {"serpapi": ProviderLimiter(4, 0), "pappers": ProviderLimiter(4, 0)},
+    )
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(enrichment, "get_cache", lambda: cache)
+    monkeypatch.setattr(http_client, "client", http_client.HttpClient())
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_companies_are_enriched_from_search_and_pappers(fake_server):
+    metrics = RunMetrics()
+    results = {
+        result.query: result
+        for result in enrich_companies(NAMES, max_workers=4, metrics=metrics)
+    }
+
+    assert sorted(results) == sorted(NAMES)
+    for name, result in results.items():
+        siret = fake_siret(name)
+        if siret is None:
+            assert result.status == NOT_FOUND
+            assert result.row_data == [name, "NA"]
+            continue
+        assert result.status == FOUND
+        assert result.siret == siret
+        assert result.row_data[:3] == [name, "Web", f"ENTREPRISE {siret[:9]}"]
+        assert result.row_data[4].startswith("https://www.entreprise-")
+
+    found = sum(fake_siret(name) is not None for name in NAMES)
+    assert 0 < found < len(NAMES)
+    assert metrics.counters["web_found"] == found
+    assert metrics.counters["web_not_found"] == len(NAMES) - found
+    stats = http_client.client.get_stats()
+    assert stats["serpapi"]["calls"] == len(NAMES)
+    assert stats["pappers"]["calls"] == found
+
+
+def test_cached_responses_skip_the_network(fake_server):
+    first = {result.query: result.row_data for result in enrich_companies(NAMES)}
+    calls = {
+        provider: stats["calls"]
+        for provider, stats in http_client.client.get_stats().items()
+    }
+    second = {result.query: result.row_data for result in enrich_companies(NAMES)}
+    assert second == first
+    assert {
+        provider: stats["calls"]
+        for provider, stats in http_client.client.get_stats().items()
+    } == calls
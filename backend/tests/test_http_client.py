@@ -0,0 +1,129 @@
+import email.utils
+
+import pytest
+import requests
+
+import http_client
+from http_client import MAX_BACKOFF, HttpClient, retry_after_delay
+
+
+class FakeSession:
+    # Réponses rendues dans l'ordre, une par appel
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def client_for(monkeypatch, session, **kwargs):
+    client = HttpClient(**kwargs)
+    monkeypatch.setattr(client, "session_for", lambda url: session)
+    return client
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.entered = 0
+        self.held = False
+
+    def __enter__(self):
+        self.entered += 1
+        self.held = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self.held = False
+
+
+def test_limiter_is_taken_per_attempt_and_released_while_waiting(monkeypatch):
+    session = FakeSession(
+        [
+            requests.exceptions.ConnectionError(),
+            make_response(429, {"Retry-After": "3"}),
+            make_response(200),
+        ]
+    )
+    limiter = CountingLimiter()
+    sleeps = []
+
+    def sleep(seconds):
+        # Aucune attente entre deux tentatives ne bloque le fournisseur
+        assert not limiter.held
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(http_client.time, "sleep", sleep)
+    client = client_for(monkeypatch, session, backoff_factor=0.5)
+
+    response = client.get("https://example.test", provider="test", limiter=limiter)
+    assert response.status_code == 200
+    assert limiter.entered == session.calls == 3
+    assert sleeps == [0.5, 3.0]
+    assert client.get_stats()["test"]["retries"] == 2
+
+
+def test_retry_after_seconds_and_http_date(monkeypatch):
+    assert retry_after_delay(make_response(429, {"Retry-After": "7"})) == 7.0
+    monkeypatch.setattr(http_client.time, "time", lambda: 1_000_000.0)
+    date = email.utils.formatdate(1_000_012.0, usegmt=True)
+    assert retry_after_delay(make_response(503, {"Retry-After": date})) == 12.0
+    # Date passée : nouvelle tentative immédiate
+    date = email.utils.formatdate(999_000.0, usegmt=True)
+    assert retry_after_delay(make_response(503, {"Retry-After": date})) == 0.0
+    assert retry_after_delay(make_response(503, {"Retry-After": "demain"})) is None
+    assert retry_after_delay(make_response(503)) is None
+
+
+def test_backoff_is_exponential_and_capped():
+    client = HttpClient(backoff_factor=0.5)
+    assert [client.backoff(attempt) for attempt in range(4)] == [0.5, 1.0, 2.0, 4.0]
+    assert client.backoff(20) == MAX_BACKOFF
+    response = make_response(429, {"Retry-After": "3600"})
+    assert client.backoff(0, response) == MAX_BACKOFF
+
+
+def test_last_response_is_returned_after_max_retries(monkeypatch, sleeps):
+    session = FakeSession([make_response(503) for _ in range(3)])
+    client = client_for(monkeypatch, session, max_retries=2, backoff_factor=1)
+    response = client.get("https://example.test", provider="test")
+    assert response.status_code == 503
+    assert session.calls == 3
+    assert sleeps == [1, 2]
+    stats = client.get_stats()["test"]
+    assert (stats["calls"], stats["retries"], stats["errors"]) == (1, 2, 1)
+
+
+def test_network_error_is_raised_after_max_retries(monkeypatch, sleeps):
+    session = FakeSession([requests.exceptions.Timeout() for _ in range(2)])
+    client = client_for(monkeypatch, session, max_retries=1)
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get("https://example.test", provider="test")
+    assert session.calls == 2
+    assert client.get_stats()["test"]["errors"] == 1
+
+
+def test_client_errors_are_not_retried(monkeypatch, sleeps):
+    session = FakeSession([make_response(404)])
+    client = client_for(monkeypatch, session)
+    assert client.get("https://example.test", provider="test").status_code == 404
+    assert session.calls == 1
+    assert sleeps == []
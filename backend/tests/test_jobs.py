@@ -0,0 +1,35 @@
+import os
+
+import jobs
+from jobs import DONE, FAILED, JobQueue
+from metrics import run_metrics
+
+
+def test_finished_jobs_are_evicted_with_their_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "jobs_dir_path", str(tmp_path))
+
+    def pipeline(job):
+        os.makedirs(jobs.job_dir_path(job.id))
+        job.metrics.increment("queries", len(job.queries))
+        if job.queries == ["échec"]:
+            raise ValueError("échec")
+
+    queue = JobQueue(pipeline, workers=1, retention=2)
+    service_queries = run_metrics.snapshot(services=False)["counters"].get("queries")
+    submitted = [
+        queue.submit(queries, [{}] * len(queries))
+        for queries in (["a", "b"], ["échec"], ["c"], ["d", "e", "f"])
+    ]
+    queue.executor.shutdown(wait=True)
+
+    assert [job.status for job in submitted] == [DONE, FAILED, DONE, DONE]
+    assert queue.list() == submitted[2:]
+    assert sorted(os.listdir(tmp_path)) == sorted(job.id for job in submitted[2:])
+    assert all(job.queries is None for job in submitted)
+    # Mesures propres à chaque traitement, cumulées à part de celles du service
+    assert submitted[3].metrics.counters == {"queries": 3}
+    assert queue.metrics.counters == {"queries": 7}
+    assert (
+        run_metrics.snapshot(services=False)["counters"].get("queries")
+        == service_queries
+    )
@@ -0,0 +1,29 @@
+import numpy as np
+
+from matcher import select_candidates
+from metrics import RunMetrics
+
+
+def test_record_matches_without_candidate_column():
+    # Base vide ou entièrement filtrée : k = 0 option par requête
+    matches = select_candidates(
+        np.zeros((3, 0), dtype=np.int64), np.zeros((3, 0), dtype=np.float64)
+    )
+    metrics = RunMetrics()
+    metrics.record_matches(matches)
+    counters = metrics.snapshot()["counters"]
+    assert counters["queries"] == 3
+    assert counters["no_candidate"] == 3
+    assert counters["review"] == 0
+
+
+def test_record_matches_counts_review_and_auto():
+    matches = select_candidates(
+        np.array([[0, 1], [2, 3], [4, -1]]),
+        np.array([[0.95, 0.6], [0.7, 0.6], [0.3, 0.0]]),
+    )
+    metrics = RunMetrics()
+    metrics.record_matches(matches)
+    counters = metrics.snapshot()["counters"]
+    assert (counters["auto_matched"], counters["review"]) == (1, 1)
+    assert counters["no_candidate"] == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from normalize import (
+    build_key_table,
+    dedupe_inputs,
+    dedupe_key,
+    dedupe_names,
+    lookup_rows,
+    name_hashes,
+    normalize_name,
+)
+
+
+@pytest.mark.parametrize(
+    "variants",
+    [
+        ["L'Oréal SA", "LOREAL", "l’oréal"],
+        ["S.A.S. Dupont & Fils", "Dupont et Fils", "DUPONT ET FILS SAS"],
+        ["Cœur de Bois SARL", "coeur-de-bois"],
+    ],
+)
+def test_variants_share_a_key(variants):
+    assert len({normalize_name(name) for name in variants}) == 1
+    assert dedupe_names(variants) == variants[:1]
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        # Une forme juridique seule reste le nom
+        ["Groupe SA", "SA"],
+        # Sans clé latine, le nom tel quel distingue les entreprises
+        ["東京電力", "関西電力"],
+        ["Dupont SA", "Dupont SAS Lyon"],
+    ],
+)
+def test_distinct_names_do_not_collide(names):
+    assert len({dedupe_key(name) for name in names}) == len(names)
+    assert dedupe_names(names) == names
+
+
+def test_dedupe_inputs_keeps_first_attributes():
+    queries, attributes = dedupe_inputs(
+        ["ACME SAS\t75001", "acme\tLyon", "  ", "東京電力", "東京電力 "]
+    )
+    assert queries == ["ACME SAS", "東京電力"]
+    assert attributes == [{"code_postal": "75001"}, {}]
+
+
+def test_ambiguous_keys_are_not_looked_up():
+    # Deux lignes de même clé (homonymes) sont laissées au rapprochement TF-IDF
+    names = ["ACME", "Acme SA", "Beta", "SA"]
+    key_hashes, key_rows = build_key_table(name_hashes(names), np.arange(len(names)))
+    rows = lookup_rows(key_hashes, key_rows, ["acme", "BETA SARL", "sa", "", "Gamma"])
+    np.testing.assert_array_equal(rows, [-1, 2, 3, -1, -1])
@@ -0,0 +1,78 @@
+import pytest
+
+import response_cache
+from response_cache import MISSING, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def open_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), **kwargs)
+
+
+def test_expired_responses_are_fetched_again(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl_days={"serpapi": 1, "pappers": 10})
+    cache.set("serpapi_search", "acme", ["site", "tel", "123"])
+    cache.set("pappers", "123", {"siren": "1"})
+
+    clock.now += 2 * 24 * 3600
+    assert cache.get("serpapi_search", "acme") is MISSING
+    assert cache.get("pappers", "123") == {"siren": "1"}
+    assert cache.fetch("serpapi_search", "acme", lambda: ["new", "", None]) == [
+        "new",
+        "",
+        None,
+    ]
+    assert cache.get_stats()["serpapi_search"] == {"hits": 0, "misses": 2}
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path, clock):
+    value = "x" * 100
+    cache = open_cache(tmp_path, max_bytes=350)
+    for key in ["a", "b", "c"]:
+        clock.now += 1
+        cache.set("pappers", key, value)
+    # "a" est relue : "b" devient la moins récemment lue
+    clock.now += 1
+    assert cache.get("pappers", "a") == value
+    clock.now += 1
+    cache.set("pappers", "d", value)
+
+    assert cache.get("pappers", "b") is MISSING
+    assert [cache.get("pappers", key) for key in ["a", "c", "d"]] == [value] * 3
+    assert cache.total_bytes <= 350 * 0.9
+    # La taille est relue depuis la base à la réouverture
+    assert open_cache(tmp_path, max_bytes=350).total_bytes == cache.total_bytes
+
+
+def test_offline_mode_never_computes(tmp_path, clock):
+    open_cache(tmp_path).set("serpapi_search", "acme", ["site", "tel", "123"])
+    cache = open_cache(tmp_path, offline=True)
+
+    def compute():
+        raise AssertionError("appel réseau en mode hors ligne")
+
+    assert cache.fetch("serpapi_search", "acme", compute) == ["site", "tel", "123"]
+    assert cache.fetch("serpapi_search", "beta", compute, default="NA") == "NA"
+    assert cache.get("serpapi_search", "beta") is MISSING
+
+
+def test_failures_are_not_cached_when_asked(tmp_path, clock):
+    cache = open_cache(tmp_path)
+    assert cache.fetch("pappers", "123", lambda: None, cache_none=False) is None
+    assert cache.get("pappers", "123") is MISSING
+    assert cache.fetch("pappers", "456", lambda: None) is None
+    assert cache.get("pappers", "456") is None
@@ -0,0 +1,45 @@
+import csv
+
+import pandas as pd
+
+from export import build_company_index, choice_row
+from matcher import NO_MATCH
+from review import read_review_file, resolve_choice, review_headers, write_review_file
+
+
+def test_review_file_keeps_option_rows(tmp_path):
+    path = tmp_path / "revue.csv"
+    write_review_file(path, [("acme", [("ACME", 0.8, 7), ("ACME", 0.8, 3)])])
+    entries = read_review_file(path)
+    assert entries == [("acme", [("ACME", 0.8, 7), ("ACME", 0.8, 3)], "")]
+    assert resolve_choice("acme", entries[0][1], "2") == (
+        "ACME",
+        0.8,
+        "Utilisateur",
+        3,
+    )
+    assert resolve_choice("acme", entries[0][1], "") == (
+        NO_MATCH,
+        0,
+        "utilisateur",
+        -1,
+    )
+
+
+def test_review_file_without_row_columns(tmp_path):
+    # Fichier de revue écrit avant l'ajout des colonnes "Ligne"
+    path = tmp_path / "revue.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(review_headers)
+        writer.writerow(["acme", "1", "ACME", "80.00%"])
+    assert read_review_file(path) == [("acme", [("ACME", 0.8, -1)], "1")]
+
+
+def test_choice_row_keeps_chosen_homonym():
+    names = pd.Series(["ACME", "BETA", "ACME"]).to_numpy(dtype=object)
+    company_index = build_company_index(pd.DataFrame({"Company": names}))
+    assert choice_row(names, company_index, ("ACME", 0.8, "Utilisateur", 2)) == 2
+    # Position inconnue ou base modifiée depuis : première ligne de ce nom
+    assert choice_row(names, company_index, ("ACME", 0.8, "Utilisateur", -1)) == 0
+    assert choice_row(names, company_index, ("ACME", 0.8, "Utilisateur", 1)) == 0
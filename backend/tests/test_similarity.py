@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from similarity import candidate_top_k, top_k_similarities
+
+
+def dense_top_k(query_matrix, reference_matrix, k, live=None):
+    # Référence : tri complet des scores denses, à score égal l'indice le plus petit
+    scores = (query_matrix @ reference_matrix.T).toarray()
+    if live is not None:
+        scores[:, ~live] = 0.0
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(scores, order, axis=1)
+
+
+def random_matrices(seed):
+    rng = np.random.default_rng(seed)
+    # Valeurs arrondies : de nombreux scores égaux éprouvent le départage
+    references = sparse.random(
+        300, 40, density=0.1, random_state=rng, data_rvs=lambda n: rng.integers(1, 3, n)
+    ).tocsr()
+    queries = sparse.random(
+        25, 40, density=0.2, random_state=rng, data_rvs=lambda n: rng.integers(1, 3, n)
+    ).tocsr()
+    return queries.astype(np.float64), references.astype(np.float64)
+
+
+@pytest.mark.parametrize("k", [1, 4, 300])
+@pytest.mark.parametrize("block_rows", [None, 7, 64])
+def test_top_k_matches_dense_argsort(k, block_rows):
+    queries, references = random_matrices(k)
+    indices, scores = top_k_similarities(queries, references, k, block_rows=block_rows)
+    expected_indices, expected_scores = dense_top_k(queries, references, k)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores)
+
+
+def test_top_k_ignores_deleted_rows():
+    queries, references = random_matrices(0)
+    live = np.random.default_rng(1).random(references.shape[0]) > 0.3
+    indices, scores = top_k_similarities(
+        queries, references, 5, block_rows=16, live=live
+    )
+    expected_indices, expected_scores = dense_top_k(queries, references, 5, live)
+    np.testing.assert_allclose(scores, expected_scores)
+    assert live[indices[scores > 0]].all()
+
+
+def test_top_k_without_references():
+    queries, references = random_matrices(0)
+    indices, scores = top_k_similarities(queries, references[:0], 4)
+    assert indices.shape == scores.shape == (queries.shape[0], 0)
+
+
+def test_candidate_top_k_matches_dense_argsort_on_candidates():
+    queries, references = random_matrices(2)
+    rng = np.random.default_rng(3)
+    candidate_rows = [
+        np.sort(rng.choice(references.shape[0], size, replace=False))
+        for size in rng.integers(0, 20, queries.shape[0])
+    ]
+    indices, scores = candidate_top_k(queries, references, candidate_rows, 4)
+    for i, rows in enumerate(candidate_rows):
+        expected_indices, expected_scores = dense_top_k(
+            queries[i], references[rows], min(4, len(rows))
+        )
+        found = indices[i] >= 0
+        np.testing.assert_array_equal(indices[i][found], rows[expected_indices[0]])
+        np.testing.assert_allclose(scores[i][found], expected_scores[0])
+        assert found.sum() == min(4, len(rows))
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from matcher import AUTO_MATCH_THRESHOLD, match_queries, score_queries
+from tfidf_index import SHARED_DIR, attach_shard_pool, build_index
+
+WORDS = ["TRANSPORTS", "BOIS", "CONSEIL", "INDUSTRIE", "SERVICES", "ENERGIE"]
+
+
+@pytest.fixture(params=["vocabulary", "hashing"])
+def index(request, tmp_path):
+    names = [f"{a} {b} {i}" for i, (a, b) in enumerate(zip(WORDS * 50, WORDS[1:] * 60))]
+    names += ["TOBIVIL", "REDE", "RANI"]
+    reference = pd.DataFrame(
+        {"Company": names, "SIRET": [f"{i:014d}" for i in range(len(names))]}
+    )
+    csv_path = tmp_path / "database.csv"
+    reference.to_csv(csv_path, index=False)
+    return build_index(str(csv_path), reference, str(tmp_path / "index"), request.param)
+
+
+def test_shard_pool_scores_like_single_process(index, tmp_path, request):
+    queries = ["BOIS TRANSPORTS 3", "CONSEIL ENERGIE", "REDE DISTRIBUTI"]
+    expected_rows, expected_scores = score_queries(index, queries, 4)
+    index_dir = str(tmp_path / "index")
+    attach_shard_pool(index, index_dir, 2)
+    try:
+        rows, scores = score_queries(index, queries, 4)
+    finally:
+        index.shard_pool.close()
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_allclose(scores, expected_scores)
+    # En mode "hashing", la matrice projetée depuis l'index n'est pas recopiée
+    copied = os.path.exists(os.path.join(index_dir, SHARED_DIR, "data.npy"))
+    assert copied == (request.node.callspec.params["index"] == "vocabulary")
+
+
+def test_known_words_are_auto_matched(index):
+    # Mots de la base dans un autre ordre : pas de clé exacte, score TF-IDF plein
+    matches = match_queries(index, ["BOIS TRANSPORTS 0"])
+    assert not matches.exact_matched[0]
+    assert matches.auto_matched[0]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "TOBIVIL Quantum Widgets",
+        "REDE DISTRIBUTI",
+        "RANI Zorglub Holdings International",
+    ],
+)
+def test_unknown_words_keep_query_below_auto_threshold(index, query):
+    # Les mots absents de la base comptent dans la norme de la requête
+    matches = match_queries(index, [query])
+    assert matches.best_scores[0] < AUTO_MATCH_THRESHOLD
+    assert not matches.auto_matched[0]
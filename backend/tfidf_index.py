@@ -0,0 +1,610 @@
+import argparse
+import os
+import pickle
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from blocking_index import load_or_build_blocking_index
+from candidate_index import (
+    CANDIDATE_INDEX_MIN_ROWS,
+    build_candidate_index,
+    build_candidate_index_chunks,
+    is_candidate_index_fresh,
+    load_candidate_index,
+)
+from database import (
+    HASHING_CHUNK_ROWS,
+    VECTORIZER_MODE,
+    csv_file_path,
+    is_up_to_date,
+    iter_csv_chunks,
+    load_database,
+    new_manifest,
+    read_manifest,
+    remove_manifest,
+    write_manifest,
+)
+from hashing_vectorizer import (
+    HashedMatrixWriter,
+    HashingTfidfVectorizer,
+    open_hashed_matrix,
+)
+from normalize import build_key_table, lookup_rows, name_hashes
+from shards import (
+    MATCH_WORKERS,
+    SHARD_MIN_ROWS,
+    ShardPool,
+    is_shared_matrix_fresh,
+    save_shared_matrix,
+)
+
+# Dossier dans lequel l'index TF-IDF est enregistré
+index_dir_path = os.path.join("..", "sources", "index")
+
+# À incrémenter si le format de l'index change
+INDEX_VERSION = 5
+
+VECTORIZER_FILE = "vectorizer.pkl"
+MATRIX_FILE = "matrix.npz"
+DELTA_FILE = "delta.npz"
+ROWS_FILE = "rows.npz"
+SHARED_DIR = "shared"
+HASHED_DIR = "hashed"
+
+# Vectoriseur de l'index (VECTORIZER_MODE) : "vocabulary" (TfidfVectorizer,
+# vocabulaire appris en mémoire) ou "hashing" (espace de hachage, base lue par
+# blocs de HASHING_CHUNK_ROWS lignes et matrice float32 écrite sur disque, pour les
+# bases plus grandes que la mémoire)
+VECTORIZER_MODES = ["vocabulary", "hashing"]
+
+# Colonnes qui identifient une ligne de la base d'une version à l'autre
+REFERENCE_COLUMNS = ["Company", "SIRET"]
+
+# Au-delà de cette part de lignes ajoutées ou supprimées depuis la dernière
+# construction complète, l'index est compacté (reconstruit entièrement)
+COMPACTION_RATIO = float(os.environ.get("FSG_INDEX_COMPACTION_RATIO", "0.2"))
+
+# Constantes de mélange des empreintes : combinaison des colonnes, et rang des
+# lignes identiques (nombre d'or, 64 bits)
+HASH_MULTIPLIER = np.uint64(1000003)
+DUPLICATE_STEP = np.uint64(0x9E3779B97F4A7C15)
+
+
+class TfidfIndex:
+    # L'index est formé d'un segment principal (vocabulaire appris sur la base
+    # lors de la dernière construction complète) suivi d'un segment delta (lignes
+    # ajoutées depuis, projetées dans ce vocabulaire). Les deux matrices restent
+    # séparées : le segment principal, projeté en mémoire depuis le disque en mode
+    # "hashing", n'est jamais recopié. positions donne, pour chaque ligne de
+    # l'index, sa position dans la base actuelle (-1 : supprimée).
+    def __init__(self, vectorizer, main_matrix, delta_matrix, positions, keys, segment):
+        self.vectorizer = vectorizer
+        self.main_matrix = main_matrix
+        if delta_matrix is None:
+            delta_matrix = sparse.csr_matrix((0, main_matrix.shape[1]))
+        self.delta_matrix = delta_matrix.tocsr()
+        self.num_main_rows = main_matrix.shape[0]
+        self.num_rows = self.num_main_rows + self.delta_matrix.shape[0]
+        self.num_terms = main_matrix.shape[1]
+        self.positions = positions
+        # Les lignes supprimées sont écartées au calcul des scores (None : aucune)
+        live = positions >= 0
+        self.live = None if live.all() else live
+        self.segment = segment
+        # Clés normalisées de la base (empreintes triées -> position dans la base)
+        self.key_hashes, self.key_rows = build_key_table(keys[live], positions[live])
+        # Index des trigrammes, utilisé pour les grandes bases (None sinon)
+        self.candidate_index = None
+        # Processus de calcul des similarités, s'il y en a plusieurs (None sinon)
+        self.shard_pool = None
+        # Index de blocage par code postal, ville, département et site
+        self.blocking_index = None
+        self.position_rows = None
+
+    def main_live(self):
+        return self.live[: self.num_main_rows] if self.live is not None else None
+
+    def delta_live(self):
+        return self.live[self.num_main_rows :] if self.live is not None else None
+
+    def rows_matrix(self, rows):
+        # Vecteurs des lignes données de l'index (triées), pris dans chaque segment
+        split = np.searchsorted(rows, self.num_main_rows)
+        return sparse.vstack(
+            [
+                self.main_matrix[rows[:split]],
+                self.delta_matrix[rows[split:] - self.num_main_rows],
+            ]
+        ).tocsr()
+
+    def transform(self, queries):
+        # Les requêtes sont seulement projetées dans le vocabulaire de la base
+        return transform_names(
+            self.vectorizer, clean_names(queries), self.num_main_rows
+        )
+
+    def rows_at(self, positions):
+        # Lignes de l'index (triées) des positions données dans la base
+        if self.position_rows is None:
+            live = np.flatnonzero(self.positions >= 0)
+            self.position_rows = np.full(
+                self.positions.max() + 1 if len(live) else 0, -1, dtype=np.int64
+            )
+            self.position_rows[self.positions[live]] = live
+        positions = positions[positions < len(self.position_rows)]
+        rows = self.position_rows[positions]
+        return np.sort(rows[rows >= 0])
+
+    def exact_rows(self, queries):
+        # Position dans la base de la ligne portant la même clé normalisée (-1 sinon)
+        return lookup_rows(self.key_hashes, self.key_rows, list(queries))
+
+
+def clean_names(names):
+    # Remplacer les valeurs np.nan par une chaîne vide
+    return [
+        "" if isinstance(item, float) and np.isnan(item) else item for item in names
+    ]
+
+
+def transform_names(vectorizer, names, num_documents):
+    # Vecteurs TF-IDF normalisés des noms. Les mots absents de la base ne sont pas
+    # des colonnes de la matrice mais comptent dans la norme, avec l'IDF d'un mot
+    # présent dans aucune des num_documents lignes du vocabulaire : sans eux, « nom
+    # connu + mots inconnus » obtiendrait le même score parfait que le nom seul.
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        # Les colonnes absentes de la base y ont déjà l'IDF maximal
+        return vectorizer.transform(names)
+
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    weights = CountVectorizer.transform(vectorizer, names).tocsr()
+    weights = weights.multiply(vectorizer.idf_).tocsr().astype(np.float64)
+    unseen_idf = np.log(1 + num_documents) + 1
+    analyzer = vectorizer.build_analyzer()
+    unseen = np.array(
+        [
+            sum(
+                count**2
+                for word, count in Counter(analyzer(name)).items()
+                if word not in vectorizer.vocabulary_
+            )
+            for name in names
+        ],
+        dtype=np.float64,
+    )
+    norms = np.sqrt(
+        np.asarray(weights.multiply(weights).sum(axis=1)).ravel()
+        + unseen * unseen_idf**2
+    )
+    # Un nom sans mot reste nul
+    norms[norms == 0] = 1
+    weights.data /= np.repeat(norms, np.diff(weights.indptr))
+    return weights
+
+
+def identity_hashes(reference):
+    # Empreinte du couple (SIRET, Company) de chaque ligne
+    hashes = np.zeros(len(reference), dtype=np.uint64)
+    for column in ["SIRET", "Company"]:
+        # Hachage direct des chaînes, sans passer par une catégorisation préalable
+        values = reference[column].to_numpy(dtype=object)
+        hashes = hashes * HASH_MULTIPLIER ^ pd.util.hash_array(values, categorize=False)
+    return hashes
+
+
+def row_identities(reference):
+    return rank_duplicates(identity_hashes(reference))
+
+
+def csv_identities(csv_path, chunk_rows):
+    # Identités des lignes de la base, lue par blocs depuis le CSV
+    hashes = [
+        identity_hashes(chunk)
+        for chunk in iter_csv_chunks(csv_path, REFERENCE_COLUMNS, chunk_rows)
+    ]
+    return rank_duplicates(
+        np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+    )
+
+
+def csv_names(csv_path, rows, chunk_rows):
+    # Noms des lignes données (triées) de la base, lue par blocs depuis le CSV
+    names = []
+    start = 0
+    for chunk in iter_csv_chunks(csv_path, ["Company"], chunk_rows):
+        stop = start + len(chunk)
+        selected = rows[np.searchsorted(rows, start) : np.searchsorted(rows, stop)]
+        names.extend(chunk["Company"].iloc[selected - start].tolist())
+        start = stop
+    return names
+
+
+def rank_duplicates(hashes):
+    # Identité d'une ligne : empreinte du couple (SIRET, Company). Les lignes
+    # identiques sont distinguées par leur rang d'apparition.
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    first = np.flatnonzero(np.diff(sorted_hashes, prepend=~sorted_hashes[:1]) != 0)
+    ranks = np.empty(len(hashes), dtype=np.uint64)
+    ranks[order] = np.arange(len(hashes)) - np.repeat(
+        first, np.diff(np.append(first, len(hashes)))
+    )
+    return (hashes + ranks * DUPLICATE_STEP).view(np.int64)
+
+
+def is_index_fresh(csv_path, index_dir, vectorizer_mode=VECTORIZER_MODE):
+    # Un changement de vectoriseur impose une reconstruction complète
+    return (
+        is_up_to_date(csv_path, index_dir, INDEX_VERSION)
+        and read_manifest(index_dir).get("vectorizer") == vectorizer_mode
+    )
+
+
+def save_rows(index_dir, positions, identities, keys):
+    np.savez(
+        os.path.join(index_dir, ROWS_FILE),
+        positions=positions,
+        identities=identities,
+        keys=keys,
+    )
+
+
+def build_index(
+    csv_path, reference, index_dir=index_dir_path, vectorizer_mode=VECTORIZER_MODE
+):
+    if vectorizer_mode == "hashing":
+        return build_hashed_index(csv_path, index_dir)
+
+    # scikit-learn n'est importé qu'à la construction ; au chargement, il l'est
+    # par le vectoriseur enregistré
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    os.makedirs(index_dir, exist_ok=True)
+    names = reference["Company"].tolist()
+
+    # Apprentissage du vocabulaire sur la seule colonne "Company"
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(clean_names(names)).tocsr()
+    positions = np.arange(len(names), dtype=np.int64)
+    keys = name_hashes(names)
+
+    # Le manifeste est supprimé pendant l'écriture pour ne jamais charger un index partiel
+    remove_manifest(index_dir)
+
+    with open(os.path.join(index_dir, VECTORIZER_FILE), "wb") as f:
+        pickle.dump(vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    sparse.save_npz(os.path.join(index_dir, MATRIX_FILE), matrix)
+    if os.path.exists(os.path.join(index_dir, DELTA_FILE)):
+        os.remove(os.path.join(index_dir, DELTA_FILE))
+    save_rows(index_dir, positions, row_identities(reference), keys)
+
+    manifest = write_main_manifest(
+        csv_path, index_dir, "vocabulary", len(names), len(vectorizer.vocabulary_)
+    )
+    return TfidfIndex(vectorizer, matrix, None, positions, keys, manifest["segment"])
+
+
+def build_hashed_index(csv_path, index_dir=index_dir_path, chunk_rows=None):
+    # Construction en mémoire bornée : la base est lue par blocs, les comptes de
+    # chaque bloc sont écrits sur disque et comptés pour l'IDF, puis pondérés en
+    # place. Seules les empreintes des lignes (16 octets par ligne) restent en
+    # mémoire.
+    chunk_rows = chunk_rows or HASHING_CHUNK_ROWS
+    os.makedirs(index_dir, exist_ok=True)
+    remove_manifest(index_dir)
+
+    vectorizer = HashingTfidfVectorizer()
+    writer = HashedMatrixWriter(os.path.join(index_dir, HASHED_DIR))
+    hashes, keys = [], []
+    for chunk in iter_csv_chunks(csv_path, REFERENCE_COLUMNS, chunk_rows):
+        names = chunk["Company"].tolist()
+        counts = vectorizer.counts(clean_names(names))
+        vectorizer.partial_fit(counts)
+        writer.append(counts)
+        hashes.append(identity_hashes(chunk))
+        keys.append(name_hashes(names))
+    vectorizer.finish_fit()
+    writer.finish(vectorizer.idf, chunk_rows)
+
+    num_rows = writer.num_rows
+    positions = np.arange(num_rows, dtype=np.int64)
+    keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+    hashes = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+    with open(os.path.join(index_dir, VECTORIZER_FILE), "wb") as f:
+        pickle.dump(vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    if os.path.exists(os.path.join(index_dir, DELTA_FILE)):
+        os.remove(os.path.join(index_dir, DELTA_FILE))
+    save_rows(index_dir, positions, rank_duplicates(hashes), keys)
+
+    manifest = write_main_manifest(
+        csv_path, index_dir, "hashing", num_rows, vectorizer.num_features
+    )
+    matrix = open_hashed_matrix(
+        os.path.join(index_dir, HASHED_DIR), num_rows, vectorizer.num_features
+    )
+    return TfidfIndex(vectorizer, matrix, None, positions, keys, manifest["segment"])
+
+
+def write_main_manifest(csv_path, index_dir, vectorizer_mode, num_rows, num_terms):
+    manifest = new_manifest(
+        csv_path,
+        INDEX_VERSION,
+        vectorizer=vectorizer_mode,
+        num_rows=num_rows,
+        num_terms=num_terms,
+        main_rows=num_rows,
+        delta_rows=0,
+        deleted_rows=0,
+    )
+    # Le segment principal est identifié par le contenu de la base qui l'a produit
+    manifest["segment"] = manifest["csv_sha256"]
+    write_manifest(index_dir, manifest)
+    return manifest
+
+
+def load_main_matrix(index_dir, manifest):
+    if manifest["vectorizer"] == "hashing":
+        return open_hashed_matrix(
+            os.path.join(index_dir, HASHED_DIR),
+            manifest["main_rows"],
+            manifest["num_terms"],
+        )
+    return sparse.load_npz(os.path.join(index_dir, MATRIX_FILE)).tocsr()
+
+
+def update_index(csv_path, reference, index_dir=index_dir_path):
+    # Mise à jour incrémentale : seules les lignes ajoutées sont vectorisées,
+    # les lignes supprimées ou renommées sont marquées comme supprimées. Sans
+    # reference (mode "hashing"), la base est lue par blocs depuis le CSV.
+    manifest = read_manifest(index_dir)
+    with np.load(os.path.join(index_dir, ROWS_FILE)) as rows:
+        positions, identities, keys = (
+            rows["positions"],
+            rows["identities"],
+            rows["keys"],
+        )
+
+    if reference is None:
+        current = csv_identities(csv_path, HASHING_CHUNK_ROWS)
+    else:
+        current = row_identities(reference)
+    live = np.flatnonzero(positions >= 0)
+    _, kept, current_rows = np.intersect1d(
+        identities[live], current, assume_unique=True, return_indices=True
+    )
+    added = np.setdiff1d(np.arange(len(current)), current_rows, assume_unique=True)
+
+    # Les lignes conservées peuvent avoir changé de position dans la base
+    positions = np.full(len(positions), -1, dtype=np.int64)
+    positions[live[kept]] = current_rows
+
+    delta_rows = manifest["delta_rows"] + len(added)
+    deleted_rows = int((positions < 0).sum())
+    if delta_rows + deleted_rows > COMPACTION_RATIO * manifest["main_rows"]:
+        print("Compactage de l'index TF-IDF de la base de données...")
+        return build_index(csv_path, reference, index_dir, manifest["vectorizer"])
+
+    with open(os.path.join(index_dir, VECTORIZER_FILE), "rb") as f:
+        vectorizer = pickle.load(f)
+    if reference is None:
+        added_names = csv_names(csv_path, added, HASHING_CHUNK_ROWS)
+    else:
+        added_names = reference["Company"].iloc[added].tolist()
+    delta = transform_names(
+        vectorizer, clean_names(added_names), manifest["main_rows"]
+    ).tocsr()
+    if manifest["delta_rows"]:
+        previous = sparse.load_npz(os.path.join(index_dir, DELTA_FILE))
+        delta = sparse.vstack([previous, delta]).tocsr()
+
+    positions = np.concatenate([positions, added])
+    identities = np.concatenate([identities, current[added]])
+    keys = np.concatenate([keys, name_hashes(added_names)])
+
+    remove_manifest(index_dir)
+    sparse.save_npz(os.path.join(index_dir, DELTA_FILE), delta)
+    save_rows(index_dir, positions, identities, keys)
+    manifest.update(
+        new_manifest(
+            csv_path,
+            INDEX_VERSION,
+            num_rows=len(current),
+            delta_rows=delta_rows,
+            deleted_rows=deleted_rows,
+        )
+    )
+    write_manifest(index_dir, manifest)
+    print(
+        f"Index mis à jour : {len(added)} lignes ajoutées, "
+        f"{len(live) - len(kept)} lignes supprimées."
+    )
+    return TfidfIndex(
+        vectorizer,
+        load_main_matrix(index_dir, manifest),
+        delta,
+        positions,
+        keys,
+        manifest["segment"],
+    )
+
+
+def load_index(index_dir=index_dir_path):
+    manifest = read_manifest(index_dir)
+    with open(os.path.join(index_dir, VECTORIZER_FILE), "rb") as f:
+        vectorizer = pickle.load(f)
+    matrix = load_main_matrix(index_dir, manifest)
+    delta = None
+    if manifest["delta_rows"]:
+        delta = sparse.load_npz(os.path.join(index_dir, DELTA_FILE))
+    with np.load(os.path.join(index_dir, ROWS_FILE)) as rows:
+        positions, keys = rows["positions"], rows["keys"]
+    return TfidfIndex(vectorizer, matrix, delta, positions, keys, manifest["segment"])
+
+
+def can_update(index_dir, vectorizer_mode=VECTORIZER_MODE):
+    manifest = read_manifest(index_dir)
+    return (
+        manifest is not None
+        and manifest.get("version") == INDEX_VERSION
+        and manifest.get("vectorizer") == vectorizer_mode
+    )
+
+
+def main_name_chunks(index, csv_path, chunk_rows):
+    # Noms des lignes du segment principal, dans leur ordre, lus par blocs depuis
+    # le CSV ; les lignes conservées doivent être dans l'ordre de la base
+    main_positions = index.positions[: index.num_main_rows]
+    live_rows = np.flatnonzero(main_positions >= 0)
+    live_positions = main_positions[live_rows]
+    row = 0
+    start = 0
+    for chunk in iter_csv_chunks(csv_path, ["Company"], chunk_rows):
+        stop = start + len(chunk)
+        first, last = np.searchsorted(live_positions, [start, stop])
+        # Lignes jusqu'à la dernière ligne conservée du bloc, supprimées comprises
+        end = live_rows[last - 1] + 1 if last > first else row
+        names = np.full(end - row, "", dtype=object)
+        names[live_rows[first:last] - row] = chunk["Company"].to_numpy(dtype=object)[
+            live_positions[first:last] - start
+        ]
+        yield clean_names(names)
+        row, start = end, stop
+    yield [""] * (index.num_main_rows - row)
+
+
+def attach_candidate_index(index, csv_path, reference=None, chunk_rows=None):
+    # L'index des trigrammes couvre le segment principal ; il n'est reconstruit
+    # qu'après une construction complète (ou un compactage) de l'index TF-IDF
+    if is_candidate_index_fresh(index.segment):
+        index.candidate_index = load_candidate_index()
+        return
+
+    print("Construction de l'index des trigrammes de la base de données...")
+    main_positions = index.positions[: index.num_main_rows]
+    live_positions = main_positions[main_positions >= 0]
+    if reference is None and chunk_rows and np.all(np.diff(live_positions) > 0):
+        # Lignes dans l'ordre de la base (cas d'une construction complète) : les
+        # noms sont lus par blocs depuis le CSV
+        index.candidate_index = build_candidate_index_chunks(
+            lambda: main_name_chunks(index, csv_path, chunk_rows), index.segment
+        )
+        return
+
+    if reference is None:
+        reference = load_database(csv_path, columns=["Company"])
+    current_names = reference["Company"].to_numpy(dtype=object)
+    names = np.where(main_positions >= 0, current_names[main_positions], "")
+    index.candidate_index = build_candidate_index(list(names), index.segment)
+
+
+def attach_shard_pool(index, index_dir, workers):
+    # Segment principal projeté en mémoire par chaque processus de calcul : en mode
+    # "hashing", directement depuis les fichiers de l'index ; sinon depuis une
+    # copie écrite une fois par état de l'index. Le segment delta est scoré dans
+    # le processus.
+    directory = os.path.join(index_dir, SHARED_DIR)
+    manifest = read_manifest(index_dir)
+    # Le contenu de shared dépend du vectoriseur (copie ou masque seul), du
+    # segment principal (compactage) et de l'état de la base (lignes supprimées)
+    state = "-".join(
+        [manifest["vectorizer"], manifest["segment"], manifest["csv_sha256"]]
+    )
+    open_matrix, matrix_args, matrix = None, (), index.main_matrix
+    if manifest["vectorizer"] == "hashing":
+        open_matrix = open_hashed_matrix
+        matrix_args = (
+            os.path.abspath(os.path.join(index_dir, HASHED_DIR)),
+            manifest["main_rows"],
+            manifest["num_terms"],
+        )
+        matrix = None
+    if not is_shared_matrix_fresh(directory, state):
+        save_shared_matrix(matrix, directory, state, index.main_live())
+    index.shard_pool = ShardPool(
+        directory, index.num_main_rows, workers, open_matrix, matrix_args
+    )
+
+
+def load_or_build_index(
+    csv_path,
+    reference=None,
+    index_dir=index_dir_path,
+    candidate_min_rows=CANDIDATE_INDEX_MIN_ROWS,
+    compact=False,
+    workers=MATCH_WORKERS,
+    vectorizer_mode=VECTORIZER_MODE,
+    blocking=True,
+):
+    # L'index n'est mis à jour que si le contenu de la base a changé : les lignes
+    # ajoutées vont dans le segment delta, la reconstruction complète est réservée
+    # au premier lancement, au compactage et au changement de vectoriseur
+    # En mode "hashing", la base n'est jamais chargée entière : l'index et les
+    # index annexes sont construits à partir du CSV lu par blocs
+    chunk_rows = HASHING_CHUNK_ROWS if vectorizer_mode == "hashing" else None
+    if is_index_fresh(csv_path, index_dir, vectorizer_mode) and not compact:
+        index = load_index(index_dir)
+    elif can_update(index_dir, vectorizer_mode) and not compact:
+        if reference is None and not chunk_rows:
+            reference = load_database(csv_path, columns=REFERENCE_COLUMNS)
+        index = update_index(csv_path, reference, index_dir)
+    else:
+        print("Construction de l'index TF-IDF de la base de données...")
+        if reference is None and not chunk_rows:
+            reference = load_database(csv_path, columns=REFERENCE_COLUMNS)
+        index = build_index(csv_path, reference, index_dir, vectorizer_mode)
+
+    # Lignes de chaque code postal, ville, département et site, pour les requêtes
+    # accompagnées de ces attributs
+    if blocking:
+        index.blocking_index = load_or_build_blocking_index(
+            csv_path, chunk_rows=chunk_rows
+        )
+
+    # Au-delà d'une certaine taille, seules les lignes candidates sont comparées
+    if index.num_main_rows >= candidate_min_rows:
+        attach_candidate_index(index, csv_path, reference, chunk_rows)
+    elif workers > 1 and index.num_rows >= SHARD_MIN_ROWS:
+        # Sinon, le calcul exhaustif est réparti entre plusieurs processus
+        attach_shard_pool(index, index_dir, workers)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Construit ou met à jour l'index TF-IDF de la base."
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="reconstruire entièrement l'index en intégrant le segment delta",
+    )
+    parser.add_argument(
+        "--vectorizer",
+        choices=VECTORIZER_MODES,
+        default=VECTORIZER_MODE,
+        help="vocabulaire appris en mémoire ou espace de hachage lu par blocs "
+        "(FSG_VECTORIZER)",
+    )
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if (
+        is_index_fresh(csv_file_path, index_dir_path, args.vectorizer)
+        and not args.compact
+    ):
+        print("L'index TF-IDF est déjà à jour.")
+    else:
+        index = load_or_build_index(
+            csv_file_path, compact=args.compact, vectorizer_mode=args.vectorizer
+        )
+        print(
+            f"Index à jour : {index.num_rows} lignes "
+            f"(dont {index.num_rows - index.num_main_rows} en delta), "
+            f"{index.num_terms} termes."
+        )
+    print(f"Temps écoulé: {time.time() - start_time:.2f} secondes")